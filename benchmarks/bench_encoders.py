@@ -0,0 +1,115 @@
+# /benchmarks/bench_encoders.py
+
+"""
+Benchmark the output encoders on rendered wallpapers.
+
+Renders one wallpaper per screen preset and theme from synthetic terrain,
+then encodes it with every encoder and reports the encode time and the
+encoded size. Runs offline.
+
+Usage
+-----
+    python benchmarks/bench_encoders.py
+    python benchmarks/bench_encoders.py --presets 4k --output encoders.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import platform
+import time
+
+import matplotlib
+import numpy as np
+import PIL
+
+from isohypseswallpaper import scale
+from isohypseswallpaper.encoders import ENCODERS, encode
+from isohypseswallpaper.presets import SCREEN_PRESETS
+from isohypseswallpaper.renderer import Renderer
+
+from terrain import fractal_dem
+
+LAT, LON = 46.5, 8.0
+SRTM_RESOLUTION_M = 30
+
+THEMES = {
+    "uniform": dict(background_color="#2a2a2a", contour_color="white"),
+    "two-color": dict(theme="mono_ink"),
+    "gradient": dict(theme="lichen_forest"),
+}
+
+
+def bench_preset(preset: str, zoom: int, repeat: int, renderer: Renderer) -> dict:
+    """Benchmark every encoder and theme of one preset; returns {case: result}."""
+    width, height = SCREEN_PRESETS[preset]
+    m_per_px = scale.meters_per_pixel(LAT, zoom)
+    dem = fractal_dem(
+        max(int(height * m_per_px / SRTM_RESOLUTION_M), 2),
+        max(int(width * m_per_px / SRTM_RESOLUTION_M), 2),
+    )
+
+    results = {}
+    for theme_name, colors in THEMES.items():
+        rendered = renderer.render(
+            dem, LAT, LON, zoom, width, height, contour_interval=50, **colors
+        )
+        for name in ENCODERS:
+            times = []
+            for _ in range(repeat):
+                buffer = io.BytesIO()
+                start = time.perf_counter()
+                encode(rendered.image, buffer, rendered.metadata, encoder=name)
+                times.append(time.perf_counter() - start)
+            size = len(buffer.getvalue())
+
+            results[f"{preset}/{theme_name}/{name}"] = {
+                "encode_ms": min(times) * 1000,
+                "bytes": size,
+            }
+            print(
+                f"{preset:>10} {theme_name:>9} {name:>11}: "
+                f"{min(times) * 1000:8.1f} ms {size / 1024:9.0f} KiB",
+                flush=True,
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--presets", nargs="+", default=list(SCREEN_PRESETS),
+        choices=list(SCREEN_PRESETS), help="Presets to benchmark",
+    )
+    parser.add_argument("--zoom", type=int, default=12, help="Zoom level")
+    parser.add_argument("--repeat", type=int, default=3, help="Encodes per case (min is kept)")
+    parser.add_argument("--output", type=str, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    matplotlib.use("Agg")
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pillow": PIL.__version__,
+            "machine": platform.machine(),
+            "zoom": args.zoom,
+            "repeat": args.repeat,
+        },
+        "cases": {},
+    }
+    renderer = Renderer()
+    for preset in args.presets:
+        results["cases"].update(bench_preset(preset, args.zoom, args.repeat, renderer))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# /benchmarks/bench_pipeline.py
+
+"""
+Benchmark the rendering pipeline on synthetic terrain.
+
+Times every stage and the end-to-end `generate_wallpaper` for each screen
+preset, for uniform vs gradient themes, with and without contours. Runs
+offline: the DEM download is replaced by a synthetic GeoTIFF, so the
+`dem_fetch` stage only measures the windowed read.
+
+Usage
+-----
+    python benchmarks/bench_pipeline.py --save-baseline
+    python benchmarks/bench_pipeline.py --compare --threshold 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+import matplotlib
+import numpy as np
+import rasterio
+from rasterio.transform import from_bounds
+
+from isohypseswallpaper import geometry, scale, srtm
+from isohypseswallpaper.presets import SCREEN_PRESETS
+from isohypseswallpaper.profiling import Profiler
+from isohypseswallpaper.wallpaper import generate_wallpaper
+
+from terrain import fractal_dem
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+LAT, LON = 46.5, 8.0
+SRTM_RESOLUTION_M = 30
+
+THEMES = {
+    "uniform": dict(background_color="#2a2a2a", contour_color="white"),
+    "gradient": dict(theme="lichen_forest"),
+}
+CONTOURS = {"no-contours": None, "contours": 50}
+
+MIN_ABSOLUTE_REGRESSION_S = 0.005
+"""Ignore slowdowns smaller than this, which are within timer noise."""
+
+
+def write_dem_tile(path: str, dem: np.ndarray, bbox: tuple) -> None:
+    """Write `dem` as an EPSG:4326 GeoTIFF covering `bbox`."""
+    lat_min, lat_max, lon_min, lon_max = bbox
+    transform = from_bounds(
+        lon_min, lat_min, lon_max, lat_max, dem.shape[1], dem.shape[0]
+    )
+    with rasterio.open(
+        path, "w", driver="GTiff", height=dem.shape[0], width=dem.shape[1],
+        count=1, dtype=dem.dtype, crs="EPSG:4326", transform=transform,
+    ) as dst:
+        dst.write(dem, 1)
+
+
+def bench_preset(preset: str, zoom: int, repeat: int) -> dict:
+    """Benchmark all cases of one preset; returns {case: result}."""
+    width, height = SCREEN_PRESETS[preset]
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # --- bbox ---
+        bbox_times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            m_per_px = scale.meters_per_pixel(LAT, zoom)
+            bbox = geometry.bounding_box(
+                LAT, LON, width * m_per_px, height * m_per_px
+            )
+            bbox_times.append(time.perf_counter() - start)
+
+        # --- DEM fetch (local synthetic tile, no download) ---
+        dem_shape = (
+            max(int(height * m_per_px / SRTM_RESOLUTION_M), 2),
+            max(int(width * m_per_px / SRTM_RESOLUTION_M), 2),
+        )
+        write_dem_tile(
+            os.path.join(tmpdir, "dem.tif"), fractal_dem(*dem_shape), bbox
+        )
+        fetch_times = []
+        with patch("elevation.clip"):
+            for _ in range(repeat):
+                start = time.perf_counter()
+                dem, _ = srtm.get_dem(*bbox, cache_dir=tmpdir)
+                fetch_times.append(time.perf_counter() - start)
+
+        # --- Render cases ---
+        output_path = os.path.join(tmpdir, "wallpaper.png")
+        for theme_name, colors in THEMES.items():
+            for contour_name, interval in CONTOURS.items():
+                stage_times: dict[str, list[float]] = {}
+                totals = []
+                for _ in range(repeat):
+                    profiler = Profiler(trace_memory=False)
+                    start = time.perf_counter()
+                    generate_wallpaper(
+                        dem_array=dem, lat=LAT, lon=LON, zoom_level=zoom,
+                        width=width, height=height, contour_interval=interval,
+                        output_path=output_path, profiler=profiler, **colors,
+                    )
+                    totals.append(time.perf_counter() - start)
+                    for record in profiler.stages:
+                        stage_times.setdefault(record["stage"], []).append(
+                            record["wall_s"]
+                        )
+
+                stages = {name: min(t) for name, t in stage_times.items()}
+                stages["bbox"] = min(bbox_times)
+                stages["dem_fetch"] = min(fetch_times)
+                results[f"{preset}/{theme_name}/{contour_name}"] = {
+                    "end_to_end_s": min(totals),
+                    "stages": stages,
+                }
+                print(
+                    f"{preset:>10} {theme_name:>8} {contour_name:>12}: "
+                    f"{min(totals) * 1000:8.1f} ms",
+                    flush=True,
+                )
+
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Return a description of every metric slower than baseline by > threshold."""
+    regressions = []
+    for case, base in baseline["cases"].items():
+        if case not in current["cases"]:
+            continue
+        cur = current["cases"][case]
+        metrics = [("end_to_end", base["end_to_end_s"], cur["end_to_end_s"])]
+        metrics += [
+            (stage, t, cur["stages"][stage])
+            for stage, t in base["stages"].items()
+            if stage in cur["stages"]
+        ]
+        for name, base_s, cur_s in metrics:
+            if (
+                cur_s > base_s * (1 + threshold)
+                and cur_s - base_s > MIN_ABSOLUTE_REGRESSION_S
+            ):
+                regressions.append(
+                    f"{case} {name}: {base_s * 1000:.1f} ms -> "
+                    f"{cur_s * 1000:.1f} ms (+{(cur_s / base_s - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--presets", nargs="+", default=list(SCREEN_PRESETS),
+        choices=list(SCREEN_PRESETS), help="Presets to benchmark",
+    )
+    parser.add_argument("--zoom", type=int, default=12, help="Zoom level")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (min is kept)")
+    parser.add_argument("--output", type=str, help="Write results to this JSON file")
+    parser.add_argument(
+        "--save-baseline", nargs="?", const=BASELINE_PATH, default=None,
+        help="Save results as the baseline",
+    )
+    parser.add_argument(
+        "--compare", nargs="?", const=BASELINE_PATH, default=None,
+        help="Compare against a baseline and fail on regressions",
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.2,
+        help="Allowed relative slowdown before a regression is reported",
+    )
+    args = parser.parse_args()
+
+    matplotlib.use("Agg")
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "matplotlib": matplotlib.__version__,
+            "machine": platform.machine(),
+            "zoom": args.zoom,
+            "repeat": args.repeat,
+        },
+        "cases": {},
+    }
+    for preset in args.presets:
+        results["cases"].update(bench_preset(preset, args.zoom, args.repeat))
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"Results written to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions above {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# /benchmarks/terrain.py
+
+"""
+Synthetic terrain for benchmarks.
+
+Generate DEMs with fractal (1/f) noise and SRTM-like value ranges, so the
+rendering pipeline can be benchmarked offline on realistic inputs.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+def fractal_dem(
+    height: int,
+    width: int,
+    elevation_range: tuple[float, float] = (200.0, 3800.0),
+    beta: float = 3.2,
+    ridged: bool = True,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Generate a fractal DEM by spectral synthesis.
+
+    White noise is filtered in the frequency domain with a power spectrum
+    falling off as ``1 / f**beta`` (beta around 3 gives natural-looking
+    relief), then rescaled to `elevation_range`.
+
+    Parameters
+    ----------
+    height, width : int
+        DEM shape in pixels.
+    elevation_range : (float, float)
+        Minimum and maximum elevation in meters.
+    beta : float
+        Spectral exponent; higher values give smoother terrain.
+    ridged : bool
+        Fold the noise around its median to produce sharp ridges and
+        valleys, as in mountain ranges.
+    seed : int
+        Random seed, for reproducible benchmarks.
+
+    Returns
+    -------
+    numpy.ndarray
+        int16 DEM, like SRTM tiles.
+    """
+    rng = np.random.default_rng(seed)
+    noise = rng.standard_normal((height, width))
+
+    fy = np.fft.fftfreq(height)[:, None]
+    fx = np.fft.rfftfreq(width)[None, :]
+    freq = np.hypot(fx, fy)
+    freq[0, 0] = 1.0  # avoid division by zero; mean removed below
+
+    spectrum = np.fft.rfft2(noise) / freq ** (beta / 2)
+    spectrum[0, 0] = 0.0
+    terrain = np.fft.irfft2(spectrum, s=(height, width))
+
+    if ridged:
+        terrain = -np.abs(terrain - np.median(terrain))
+
+    low, high = elevation_range
+    terrain -= terrain.min()
+    terrain *= (high - low) / (terrain.max() + 1e-9)
+    terrain += low
+    return terrain.astype(np.int16)
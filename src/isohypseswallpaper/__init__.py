@@ -0,0 +1,3 @@
+# /src/isohypseswallpaper/__init__.py
+
+__version__ = "0.3.0"
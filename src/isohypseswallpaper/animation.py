@@ -0,0 +1,473 @@
+# /src/isohypseswallpaper/animation.py
+
+"""
+Zoom and light-sweep animations.
+
+A zoom animation renders a continuous zoom (and optional pan) around a
+centre. One DEM covering every frame is fetched once and kept as a
+pyramid of block-averaged levels; each frame is cropped and resampled
+from the level closest to its scale, and frames are rendered in
+parallel worker processes.
+
+A light sweep keeps the terrain fixed and moves the light, e.g. along
+the sun's path through a day. Resampling, surface normals and contour
+lines are computed once; each frame only shades the normals, colors
+and encodes.
+
+Frames are written as a numbered PNG sequence, or as an animated WebP or
+APNG when the output path ends in ``.webp`` or ``.apng``.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from PIL import Image
+
+from . import __version__, geometry, metadata, scale, srtm, wallpaper
+from .renderer import RenderedImage, Renderer
+
+
+ANIMATED_FORMATS = {".webp": "WEBP", ".apng": "PNG"}
+
+DEFAULT_FRAMES = 48
+DEFAULT_FPS = 24
+
+
+@dataclass(frozen=True)
+class Frame:
+    """
+    One animation frame: centre and fractional zoom level.
+    """
+
+    index: int
+    lat: float
+    lon: float
+    zoom_level: float
+
+
+def zoom_frames(
+    lat: float,
+    lon: float,
+    zoom_from: float,
+    zoom_to: float,
+    n_frames: int = DEFAULT_FRAMES,
+    pan_to: tuple[float, float] | None = None,
+) -> list[Frame]:
+    """
+    Return the frames of a continuous zoom from `zoom_from` to `zoom_to`.
+
+    The zoom level is interpolated linearly, so the scale changes by a
+    constant factor per frame. With `pan_to` (lat, lon), the centre moves
+    linearly from (`lat`, `lon`) to it over the sequence.
+    """
+    if n_frames < 1:
+        raise ValueError("n_frames must be at least 1")
+
+    end_lat, end_lon = pan_to if pan_to is not None else (lat, lon)
+    steps = np.linspace(0, 1, n_frames) if n_frames > 1 else np.zeros(1)
+    return [
+        Frame(
+            index=i,
+            lat=float(lat + (end_lat - lat) * t),
+            lon=float(lon + (end_lon - lon) * t),
+            zoom_level=float(zoom_from + (zoom_to - zoom_from) * t),
+        )
+        for i, t in enumerate(steps)
+    ]
+
+
+def frame_bbox(frame: Frame, width: int, height: int) -> tuple[float, float, float, float]:
+    """
+    Return the (lat_min, lat_max, lon_min, lon_max) bounding box of a frame.
+    """
+    m_per_px = scale.meters_per_pixel(frame.lat, frame.zoom_level)
+    return geometry.bounding_box(frame.lat, frame.lon, width * m_per_px, height * m_per_px)
+
+
+def covering_bbox(
+    frames: list[Frame], width: int, height: int
+) -> tuple[float, float, float, float]:
+    """
+    Return the bounding box covering every frame.
+    """
+    boxes = np.array([frame_bbox(f, width, height) for f in frames])
+    return (
+        float(boxes[:, 0].min()),
+        float(boxes[:, 1].max()),
+        float(boxes[:, 2].min()),
+        float(boxes[:, 3].max()),
+    )
+
+
+def downsample(dem: np.ndarray) -> np.ndarray:
+    """
+    Halve the DEM resolution by averaging 2x2 blocks (a trailing odd row
+    or column is dropped).
+    """
+    h, w = dem.shape[0] // 2 * 2, dem.shape[1] // 2 * 2
+    return dem[:h, :w].reshape(h // 2, 2, w // 2, 2).mean(axis=(1, 3))
+
+
+class DemPyramid:
+    """
+    Multi-resolution DEM: level k averages 2^k x 2^k blocks of level 0.
+
+    Parameters
+    ----------
+    dem_array : numpy.ndarray
+        DEM covering every frame.
+    transform : affine.Affine
+        North-up geotransform of `dem_array` (``dem_meta["transform"]``).
+    min_size : int
+        Coarser levels are not built once a side would drop below it.
+    """
+
+    def __init__(self, dem_array: np.ndarray, transform, min_size: int = 64) -> None:
+        self.transform = transform
+        self.levels = [np.asarray(dem_array, dtype=np.float64)]
+        while min(self.levels[-1].shape) >= 2 * min_size:
+            self.levels.append(downsample(self.levels[-1]))
+
+    def dem_range(self) -> tuple[float, float]:
+        """
+        Return the (min, max) elevation of the whole DEM.
+        """
+        return float(self.levels[0].min()), float(self.levels[0].max())
+
+    def sample(self, frame: Frame, width: int, height: int) -> np.ndarray:
+        """
+        Resample the DEM onto the Web Mercator pixel grid of `frame`,
+        reading from the coarsest level that still has at least one sample
+        per output pixel.
+        """
+        t = self.transform
+        lon, lat = scale.pixel_grid(frame.lat, frame.lon, frame.zoom_level, width, height)
+
+        # Output pixel centres, in fractional level-0 pixel centre positions
+        rows = (lat - t.f) / t.e - 0.5
+        cols = (lon - t.c) / t.a - 0.5
+
+        # Source pixels per output pixel along the finer axis
+        step = min(abs(rows[-1] - rows[0]) / max(height - 1, 1),
+                   abs(cols[-1] - cols[0]) / max(width - 1, 1))
+        level = int(math.floor(math.log2(step))) if step >= 1 else 0
+        level = min(level, len(self.levels) - 1)
+        factor = 2**level
+        dem = self.levels[level]
+
+        return wallpaper.apply_plan(
+            dem,
+            wallpaper.linear_plan((rows + 0.5) / factor - 0.5, dem.shape[0]),
+            wallpaper.linear_plan((cols + 0.5) / factor - 0.5, dem.shape[1]),
+        )
+
+
+def render_frame(
+    renderer: Renderer,
+    pyramid: DemPyramid,
+    frame: Frame,
+    width: int,
+    height: int,
+    dem_range: tuple[float, float],
+    contour_interval: float | None = None,
+    background_color: str | list[str] = "#2a2a2a",
+    contour_color: str | list[str] = "white",
+    dem_source: str = "SRTM1",
+    dem_resolution: int = 30,
+    theme: str | None = None,
+) -> RenderedImage:
+    """
+    Render one frame from the pyramid.
+
+    Colors and contour levels use the fixed `dem_range` of the whole
+    animation, so they do not shift from frame to frame. `theme` only
+    names the theme of the colors in the embedded metadata.
+    """
+    dem = pyramid.sample(frame, width, height)
+    dem_norm, dem_min, dem_max = wallpaper.normalize_dem(dem, dem_range)
+    layers = {
+        "dem": dem,
+        "hillshade": wallpaper.compute_hillshade(dem),
+        "dem_norm": dem_norm,
+        "dem_range": np.array([dem_min, dem_max]),
+    }
+    image = renderer.composite(
+        layers,
+        contour_interval=contour_interval,
+        background_color=background_color,
+        contour_color=contour_color,
+    )
+    exif_dict = wallpaper.wallpaper_metadata(
+        frame.lat,
+        frame.lon,
+        frame.zoom_level,
+        width,
+        height,
+        contour_interval,
+        background_color,
+        contour_color,
+        dem_source=dem_source,
+        dem_resolution=dem_resolution,
+        theme=theme,
+    )
+    return RenderedImage(image=image, metadata=exif_dict)
+
+
+def frame_path(output: str, index: int) -> str:
+    """
+    Return the path of frame `index` of a PNG sequence:
+    ``zoom.png`` becomes ``zoom_0000.png``, ``zoom_0001.png``, ...
+    """
+    root, ext = os.path.splitext(output)
+    return f"{root}_{index:04d}{ext or '.png'}"
+
+
+# Per-process state of frame workers, set by _init_worker
+_WORKER: dict = {}
+
+
+def _init_worker(pyramid: DemPyramid, options: dict) -> None:
+    _WORKER.update(pyramid=pyramid, options=options, renderer=Renderer())
+
+
+def _render_task(frame: Frame, path: str | None) -> RenderedImage | str:
+    rendered = render_frame(
+        _WORKER["renderer"], _WORKER["pyramid"], frame, **_WORKER["options"]
+    )
+    if path is None:
+        return rendered
+    rendered.save(path)
+    return path
+
+
+def render_zoom_animation(
+    dem_array: np.ndarray,
+    dem_meta: dict,
+    frames: list[Frame],
+    width: int,
+    height: int,
+    output: str,
+    contour_interval: float | None = None,
+    background_color: str | list[str] = "#2a2a2a",
+    contour_color: str | list[str] = "white",
+    theme: str | None = None,
+    fps: float = DEFAULT_FPS,
+    workers: int | None = None,
+    dem_source: str = "SRTM1",
+    dem_resolution: int = 30,
+) -> list[str]:
+    """
+    Render `frames` from one DEM covering all of them.
+
+    Parameters
+    ----------
+    dem_array, dem_meta : numpy.ndarray, dict
+        DEM covering `covering_bbox(frames, width, height)` and its
+        rasterio metadata, as returned by `srtm.get_dem`.
+    output : str
+        Animated WebP or APNG path (``.webp``, ``.apng``); any other path
+        is the base name of a numbered PNG sequence (see `frame_path`).
+    fps : float
+        Frame rate of animated outputs.
+    workers : int | None
+        Number of worker processes (default: CPU count). 1 renders in
+        the calling process.
+
+    Returns
+    -------
+    list[str]
+        Written paths: the animation, or every frame of the sequence.
+    """
+    background_color, contour_color = wallpaper.theme_colors(
+        theme, background_color, contour_color
+    )
+    pyramid = DemPyramid(dem_array, dem_meta["transform"])
+    options = {
+        "width": width,
+        "height": height,
+        "dem_range": srtm.stats_range(dem_meta) or pyramid.dem_range(),
+        "contour_interval": contour_interval,
+        "background_color": background_color,
+        "contour_color": contour_color,
+        "dem_source": dem_source,
+        "dem_resolution": dem_resolution,
+        "theme": theme,
+    }
+
+    animated_format = ANIMATED_FORMATS.get(os.path.splitext(output)[1].lower())
+    paths = [None if animated_format else frame_path(output, f.index) for f in frames]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(frames) == 1:
+        _init_worker(pyramid, options)
+        results = [_render_task(f, p) for f, p in zip(frames, paths)]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(frames)),
+            initializer=_init_worker,
+            initargs=(pyramid, options),
+        ) as executor:
+            results = list(executor.map(_render_task, frames, paths))
+
+    if animated_format is None:
+        return results
+    save_animation(results, output, fps)
+    return [output]
+
+
+def save_animation(frames: list[RenderedImage], output: str, fps: float) -> None:
+    """
+    Write rendered frames as an animated WebP or APNG, depending on the
+    extension of `output`. APNGs embed the metadata of the first frame.
+    """
+    animated_format = ANIMATED_FORMATS[os.path.splitext(output)[1].lower()]
+    images = [Image.fromarray(f.image) for f in frames]
+    save_options = {
+        "format": animated_format,
+        "save_all": True,
+        "append_images": images[1:],
+        "duration": round(1000 / fps),
+        "loop": 0,
+    }
+    if animated_format == "PNG":
+        save_options["pnginfo"] = metadata.png_info(frames[0].metadata, __version__)
+    else:
+        save_options["quality"] = 90
+    images[0].save(output, **save_options)
+
+
+def sun_path(
+    n_frames: int,
+    azimuth: tuple[float, float] = (90.0, 270.0),
+    altitude: tuple[float, float] = (5.0, 60.0),
+) -> list[tuple[float, float]]:
+    """
+    Return `n_frames` (azimuth, altitude) light positions of a simplified
+    day: the azimuth sweeps linearly from sunrise to sunset (east to west
+    by default) while the altitude rises from `altitude[0]` to
+    `altitude[1]` at midday and sets again.
+    """
+    if n_frames < 1:
+        raise ValueError("n_frames must be at least 1")
+
+    steps = np.linspace(0, 1, n_frames) if n_frames > 1 else np.full(1, 0.5)
+    az0, az1 = azimuth
+    alt0, alt1 = altitude
+    return [
+        (float(az0 + (az1 - az0) * t), float(alt0 + (alt1 - alt0) * math.sin(math.pi * t)))
+        for t in steps
+    ]
+
+
+def render_light_sweep(
+    dem_array: np.ndarray,
+    lat: float,
+    lon: float,
+    zoom_level: int,
+    width: int,
+    height: int,
+    lights: list[tuple[float, float]],
+    output: str,
+    contour_interval: float | None = None,
+    background_color: str | list[str] = "#2a2a2a",
+    contour_color: str | list[str] = "white",
+    theme: str | None = None,
+    fps: float = DEFAULT_FPS,
+    workers: int | None = None,
+    dem_source: str = "SRTM1",
+    dem_resolution: int = 30,
+    renderer: Renderer | None = None,
+    dem_transform: tuple | None = None,
+) -> list[str]:
+    """
+    Render one frame per (azimuth, altitude) light in `lights`, with the
+    terrain fixed.
+
+    The resampled DEM comes from the `renderer`'s layer cache, and the
+    surface normals and contour overlay are computed once, so each frame
+    costs one shading pass, colorization and encoding. Frames of a PNG
+    sequence are encoded by `workers` threads. As in
+    `wallpaper.generate_wallpaper`, a `dem_transform` reprojects the DEM
+    onto the Web Mercator pixel grid.
+
+    Returns
+    -------
+    list[str]
+        Written paths: the animation, or every frame of the sequence.
+    """
+    background_color, contour_color = wallpaper.theme_colors(
+        theme, background_color, contour_color
+    )
+    renderer = renderer if renderer is not None else Renderer()
+
+    layers = renderer.layers(
+        dem_array, width, height,
+        view=wallpaper.mercator_view(lat, lon, zoom_level, dem_transform),
+    )
+    normals = wallpaper.surface_normals(layers["dem"])
+    overlay = None
+    if contour_interval is not None:
+        overlay = renderer.contour_overlay(layers, contour_interval, contour_color)
+
+    animated = os.path.splitext(output)[1].lower() in ANIMATED_FORMATS
+    rgb = np.empty((height, width, 3))
+    frames, writes = [], []
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        for index, (azdeg, altdeg) in enumerate(lights):
+            hillshade = wallpaper.shade_normals(normals, azdeg, altdeg)
+            wallpaper.colorize(hillshade, layers["dem_norm"], background_color, out=rgb)
+            if overlay is not None:
+                alpha = overlay[..., 3:]
+                rgb *= 1 - alpha
+                rgb += overlay[..., :3] * alpha
+
+            rendered = RenderedImage(
+                image=np.rint(rgb * 255).astype(np.uint8),
+                metadata=wallpaper.wallpaper_metadata(
+                    lat,
+                    lon,
+                    zoom_level,
+                    width,
+                    height,
+                    contour_interval,
+                    background_color,
+                    contour_color,
+                    dem_source=dem_source,
+                    dem_resolution=dem_resolution,
+                    light=(azdeg, altdeg),
+                    theme=theme,
+                ),
+            )
+            if animated:
+                frames.append(rendered)
+            else:
+                path = frame_path(output, index)
+                writes.append(executor.submit(rendered.save, path))
+                frames.append(path)
+
+    if not animated:
+        for write in writes:
+            write.result()
+        return frames
+    save_animation(frames, output, fps)
+    return [output]
+
+
+def fetch_animation_dem(
+    frames: list[Frame],
+    width: int,
+    height: int,
+    resolution: int = 30,
+    tiles_dir: str | None = None,
+) -> tuple[np.ndarray, dict]:
+    """
+    Fetch the DEM covering every frame (see `srtm.get_dem`).
+    """
+    return srtm.get_dem(
+        *covering_bbox(frames, width, height), resolution=resolution, tiles_dir=tiles_dir
+    )
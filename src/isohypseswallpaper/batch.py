@@ -0,0 +1,411 @@
+# /src/isohypseswallpaper/batch.py
+
+"""
+Batch generation of wallpapers.
+
+Expand a TOML configuration (locations x zoom levels x themes) into jobs
+and render them, skipping outputs whose generation parameters have not
+changed since the last run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tomllib
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from isohypseswallpaper import (
+    __version__,
+    encoders,
+    geometry,
+    metadata,
+    profiling,
+    scale,
+    srtm,
+    wallpaper,
+)
+from isohypseswallpaper.cache import StageCache, stage_key
+from isohypseswallpaper.contours import ContourBudget
+
+from .presets import SCREEN_PRESETS
+
+
+MANIFEST_NAME = ".isohypses-manifest.json"
+"""
+Default manifest file name, stored next to the batch configuration.
+"""
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    """
+    Parameters of a single wallpaper in a batch.
+    """
+
+    lat: float
+    lon: float
+    zoom_level: int
+    width: int
+    height: int
+    output: str
+    contour_interval: float | None = None
+    background_color: str = "#2a2a2a"
+    contour_color: str = "white"
+    theme: str | None = None
+    contour_budget: int | None = None
+    min_ring_area: float = 0.0
+    encoder: str | None = None
+
+    def params(self) -> dict:
+        """
+        Return the generation parameters (everything except the output path).
+        """
+        params = asdict(self)
+        del params["output"]
+        return params
+
+
+def job_hash(job: BatchJob) -> str:
+    """
+    Hash the generation parameters of `job` together with the code version.
+
+    The colours are hashed as resolved from the theme, so editing a theme
+    re-renders the jobs using it.
+    """
+    params = job.params()
+    params["background_color"], params["contour_color"] = wallpaper.theme_colors(
+        job.theme, job.background_color, job.contour_color
+    )
+    return stage_key(version=__version__, **params)
+
+
+def expand_config(config: dict, base_dir: str = ".") -> list[BatchJob]:
+    """
+    Expand a batch configuration into jobs.
+
+    Top-level keys act as defaults for every entry of ``locations``; each
+    location may override them. Every location is rendered for each of its
+    ``zoom_levels`` and ``themes``, and outputs are named automatically as
+    ``<name>_z<zoom>_<theme>.png`` in ``output_dir`` (``.webp`` with a
+    WebP ``encoder``).
+    """
+    defaults = {k: v for k, v in config.items() if k != "locations"}
+    jobs = []
+
+    for index, location in enumerate(config.get("locations", [])):
+        entry = {**defaults, **location}
+        name = entry.get("name", f"location{index}")
+
+        preset = entry.get("preset")
+        if preset:
+            width, height = SCREEN_PRESETS[preset]
+        else:
+            if "width" not in entry or "height" not in entry:
+                raise ValueError(
+                    f"Location '{name}': either preset or both width and height "
+                    "must be provided"
+                )
+            width, height = entry["width"], entry["height"]
+
+        output_dir = os.path.join(base_dir, entry.get("output_dir", "."))
+        zoom_levels = entry.get("zoom_levels", [entry.get("zoom_level")])
+        theme_names = entry.get("themes", [entry.get("theme")])
+        encoder = entry.get("encoder")
+        extension = encoders.file_extension(encoder) if encoder else ".png"
+
+        for zoom_level in zoom_levels:
+            if zoom_level is None:
+                raise ValueError(f"Location '{name}': no zoom level given")
+            for theme in theme_names:
+                filename = f"{name}_z{zoom_level}_{theme or 'custom'}{extension}"
+                jobs.append(
+                    BatchJob(
+                        lat=float(entry["lat"]),
+                        lon=float(entry["lon"]),
+                        zoom_level=int(zoom_level),
+                        width=width,
+                        height=height,
+                        output=os.path.join(output_dir, filename),
+                        contour_interval=entry.get("contour"),
+                        background_color=entry.get("bgcolor", "#2a2a2a"),
+                        contour_color=entry.get("contour_color", "white"),
+                        theme=theme,
+                        contour_budget=entry.get("contour_budget"),
+                        min_ring_area=float(entry.get("min_ring_area", 0.0)),
+                        encoder=encoder,
+                    )
+                )
+
+    return jobs
+
+
+def load_jobs(config_path: str) -> list[BatchJob]:
+    """
+    Read a TOML batch configuration and expand it into jobs.
+
+    Relative output directories are resolved against the config file.
+    """
+    with open(config_path, "rb") as f:
+        config = tomllib.load(f)
+    return expand_config(config, base_dir=os.path.dirname(config_path))
+
+
+def load_manifest(manifest_path: str) -> dict[str, str]:
+    """
+    Return the manifest mapping output paths to parameter hashes.
+    """
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)["outputs"]
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(manifest_path: str, outputs: dict[str, str]) -> None:
+    """
+    Atomically write the manifest to `manifest_path`.
+    """
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": __version__, "outputs": outputs}, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def is_up_to_date(
+    job: BatchJob,
+    manifest: dict[str, str],
+    check_png: bool = False,
+) -> bool:
+    """
+    Return True if the output of `job` exists and was generated with the
+    same parameters.
+
+    By default the hash recorded in the manifest is compared. With
+    `check_png`, the hash embedded in the PNG text chunks is used instead,
+    which only reads the chunk headers, never the pixels.
+    """
+    if not os.path.exists(job.output):
+        return False
+
+    expected = job_hash(job)
+    if check_png:
+        try:
+            embedded = metadata.read_exif_metadata(job.output)
+        except (OSError, ValueError, SyntaxError):
+            # Truncated or unreadable outputs are rendered again
+            return False
+        return embedded.get("IsohypsesWallpaper:ParamsHash") == expected
+
+    return manifest.get(os.path.abspath(job.output)) == expected
+
+
+def job_bbox(job: BatchJob) -> tuple[float, float, float, float]:
+    """
+    Return the (lat_min, lat_max, lon_min, lon_max) area covered by `job`.
+    """
+    m_per_px = scale.meters_per_pixel(job.lat, job.zoom_level)
+    return geometry.bounding_box(
+        job.lat, job.lon, job.width * m_per_px, job.height * m_per_px
+    )
+
+
+def render_job(
+    job: BatchJob,
+    cache: StageCache | None = None,
+    profiler: profiling.Profiler | None = None,
+    dem: tuple[np.ndarray, dict] | None = None,
+) -> None:
+    """
+    Fetch the DEM for `job` and render its wallpaper.
+
+    A `dem` already fetched for `job_bbox(job)` (array and metadata, as
+    returned by `srtm.get_dem`) is used instead of fetching it again.
+    """
+    if dem is None:
+        with profiling.stage(profiler, "bbox"):
+            bbox = job_bbox(job)
+        with profiling.stage(profiler, "dem_fetch"):
+            dem = srtm.get_dem(*bbox, resolution=30)
+    dem_array, dem_meta = dem
+
+    os.makedirs(os.path.dirname(job.output) or ".", exist_ok=True)
+    wallpaper.generate_wallpaper(
+        dem_array=dem_array,
+        lat=job.lat,
+        lon=job.lon,
+        zoom_level=job.zoom_level,
+        width=job.width,
+        height=job.height,
+        contour_interval=job.contour_interval,
+        background_color=job.background_color,
+        contour_color=job.contour_color,
+        theme=job.theme,
+        dem_source="SRTM1",
+        dem_resolution=30,
+        output_path=job.output,
+        cache=cache,
+        params_hash=job_hash(job),
+        profiler=profiler,
+        dem_transform=dem_meta.get("transform"),
+        contour_budget=contour_budget(job),
+        dem_range=srtm.stats_range(dem_meta),
+        encoder=job.encoder,
+    )
+
+
+def contour_budget(job: BatchJob) -> ContourBudget | None:
+    """
+    Return the contour budget of `job`, or None if it has none.
+
+    Unattended runs can set ``contour_budget`` (maximum contour vertices)
+    and ``min_ring_area`` (square pixels) to bound contour cost on rugged
+    terrain whatever the interval asked for.
+    """
+    if job.contour_budget is None and not job.min_ring_area:
+        return None
+    return ContourBudget(max_vertices=job.contour_budget, min_ring_area=job.min_ring_area)
+
+
+def run_batch(
+    jobs: list[BatchJob],
+    manifest_path: str,
+    check_png: bool = False,
+    force: bool = False,
+    cache: StageCache | None = None,
+    profile_path: str | None = None,
+) -> dict[str, list[BatchJob]]:
+    """
+    Render every job whose output is missing or out of date.
+
+    The manifest is updated after each rendered job, so an interrupted run
+    keeps its progress. With `profile_path` (a ``.jsonl`` file), one
+    profiling report per rendered job is appended to it.
+
+    Returns
+    -------
+    dict
+        ``{"rendered": [...], "skipped": [...]}``
+    """
+    manifest = load_manifest(manifest_path)
+    result = {"rendered": [], "skipped": []}
+
+    for job in jobs:
+        if not force and is_up_to_date(job, manifest, check_png=check_png):
+            result["skipped"].append(job)
+            continue
+
+        profiler = profiling.Profiler() if profile_path else None
+        render_job(job, cache=cache, profiler=profiler)
+        if profiler is not None:
+            profiler.stop()
+            profiler.write(profile_path, output=job.output, **job.params())
+        manifest[os.path.abspath(job.output)] = job_hash(job)
+        save_manifest(manifest_path, manifest)
+        result["rendered"].append(job)
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a batch of wallpapers from a TOML configuration."
+    )
+    parser.add_argument("config", type=str, help="Path to the TOML configuration")
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default=None,
+        help=f"Manifest path (default: {MANIFEST_NAME} next to the config)",
+    )
+    parser.add_argument(
+        "--check-png",
+        action="store_true",
+        help="Compare against the hash embedded in existing PNGs",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Re-render all outputs"
+    )
+    parser.add_argument(
+        "--stage-cache",
+        type=str,
+        default=None,
+        help="Directory for cached terrain layers (resampled DEM, hillshade)",
+    )
+
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        help="Append per-stage timings and peak memory to this JSONL file",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Overlap DEM fetches, rendering and writing in separate thread pools",
+    )
+    parser.add_argument(
+        "--io-workers",
+        type=int,
+        default=2,
+        help="Concurrent DEM downloads or tile reads with --pipeline",
+    )
+    parser.add_argument(
+        "--cpu-workers",
+        type=int,
+        default=None,
+        help="Render threads with --pipeline (default: CPU count)",
+    )
+
+    args = parser.parse_args()
+    if args.pipeline and args.profile:
+        parser.error("--profile cannot be used with --pipeline")
+
+    jobs = load_jobs(args.config)
+    manifest_path = args.manifest or os.path.join(
+        os.path.dirname(args.config), MANIFEST_NAME
+    )
+    cache = StageCache(args.stage_cache) if args.stage_cache else None
+
+    if args.pipeline:
+        from isohypseswallpaper.pipeline import RenderPipeline, run_batch_pipelined
+
+        render_pipeline = RenderPipeline(
+            io_workers=args.io_workers, cpu_workers=args.cpu_workers, cache=cache
+        )
+        result = run_batch_pipelined(
+            jobs,
+            manifest_path=manifest_path,
+            check_png=args.check_png,
+            force=args.force,
+            render_pipeline=render_pipeline,
+        )
+    else:
+        result = run_batch(
+            jobs,
+            manifest_path=manifest_path,
+            check_png=args.check_png,
+            force=args.force,
+            cache=cache,
+            profile_path=args.profile,
+        )
+
+    for job in result["rendered"]:
+        print(f"Wallpaper saved to {job.output}")
+    print(
+        f"{len(result['rendered'])} rendered, "
+        f"{len(result['skipped'])} up to date"
+    )
+    if args.pipeline:
+        for job, error in result["failed"]:
+            print(f"Render of {job.output} failed: {error}")
+        if result["failed"]:
+            print(f"{len(result['failed'])} failed")
+        print(render_pipeline.pipeline.format_report())
+
+
+if __name__ == "__main__":
+    main()
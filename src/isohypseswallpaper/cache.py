@@ -0,0 +1,238 @@
+# /src/isohypseswallpaper/cache.py
+
+"""
+Stage cache utilities.
+
+Store intermediate terrain layers (resampled DEM, hillshade, normalized DEM)
+on disk as ``.npy`` files, keyed by a hash of the parameters that produced
+them. Cached layers are loaded back as read-only memory maps.
+
+`MemoryCache` offers the same interface in memory, for long-running
+processes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+DEFAULT_BUDGET_BYTES = 2 * 1024**3
+"""
+Default on-disk budget of the stage cache (2 GiB).
+"""
+
+
+def array_digest(array: np.ndarray) -> str:
+    """
+    Return a short content hash identifying a numpy array.
+
+    The dtype and shape are part of the digest, so two arrays with the
+    same bytes but a different layout do not collide.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(array.dtype).encode())
+    digest.update(repr(array.shape).encode())
+    digest.update(np.ascontiguousarray(array).data)
+    return digest.hexdigest()
+
+
+def stage_key(**params) -> str:
+    """
+    Hash keyword parameters into a stable cache key.
+    """
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class StageCache:
+    """
+    On-disk cache of intermediate layers with a size budget.
+
+    Each entry is a directory named after its key, holding one ``.npy``
+    file per layer. When the total size exceeds ``budget_bytes``, the least
+    recently used entries are removed.
+
+    Parameters
+    ----------
+    cache_dir : str | None
+        Directory holding the cache entries. Defaults to a folder in the
+        system temporary directory.
+    budget_bytes : int
+        Maximum total size of the cache on disk.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | None = None,
+        budget_bytes: int = DEFAULT_BUDGET_BYTES,
+    ) -> None:
+        if cache_dir is None:
+            cache_dir = os.path.join(
+                tempfile.gettempdir(), "isohypseswallpaper_stages"
+            )
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.budget_bytes = budget_bytes
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key: str, names: list[str]) -> dict[str, np.ndarray] | None:
+        """
+        Return the layers stored under `key` as read-only memory maps,
+        or None if the entry (or any of the requested layers) is missing.
+        """
+        entry = self._entry_dir(key)
+        try:
+            layers = {
+                name: np.load(os.path.join(entry, f"{name}.npy"), mmap_mode="r")
+                for name in names
+            }
+        except FileNotFoundError:
+            return None
+
+        # Mark the entry as recently used
+        os.utime(entry)
+        return layers
+
+    def store(self, key: str, layers: dict[str, np.ndarray]) -> None:
+        """
+        Write `layers` under `key`, then evict old entries over budget.
+        """
+        entry = self._entry_dir(key)
+        tmp_entry = tempfile.mkdtemp(prefix=f".{key}-", dir=self.cache_dir)
+        for name, array in layers.items():
+            np.save(os.path.join(tmp_entry, f"{name}.npy"), np.asarray(array))
+
+        try:
+            os.replace(tmp_entry, entry)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+        self.evict()
+
+    def size_bytes(self) -> int:
+        """
+        Return the total size of all cache entries in bytes.
+        """
+        return sum(size for _, _, size in self._entries())
+
+    def evict(self) -> None:
+        """
+        Remove least recently used entries until the cache fits its budget.
+        """
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total <= self.budget_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def _entries(self) -> list[tuple[str, float, int]]:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)
+            )
+            entries.append((path, os.path.getmtime(path), size))
+        return entries
+
+
+def nbytes(value) -> int:
+    """
+    Return the size in bytes of the numpy arrays held by `value`
+    (an array, or a dict, list or tuple of them).
+    """
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(nbytes(v) for v in value)
+    return 0
+
+
+class MemoryCache:
+    """
+    Thread-safe in-memory LRU cache with a size budget.
+
+    Sizes are counted from the numpy arrays held by each value. Besides
+    `get` and `put`, it implements `load` and `store` like `StageCache`,
+    so it can be passed as the layer cache of `generate_wallpaper`.
+
+    Parameters
+    ----------
+    budget_bytes : int
+        Maximum total size of the cached arrays.
+    """
+
+    def __init__(self, budget_bytes: int = DEFAULT_BUDGET_BYTES) -> None:
+        self.budget_bytes = budget_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Return the value stored under `key`, or None.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key, value) -> None:
+        """
+        Store `value` under `key`, evicting least recently used entries.
+        """
+        size = nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._size > self.budget_bytes and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def load(self, key: str, names: list[str]) -> dict[str, np.ndarray] | None:
+        """
+        Return the layers stored under `key`, or None (`StageCache` interface).
+        """
+        layers = self.get(key)
+        if layers is None or any(name not in layers for name in names):
+            return None
+        return layers
+
+    def store(self, key: str, layers: dict[str, np.ndarray]) -> None:
+        """
+        Store layers under `key` (`StageCache` interface).
+        """
+        self.put(key, layers)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def size_bytes(self) -> int:
+        """
+        Return the total size of the cached arrays in bytes.
+        """
+        return self._size
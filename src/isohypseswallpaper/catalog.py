@@ -0,0 +1,404 @@
+# /src/isohypseswallpaper/catalog.py
+
+"""
+Catalog of generated wallpapers.
+
+Index a library of wallpapers in a local SQLite database from the
+metadata they embed, without decoding pixels: PNG text chunks are found
+by scanning chunk headers (see `metadata.read_png_text`), and WebP EXIF
+is read from the file header. Rescans only re-read files whose size or
+modification time changed, and drop files that are gone.
+
+Queries filter by bounding box (through an R*Tree), zoom level, theme and
+generation date. The footprint of each wallpaper is recomputed from its
+centre, zoom level and size on the Web Mercator grid. Themes are read
+from the embedded theme name; for files written before it was embedded,
+they are recognised from the background and contour colors.
+
+Usage
+-----
+    isohypses-wallpaper-catalog scan ~/Pictures/isohypses --db catalog.sqlite
+    isohypses-wallpaper-catalog query --db catalog.sqlite --zoom 12 --theme mono_ink \\
+        --bbox 45.8 47.8 6.0 10.5 --since 2026-01-01
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import os
+import sqlite3
+from dataclasses import dataclass
+
+from . import metadata, scale, themes
+
+
+IMAGE_EXTENSIONS = (".png", ".webp")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    indexed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS wallpapers (
+    id INTEGER PRIMARY KEY REFERENCES files (id) ON DELETE CASCADE,
+    generated_at TEXT,
+    lat REAL,
+    lon REAL,
+    zoom_level REAL,
+    width INTEGER,
+    height INTEGER,
+    contour_interval REAL,
+    background_color TEXT,
+    contour_color TEXT,
+    theme TEXT,
+    version TEXT,
+    params_hash TEXT,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS wallpapers_zoom ON wallpapers (zoom_level);
+CREATE INDEX IF NOT EXISTS wallpapers_theme ON wallpapers (theme);
+CREATE INDEX IF NOT EXISTS wallpapers_generated_at ON wallpapers (generated_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS footprints USING rtree (
+    id, lat_min, lat_max, lon_min, lon_max
+);
+"""
+
+PREFIX = "IsohypsesWallpaper:"
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """
+    A wallpaper of the catalog.
+
+    `metadata` holds every embedded field, as written by
+    `metadata.build_exif_metadata`.
+    """
+
+    path: str
+    lat: float
+    lon: float
+    zoom_level: float
+    width: int
+    height: int
+    theme: str | None
+    generated_at: str | None
+    metadata: dict[str, str]
+
+
+@dataclass
+class ScanResult:
+    """Number of files added, updated, unchanged and removed by a scan."""
+
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+
+@functools.cache
+def theme_by_colors() -> dict[tuple[str, str], str]:
+    """
+    Map the (background, contour) color strings embedded by
+    `wallpaper.wallpaper_metadata` to theme names, to recognise the theme
+    of files that do not embed its name.
+    """
+    return {
+        (str(theme["background"]), str(theme["contour"])): name
+        for name, theme in themes.THEMES.items()
+    }
+
+
+def footprint(
+    lat: float, lon: float, zoom_level: float, width: int, height: int
+) -> tuple[float, float, float, float]:
+    """
+    Return the (lat_min, lat_max, lon_min, lon_max) covered by a
+    wallpaper on the Web Mercator grid of its zoom level.
+    """
+    world_px = 256 * 2**zoom_level
+    cx, cy = scale.lonlat_to_world(lon, lat)
+    lon_min, lat_max = scale.world_to_lonlat(cx - width / 2 / world_px, cy - height / 2 / world_px)
+    lon_max, lat_min = scale.world_to_lonlat(cx + width / 2 / world_px, cy + height / 2 / world_px)
+    return float(lat_min), float(lat_max), float(lon_min), float(lon_max)
+
+
+def parse_fields(exif_dict: dict[str, str]) -> dict | None:
+    """
+    Parse the embedded metadata back into typed catalog fields, or None
+    if it is not wallpaper metadata.
+    """
+    def number(key: str, kind=float):
+        try:
+            return kind(exif_dict[PREFIX + key])
+        except (KeyError, ValueError):
+            return None
+
+    fields = {
+        "lat": number("Latitude"),
+        "lon": number("Longitude"),
+        "zoom_level": number("ZoomLevel"),
+        "width": number("WidthPx", int),
+        "height": number("HeightPx", int),
+    }
+    if any(value is None for value in fields.values()):
+        return None
+
+    background = exif_dict.get(PREFIX + "BackgroundColor")
+    contour = exif_dict.get(PREFIX + "ContourColor")
+    fields.update({
+        "generated_at": exif_dict.get(PREFIX + "GeneratedAt"),
+        "contour_interval": number("ContourIntervalM"),
+        "background_color": background,
+        "contour_color": contour,
+        "theme": (
+            exif_dict.get(PREFIX + "Theme")
+            or theme_by_colors().get((background, contour))
+        ),
+        "version": exif_dict.get(PREFIX + "Version"),
+        "params_hash": exif_dict.get(PREFIX + "ParamsHash"),
+        "metadata": json.dumps(exif_dict),
+    })
+    return fields
+
+
+def read_fields(path: str) -> dict | None:
+    """
+    Read and parse the metadata of one image, or None if it has none or
+    cannot be read.
+    """
+    try:
+        exif_dict = metadata.read_exif_metadata(path)
+    except (OSError, ValueError, SyntaxError):
+        return None
+    return parse_fields(exif_dict)
+
+
+class Catalog:
+    """
+    SQLite catalog of wallpapers.
+
+    Parameters
+    ----------
+    db_path : str
+        Database file, created if needed (``":memory:"`` for a
+        temporary catalog).
+    """
+
+    def __init__(self, db_path: str) -> None:
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> Catalog:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def scan(self, root: str) -> ScanResult:
+        """
+        Index the images under `root`, re-reading only new files and
+        files whose size or modification time changed, and forget
+        indexed files under `root` that no longer exist.
+        """
+        root = os.path.abspath(root)
+        known = {
+            path: (file_id, size, mtime_ns)
+            for file_id, path, size, mtime_ns in self.db.execute(
+                "SELECT id, path, size, mtime_ns FROM files WHERE path >= ? AND path < ?",
+                (root + os.sep, root + chr(ord(os.sep) + 1)),
+            )
+        }
+        result = ScanResult()
+
+        with self.db:
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entry = known.pop(path, None)
+                    if entry is not None and entry[1:] == (st.st_size, st.st_mtime_ns):
+                        result.unchanged += 1
+                        continue
+                    self._index(path, st, entry[0] if entry else None)
+                    if entry is None:
+                        result.added += 1
+                    else:
+                        result.updated += 1
+
+            for file_id, _, _ in known.values():
+                self._forget(file_id)
+                result.removed += 1
+        return result
+
+    def _index(self, path: str, st: os.stat_result, file_id: int | None) -> None:
+        fields = read_fields(path)
+        if file_id is not None:
+            self._forget(file_id)
+        cursor = self.db.execute(
+            "INSERT INTO files (path, size, mtime_ns, indexed) VALUES (?, ?, ?, ?)",
+            (path, st.st_size, st.st_mtime_ns, int(fields is not None)),
+        )
+        if fields is None:
+            return
+
+        file_id = cursor.lastrowid
+        columns = ", ".join(fields)
+        placeholders = ", ".join("?" * len(fields))
+        self.db.execute(
+            f"INSERT INTO wallpapers (id, {columns}) VALUES (?, {placeholders})",
+            (file_id, *fields.values()),
+        )
+        self.db.execute(
+            "INSERT INTO footprints VALUES (?, ?, ?, ?, ?)",
+            (file_id, *footprint(
+                fields["lat"], fields["lon"], fields["zoom_level"], fields["width"], fields["height"]
+            )),
+        )
+
+    def _forget(self, file_id: int) -> None:
+        self.db.execute("DELETE FROM footprints WHERE id = ?", (file_id,))
+        self.db.execute("DELETE FROM wallpapers WHERE id = ?", (file_id,))
+        self.db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def query(
+        self,
+        bbox: tuple[float, float, float, float] | None = None,
+        zoom_level: float | None = None,
+        theme: str | None = None,
+        since: str | None = None,
+        before: str | None = None,
+        limit: int | None = None,
+    ) -> list[CatalogEntry]:
+        """
+        Return the wallpapers matching every given filter, newest first.
+
+        Parameters
+        ----------
+        bbox : tuple | None
+            (lat_min, lat_max, lon_min, lon_max): wallpapers whose
+            footprint intersects it.
+        zoom_level : float | None
+            Zoom level.
+        theme : str | None
+            Theme name.
+        since, before : str | None
+            Generation date bounds as ISO 8601 strings (``2026-01-01`` or
+            ``2026-01-01T12:00:00Z``): `since` is inclusive, `before`
+            exclusive.
+        limit : int | None
+            Maximum number of results.
+        """
+        sql = [
+            "SELECT files.path, w.lat, w.lon, w.zoom_level, w.width, w.height,"
+            " w.theme, w.generated_at, w.metadata"
+            " FROM wallpapers AS w JOIN files ON files.id = w.id"
+        ]
+        where, params = [], []
+        if bbox is not None:
+            lat_min, lat_max, lon_min, lon_max = bbox
+            sql.append("JOIN footprints AS f ON f.id = w.id")
+            where.append("f.lat_max >= ? AND f.lat_min <= ? AND f.lon_max >= ? AND f.lon_min <= ?")
+            params += [lat_min, lat_max, lon_min, lon_max]
+        if zoom_level is not None:
+            where.append("w.zoom_level = ?")
+            params.append(zoom_level)
+        if theme is not None:
+            where.append("w.theme = ?")
+            params.append(theme)
+        if since is not None:
+            where.append("w.generated_at >= ?")
+            params.append(since)
+        if before is not None:
+            where.append("w.generated_at < ?")
+            params.append(before)
+        if where:
+            sql.append("WHERE " + " AND ".join(where))
+        sql.append("ORDER BY w.generated_at DESC, files.path")
+        if limit is not None:
+            sql.append("LIMIT ?")
+            params.append(limit)
+
+        return [
+            CatalogEntry(
+                path=path,
+                lat=lat,
+                lon=lon,
+                zoom_level=zoom_level,
+                width=width,
+                height=height,
+                theme=theme,
+                generated_at=generated_at,
+                metadata=json.loads(meta),
+            )
+            for path, lat, lon, zoom_level, width, height, theme, generated_at, meta
+            in self.db.execute(" ".join(sql), params)
+        ]
+
+    def count(self) -> int:
+        """Return the number of wallpapers in the catalog."""
+        return self.db.execute("SELECT COUNT(*) FROM wallpapers").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Index generated wallpapers and query them by place, zoom, theme and date."
+    )
+    parser.add_argument(
+        "--db", type=str, default="isohypses-catalog.sqlite", help="Catalog database"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan = commands.add_parser("scan", help="Index the wallpapers under directories")
+    scan.add_argument("roots", type=str, nargs="+", help="Directories to scan")
+
+    query = commands.add_parser("query", help="Print the paths of matching wallpapers")
+    query.add_argument(
+        "--bbox", type=float, nargs=4, metavar=("LAT_MIN", "LAT_MAX", "LON_MIN", "LON_MAX"),
+        default=None, help="Footprint intersecting this bounding box",
+    )
+    query.add_argument("--zoom_level", "--zoom", type=float, default=None, help="Zoom level")
+    query.add_argument("--theme", type=str, choices=themes.list_themes(), default=None)
+    query.add_argument("--since", type=str, default=None, help="Generated on or after (ISO date)")
+    query.add_argument("--before", type=str, default=None, help="Generated before (ISO date)")
+    query.add_argument("--limit", type=int, default=None, help="Maximum number of results")
+
+    args = parser.parse_args()
+
+    with Catalog(args.db) as catalog:
+        if args.command == "scan":
+            for root in args.roots:
+                result = catalog.scan(root)
+                print(
+                    f"{root}: {result.added} added, {result.updated} updated, "
+                    f"{result.unchanged} unchanged, {result.removed} removed"
+                )
+            return
+
+        for entry in catalog.query(
+            bbox=args.bbox,
+            zoom_level=args.zoom_level,
+            theme=args.theme,
+            since=args.since,
+            before=args.before,
+            limit=args.limit,
+        ):
+            print(entry.path)
+
+
+if __name__ == "__main__":
+    main()
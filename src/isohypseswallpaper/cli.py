@@ -1,30 +1,85 @@
 # /src/isohypseswallpaper/cli.py
 """
 Command-line interface for generating isohypses wallpapers.
+
+Modules that pull in numpy, matplotlib, rasterio, pyproj, scipy or
+elevation are imported lazily, so listing themes, printing help and
+rejecting invalid arguments stay fast.
 """
 
 import argparse
-from isohypseswallpaper import scale, geometry, srtm, wallpaper, themes
+import importlib.util
+import os
+import sys
+
+from isohypseswallpaper import profiling, themes
 
 from .presets import SCREEN_PRESETS
 
 
+def lazy_import(name: str):
+    """
+    Return module `name`, deferring its execution until the first
+    attribute access.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+
+    # Bind the submodule on its package, as a regular import would
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
+
+
+scale = lazy_import("isohypseswallpaper.scale")
+geometry = lazy_import("isohypseswallpaper.geometry")
+srtm = lazy_import("isohypseswallpaper.srtm")
+wallpaper = lazy_import("isohypseswallpaper.wallpaper")
+cache = lazy_import("isohypseswallpaper.cache")
+animation = lazy_import("isohypseswallpaper.animation")
+contours = lazy_import("isohypseswallpaper.contours")
+span = lazy_import("isohypseswallpaper.span")
+renderer = lazy_import("isohypseswallpaper.renderer")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Generate a desktop wallpaper from topographic contours."
     )
     parser.add_argument(
-        "--lat", type=float, required=True, help="Latitude of the center"
+        "--lat", type=float, help="Latitude of the center (required)"
     )
     parser.add_argument(
-        "--lon", type=float, required=True, help="Longitude of the center"
+        "--lon", type=float, help="Longitude of the center (required)"
     )
-    parser.add_argument("--zoom_level", type=int, required=True, help="Zoom level")
+    parser.add_argument("--zoom_level", type=int, help="Zoom level (required)")
     parser.add_argument("--width", type=int, help="Screen width in pixels")
     parser.add_argument("--height", type=int, help="Screen height in pixels")
     parser.add_argument(
         "--contour", type=float, default=None, help="Contour interval in meters"
     )
+    parser.add_argument(
+        "--contour-budget",
+        type=int,
+        default=None,
+        metavar="VERTICES",
+        help="Widen the contour interval so contours have at most about VERTICES vertices",
+    )
+    parser.add_argument(
+        "--min-ring-area",
+        type=float,
+        default=None,
+        metavar="PX",
+        help="Leave out closed contour rings smaller than PX square pixels",
+    )
     parser.add_argument(
         "--bgcolor", type=str, default="#2a2a2a", help="Background color"
     )
@@ -32,7 +87,17 @@ def main():
         "--contour-color", type=str, default="white", help="Contour line color"
     )
     parser.add_argument(
-        "--output", type=str, required=True, help="Output PNG file path"
+        "--output", type=str, help="Output PNG or SVG file path (required)"
+    )
+    parser.add_argument(
+        "--encoder",
+        type=str,
+        choices=["png", "png-fast", "png-palette", "webp", "webp-lossy"],
+        default=None,
+        help=(
+            "Output encoder: default or fast-deflate PNG, 8-bit palette PNG, "
+            "lossless or lossy WebP (default: from the output extension)"
+        ),
     )
     parser.add_argument(
         "--preset",
@@ -46,6 +111,100 @@ def main():
     parser.add_argument(
         "--list-themes", action="store_true", help="List available themes"
     )
+    parser.add_argument(
+        "--stage-cache",
+        type=str,
+        default=None,
+        help="Directory for cached terrain layers (resampled DEM, hillshade)",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        help="Write per-stage timings and peak memory to this JSON/JSONL file",
+    )
+    parser.add_argument(
+        "--zoom-to",
+        type=float,
+        default=None,
+        help="Render a zoom animation from --zoom_level to this zoom level",
+    )
+    parser.add_argument(
+        "--frames",
+        type=int,
+        default=48,
+        help="Number of animation frames (default: 48)",
+    )
+    parser.add_argument(
+        "--pan-to",
+        type=float,
+        nargs=2,
+        metavar=("LAT", "LON"),
+        default=None,
+        help="Pan the animation towards this center",
+    )
+    parser.add_argument(
+        "--fps", type=float, default=24, help="Frame rate of animated outputs"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Parallel workers rendering animation frames (default: CPU count)",
+    )
+    parser.add_argument(
+        "--light-azimuth",
+        type=float,
+        default=None,
+        help="Azimuth of the hillshade light in degrees (default: 315)",
+    )
+    parser.add_argument(
+        "--light-altitude",
+        type=float,
+        default=None,
+        help="Altitude of the hillshade light in degrees (default: 45)",
+    )
+    parser.add_argument(
+        "--light-sweep",
+        type=int,
+        default=None,
+        metavar="FRAMES",
+        help="Render FRAMES frames with the light following the sun through a day",
+    )
+    parser.add_argument(
+        "--preview",
+        type=int,
+        nargs="?",
+        const=4,
+        default=None,
+        metavar="FACTOR",
+        help=(
+            "First write a draft FACTOR times smaller (default: 4) from a "
+            "decimated DEM to <output>_preview.png"
+        ),
+    )
+    parser.add_argument(
+        "--preview-only",
+        action="store_true",
+        help="Stop after writing the preview",
+    )
+
+    parser.add_argument(
+        "--span",
+        type=str,
+        nargs="+",
+        metavar="DISPLAY",
+        default=None,
+        help=(
+            "Span one terrain across displays given as [NAME=]SIZE@X,Y, with SIZE "
+            "a preset or WIDTHxHEIGHT (e.g. --span left=1440p@0,360 4k@2560,0)"
+        ),
+    )
+    parser.add_argument(
+        "--span-strips",
+        action="store_true",
+        help="Render spanned displays one at a time instead of as one canvas",
+    )
 
     args = parser.parse_args()
 
@@ -55,8 +214,34 @@ def main():
             print(" -", t)
         return
 
-    # Compute meters per pixel at the center latitude
-    m_per_px = scale.meters_per_pixel(args.lat, args.zoom_level)
+    # Required unless listing themes
+    missing = [
+        option
+        for option, value in (
+            ("--lat", args.lat),
+            ("--lon", args.lon),
+            ("--zoom_level", args.zoom_level),
+            ("--output", args.output),
+        )
+        if value is None
+    ]
+    if missing:
+        parser.error(f"the following arguments are required: {', '.join(missing)}")
+
+    # Span and zoom animations render outside the profiled stages
+    profile_path = getattr(args, "profile", None)
+    span_layout = getattr(args, "span", None)
+    zoom_to = getattr(args, "zoom_to", None)
+    if profile_path and (span_layout or zoom_to is not None):
+        parser.error("--profile is not available with --span or --zoom-to")
+
+    if span_layout:
+        try:
+            displays = span.parse_layout(span_layout)
+        except ValueError as e:
+            parser.error(str(e))
+        render_span(args, displays)
+        return
 
     # Resolve width and heigth
     preset = getattr(args, "preset", None)
@@ -70,36 +255,223 @@ def main():
             )
         width, height = args.width, args.height
 
-    # Compute bounding box in meters
-    width_m = width * m_per_px
-    height_m = height * m_per_px
-    lat_min, lat_max, lon_min, lon_max = geometry.bounding_box(
-        args.lat, args.lon, width_m, height_m
+    if zoom_to is not None:
+        render_animation(args, width, height, zoom_to)
+        return
+
+    preview_factor = getattr(args, "preview", None)
+    preview_only = getattr(args, "preview_only", False)
+    if preview_only and preview_factor is None:
+        preview_factor = renderer.DEFAULT_PREVIEW_FACTOR
+    if preview_factor is not None and preview_factor < 1:
+        parser.error("--preview FACTOR must be at least 1")
+
+    # Optional per-stage profiling, written by every path below
+    profiler = profiling.Profiler() if profile_path else None
+
+    try:
+        with profiling.stage(profiler, "bbox"):
+            # Compute meters per pixel at the center latitude
+            m_per_px = scale.meters_per_pixel(args.lat, args.zoom_level)
+
+            # Compute bounding box in meters
+            width_m = width * m_per_px
+            height_m = height * m_per_px
+            lat_min, lat_max, lon_min, lon_max = geometry.bounding_box(
+                args.lat, args.lon, width_m, height_m
+            )
+
+        # Optional quick draft from a decimated DEM
+        if preview_factor is not None:
+            with profiling.stage(profiler, "preview"):
+                render_preview(args, width, height, (lat_min, lat_max, lon_min, lon_max), preview_factor)
+            if preview_only:
+                return
+
+        # Fetch DEM
+        with profiling.stage(profiler, "dem_fetch"):
+            dem_array, dem_meta = srtm.get_dem(
+                lat_min, lat_max, lon_min, lon_max, resolution=30
+            )
+
+        # Optional on-disk cache of terrain layers
+        stage_cache_dir = getattr(args, "stage_cache", None)
+        stage_cache = cache.StageCache(stage_cache_dir) if stage_cache_dir else None
+
+        light_sweep = getattr(args, "light_sweep", None)
+        if light_sweep is not None:
+            with profiling.stage(profiler, "light_sweep"):
+                paths = animation.render_light_sweep(
+                    dem_array,
+                    args.lat,
+                    args.lon,
+                    args.zoom_level,
+                    width,
+                    height,
+                    lights=animation.sun_path(light_sweep),
+                    output=args.output,
+                    contour_interval=args.contour,
+                    background_color=args.bgcolor or "#2a2a2a",
+                    contour_color=args.contour_color or "white",
+                    theme=args.theme,
+                    fps=args.fps,
+                    workers=args.workers,
+                    renderer=animation.Renderer(cache=stage_cache),
+                    dem_transform=dem_meta.get("transform"),
+                )
+            print_saved(paths)
+            return
+
+        contour_budget = getattr(args, "contour_budget", None)
+        min_ring_area = getattr(args, "min_ring_area", None)
+        budget = None
+        if contour_budget is not None or min_ring_area:
+            budget = contours.ContourBudget(
+                max_vertices=contour_budget, min_ring_area=min_ring_area or 0.0
+            )
+
+        light_azimuth = getattr(args, "light_azimuth", None)
+        light_altitude = getattr(args, "light_altitude", None)
+
+        # Generate wallpaper
+        wallpaper.generate_wallpaper(
+            dem_array=dem_array,
+            lat=args.lat,
+            lon=args.lon,
+            zoom_level=args.zoom_level,
+            width=width,
+            height=height,
+            contour_interval=args.contour,
+            background_color=args.bgcolor or "#2a2a2a",
+            contour_color=args.contour_color or "white",
+            theme=args.theme,
+            dem_source="SRTM1",
+            dem_resolution=30,
+            output_path=args.output,
+            cache=stage_cache,
+            profiler=profiler,
+            azdeg=wallpaper.LIGHT_AZDEG if light_azimuth is None else light_azimuth,
+            altdeg=wallpaper.LIGHT_ALTDEG if light_altitude is None else light_altitude,
+            dem_transform=dem_meta.get("transform"),
+            contour_budget=budget,
+            dem_range=srtm.stats_range(dem_meta),
+            encoder=getattr(args, "encoder", None),
+        )
+
+        print(f"Wallpaper saved to {args.output}")
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            profiler.write(
+                profile_path, output=args.output, width=width, height=height
+            )
+            print(f"Profile written to {profile_path}")
+
+
+def render_animation(args, width: int, height: int, zoom_to: float) -> None:
+    """
+    Render a zoom animation from one DEM covering every frame.
+    """
+    frames = animation.zoom_frames(
+        args.lat,
+        args.lon,
+        args.zoom_level,
+        zoom_to,
+        n_frames=args.frames,
+        pan_to=args.pan_to,
+    )
+    dem_array, dem_meta = animation.fetch_animation_dem(frames, width, height)
+
+    paths = animation.render_zoom_animation(
+        dem_array,
+        dem_meta,
+        frames,
+        width,
+        height,
+        args.output,
+        contour_interval=args.contour,
+        background_color=args.bgcolor or "#2a2a2a",
+        contour_color=args.contour_color or "white",
+        theme=args.theme,
+        fps=args.fps,
+        workers=args.workers,
     )
+    print_saved(paths)
 
-    # Fetch DEM
-    dem_array, dem_meta = srtm.get_dem(
-        lat_min, lat_max, lon_min, lon_max, resolution=30
+
+def preview_path(output: str) -> str:
+    """
+    Return the path of the preview of `output`: ``root_preview.png``.
+    """
+    root, _ = os.path.splitext(output)
+    return f"{root}_preview.png"
+
+
+def render_preview(args, width: int, height: int, bbox: tuple, factor: int) -> None:
+    """
+    Render and write a draft `factor` times smaller than the wallpaper,
+    from a DEM read `factor` times coarser. The clipped DEM stays in the
+    download cache for the full-size render.
+    """
+    dem_array, dem_meta = srtm.get_dem(*bbox, resolution=30, decimation=factor)
+    light_azimuth = getattr(args, "light_azimuth", None)
+    light_altitude = getattr(args, "light_altitude", None)
+    rendered = renderer.Renderer().preview(
+        dem_array,
+        args.lat,
+        args.lon,
+        args.zoom_level,
+        width,
+        height,
+        factor=factor,
+        contour_interval=args.contour,
+        background_color=args.bgcolor or "#2a2a2a",
+        contour_color=args.contour_color or "white",
+        theme=args.theme,
+        azdeg=wallpaper.LIGHT_AZDEG if light_azimuth is None else light_azimuth,
+        altdeg=wallpaper.LIGHT_ALTDEG if light_altitude is None else light_altitude,
+        dem_transform=dem_meta.get("transform"),
+        dem_range=srtm.stats_range(dem_meta),
     )
+    path = preview_path(args.output)
+    rendered.save(path)
+    print(f"Preview saved to {path}")
+
 
-    # Generate wallpaper
-    wallpaper.generate_wallpaper(
-        dem_array=dem_array,
-        lat=args.lat,
-        lon=args.lon,
-        zoom_level=args.zoom_level,
-        width=width,
-        height=height,
+def render_span(args, displays) -> None:
+    """
+    Render one terrain across `displays` from a single DEM fetch and
+    write one file per display.
+    """
+    dem_array, dem_meta = span.fetch_span_dem(
+        args.lat, args.lon, args.zoom_level, displays
+    )
+    rendered = span.render_span(
+        dem_array,
+        dem_meta["transform"],
+        args.lat,
+        args.lon,
+        args.zoom_level,
+        displays,
         contour_interval=args.contour,
         background_color=args.bgcolor or "#2a2a2a",
         contour_color=args.contour_color or "white",
         theme=args.theme,
-        dem_source="SRTM1",
-        dem_resolution=30,
-        output_path=args.output,
+        strips=getattr(args, "span_strips", False),
     )
+    encoder = getattr(args, "encoder", None)
+    for path in span.save_span(rendered, displays, args.output, encoder=encoder):
+        print(f"Wallpaper saved to {path}")
 
-    print(f"Wallpaper saved to {args.output}")
+
+def print_saved(paths: list[str]) -> None:
+    """
+    Report the files written by an animation.
+    """
+    if len(paths) == 1:
+        print(f"Animation saved to {paths[0]}")
+    else:
+        print(f"{len(paths)} frames saved to {paths[0]} ... {paths[-1]}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,228 @@
+# /src/isohypseswallpaper/contours.py
+
+"""
+Contour line extraction for vector output.
+
+Trace contour polylines of a resampled DEM level by level with
+contourpy, in output pixel coordinates, and simplify them to a pixel
+tolerance before they are written out.
+
+A `ContourBudget` bounds the cost of contours on rugged terrain: the
+interval is widened until the number of levels and the estimated vertex
+count fit, and closed rings smaller than a pixel area can be dropped.
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+import contourpy
+import numpy as np
+
+
+@dataclass(frozen=True)
+class ContourBudget:
+    """
+    Upper bounds on the contour lines of one image.
+
+    Parameters
+    ----------
+    max_levels : int | None
+        Maximum number of contour levels.
+    max_vertices : int | None
+        Maximum estimated number of contour vertices, summed over levels.
+    min_ring_area : float
+        Closed rings enclosing less than this area (square pixels) are
+        not drawn.
+    """
+
+    max_levels: int | None = 250
+    max_vertices: int | None = None
+    min_ring_area: float = 0.0
+
+
+def contour_levels(dem_min: float, dem_max: float, contour_interval: float) -> np.ndarray:
+    """
+    Return the contour levels drawn between `dem_min` and `dem_max`.
+    """
+    return np.arange(dem_min, dem_max, contour_interval)
+
+
+def estimate_vertices(dem: np.ndarray, contour_interval: float) -> float:
+    """
+    Estimate the number of contour vertices traced on `dem` at
+    `contour_interval`.
+
+    A marching-squares tracer emits one vertex per grid edge crossed by a
+    level, and an edge between elevations a and b is crossed by about
+    ``|b - a| / contour_interval`` levels, so the total is the summed
+    absolute elevation differences between neighbours divided by the
+    interval. One pass over the DEM gives the estimate for every interval.
+    """
+    dem = np.asarray(dem, dtype=np.float64)
+    variation = np.abs(np.diff(dem, axis=0)).sum() + np.abs(np.diff(dem, axis=1)).sum()
+    return float(variation) / contour_interval
+
+
+def nice_interval(interval: float) -> float:
+    """
+    Round `interval` up to the next 1, 2, 2.5 or 5 times a power of ten.
+    """
+    exponent = 10.0 ** math.floor(math.log10(interval))
+    for step in (1, 2, 2.5, 5, 10):
+        if step * exponent >= interval * (1 - 1e-9):
+            return step * exponent
+    return 10 * exponent
+
+
+def budget_interval(
+    dem: np.ndarray,
+    dem_min: float,
+    dem_max: float,
+    contour_interval: float,
+    budget: ContourBudget,
+) -> float:
+    """
+    Return the contour interval to draw under `budget`.
+
+    The requested `contour_interval` is kept when it fits; otherwise it is
+    widened to the smallest round interval (see `nice_interval`) that
+    keeps both the level count and the estimated vertex count within the
+    budget.
+    """
+    needed = contour_interval
+    if budget.max_levels:
+        needed = max(needed, (dem_max - dem_min) / budget.max_levels)
+    if budget.max_vertices:
+        needed = max(needed, estimate_vertices(dem, 1.0) / budget.max_vertices)
+    if needed <= contour_interval:
+        return contour_interval
+    return nice_interval(needed)
+
+
+def contour_lines(
+    dem: np.ndarray, levels: np.ndarray
+) -> Iterator[tuple[float, list[np.ndarray]]]:
+    """
+    Yield (level, polylines) for each level, one level at a time.
+
+    Polylines are (N, 2) arrays of (x, y) pixel coordinates with y
+    pointing down, matching the raster: the centre of pixel (row, col) is
+    at (col + 0.5, row + 0.5). Closed rings repeat their first point.
+    """
+    generator = contourpy.contour_generator(z=dem, line_type="Separate")
+    for level in levels:
+        lines = generator.lines(level)
+        yield float(level), [line + 0.5 for line in lines]
+
+
+def ring_areas(lines: list[np.ndarray]) -> np.ndarray:
+    """
+    Return the area enclosed by each closed polyline (square pixels), and
+    infinity for open polylines, which always run into the image border.
+    """
+    areas = np.full(len(lines), np.inf)
+    for k, line in enumerate(lines):
+        if len(line) > 2 and np.array_equal(line[0], line[-1]):
+            x, y = line[:, 0], line[:, 1]
+            areas[k] = 0.5 * abs(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1]))
+    return areas
+
+
+def drop_small_rings(lines: list[np.ndarray], min_area: float) -> list[np.ndarray]:
+    """
+    Drop closed polylines enclosing less than `min_area` square pixels.
+    """
+    if min_area <= 0 or not lines:
+        return lines
+    areas = ring_areas(lines)
+    return [line for line, area in zip(lines, areas) if area >= min_area]
+
+
+def simplify(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Simplify a polyline with the Douglas-Peucker algorithm: drop vertices
+    closer than `tolerance` (pixels) to the simplified line. The first
+    and last points are always kept, so closed rings stay closed.
+    """
+    return simplify_lines([points], tolerance)[0]
+
+
+def simplify_lines(lines: list[np.ndarray], tolerance: float) -> list[np.ndarray]:
+    """
+    Douglas-Peucker simplification of many polylines at once.
+
+    All polylines are processed together: each pass measures every
+    remaining vertex against the chord of its open range and splits all
+    ranges whose farthest vertex is beyond `tolerance` in one vectorized
+    step, so the cost is a few array passes per recursion depth rather
+    than one Python iteration per kept vertex.
+    """
+    if not lines or tolerance <= 0:
+        return list(lines)
+
+    lengths = np.array([len(line) for line in lines])
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    points = np.concatenate(lines)
+    x = np.ascontiguousarray(points[:, 0])
+    y = np.ascontiguousarray(points[:, 1])
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[starts] = True
+    keep[ends - 1] = True
+
+    i, j = starts, ends - 1
+    while True:
+        open_ranges = j > i + 1
+        i, j = i[open_ranges], j[open_ranges]
+        if not len(i):
+            break
+
+        # Vertices strictly inside each range, grouped by range
+        counts = j - i - 1
+        group_starts = np.cumsum(counts) - counts
+        range_id = np.repeat(np.arange(len(i)), counts)
+        inner = np.arange(len(range_id)) + np.repeat(i + 1 - group_starts, counts)
+
+        x0, y0 = x[i], y[i]
+        dx, dy = x[j] - x0, y[j] - y0
+        rx = x[inner] - np.repeat(x0, counts)
+        ry = y[inner] - np.repeat(y0, counts)
+        seg_len = np.hypot(dx, dy)
+        ring = seg_len == 0
+        seg_len[ring] = 1
+        dist = np.abs(np.repeat(dx / seg_len, counts) * ry - np.repeat(dy / seg_len, counts) * rx)
+        if ring.any():
+            # Closed rings have a zero-length chord: distance to the start point
+            in_ring = ring[range_id]
+            dist[in_ring] = np.hypot(rx[in_ring], ry[in_ring])
+
+        # Farthest vertex of each range (first one on ties); range ids
+        # are sorted, so the first maximum of each range follows a change
+        max_dist = np.maximum.reduceat(dist, group_starts)
+        at_max = np.flatnonzero(dist == max_dist[range_id])
+        max_range = range_id[at_max]
+        first = np.concatenate([[True], max_range[1:] != max_range[:-1]])
+        farthest = inner[at_max[first]]
+
+        split = max_dist > tolerance
+        mid = farthest[split]
+        keep[mid] = True
+        i, j = np.concatenate([i[split], mid]), np.concatenate([mid, j[split]])
+
+    return [points[s:e][keep[s:e]] for s, e in zip(starts, ends)]
+
+
+def quantize(points: np.ndarray, scale: int) -> np.ndarray:
+    """
+    Round coordinates to integer multiples of 1 / `scale` pixels, dropping
+    consecutive duplicates. Returns integer coordinates in those units.
+    """
+    q = np.rint(points * scale).astype(np.int64)
+    if len(q) > 1:
+        moved = np.any(q[1:] != q[:-1], axis=1)
+        q = q[np.concatenate([[True], moved])]
+    return q
@@ -0,0 +1,132 @@
+# /src/isohypseswallpaper/encoders.py
+
+"""
+Output encoders.
+
+Encode rendered RGB pixels once, straight to the output format, with a
+choice of speed/size trade-offs: default and fast-deflate PNG, 8-bit
+palette PNG (compact for the two-color minimalist themes) and lossless or
+lossy WebP. Truecolor PNGs are compressed in parallel strips (see `png`).
+Every encoder embeds the wallpaper metadata: as PNG text chunks, or as an
+EXIF UserComment holding the same text for WebP.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import BinaryIO
+
+import numpy as np
+from PIL import Image
+
+from . import metadata, png
+
+
+@dataclass(frozen=True)
+class Encoder:
+    """
+    An output format and its encoder options.
+
+    Parameters
+    ----------
+    format : str
+        PIL format name ("PNG" or "WEBP").
+    options : dict
+        Keyword arguments of ``Image.save``.
+    colors : int | None
+        Quantize to a palette of at most this many colors first.
+    """
+
+    format: str
+    options: dict = field(default_factory=dict)
+    colors: int | None = None
+
+
+ENCODERS = {
+    "png": Encoder("PNG", {"compress_level": 6}),
+    "png-fast": Encoder("PNG", {"compress_level": 1}),
+    "png-palette": Encoder("PNG", {"compress_level": 9}, colors=256),
+    "webp": Encoder("WEBP", {"lossless": True, "quality": 0, "method": 0}),
+    "webp-lossy": Encoder("WEBP", {"quality": 85, "method": 2}),
+}
+"""Available encoders by name; "png" matches the default PNG output."""
+
+DEFAULT_ENCODER = "png"
+
+
+def get_encoder(name: str) -> Encoder:
+    """
+    Return the encoder called `name`.
+
+    Raises
+    ------
+    ValueError
+        If there is no such encoder.
+    """
+    try:
+        return ENCODERS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown encoder '{name}': use one of {', '.join(ENCODERS)}"
+        ) from None
+
+
+def file_extension(name: str) -> str:
+    """
+    Return the file extension of images written by encoder `name`.
+    """
+    return ".webp" if get_encoder(name).format == "WEBP" else ".png"
+
+
+def encoder_for_path(path: str, name: str | None = None) -> str:
+    """
+    Return the name of the encoder writing `path`: `name` if given,
+    otherwise "webp" for ``.webp`` paths and the default encoder for others.
+    """
+    if name is not None:
+        return name
+    if os.path.splitext(path)[1].lower() == ".webp":
+        return "webp"
+    return DEFAULT_ENCODER
+
+
+def to_pil(image: np.ndarray, encoder: Encoder) -> Image.Image:
+    """
+    Convert (height, width, 3) uint8 RGB pixels for `encoder`, quantizing
+    them to a palette if it asks for one.
+    """
+    img = Image.fromarray(image)
+    if encoder.colors is not None:
+        img = img.quantize(
+            colors=encoder.colors,
+            method=Image.Quantize.FASTOCTREE,
+            dither=Image.Dither.NONE,
+        )
+    return img
+
+
+def encode(
+    image: np.ndarray,
+    fp: str | BinaryIO,
+    exif_dict: dict[str, str] | None = None,
+    encoder: str = DEFAULT_ENCODER,
+    version: str = "0.2.0",
+) -> None:
+    """
+    Encode RGB pixels into a path or file-like object with `encoder`,
+    embedding `exif_dict` (see `metadata.build_exif_metadata`).
+    """
+    enc = get_encoder(encoder)
+    if enc.format == "PNG" and enc.colors is None:
+        text = metadata.png_text(exif_dict, version) if exif_dict is not None else None
+        png.write_png(fp, image, text=text, level=enc.options["compress_level"])
+        return
+
+    options = dict(enc.options)
+    if exif_dict is not None:
+        if enc.format == "PNG":
+            options["pnginfo"] = metadata.png_info(exif_dict, version)
+        else:
+            options["exif"] = metadata.exif_bytes(exif_dict, version)
+    to_pil(image, enc).save(fp, format=enc.format, **options)
@@ -7,6 +7,7 @@ Compute bounding boxes, offsets, and distances using geodesic calculations.
 
 from __future__ import annotations
 
+import numpy as np
 from pyproj import Geod
 
 # WGS84 ellipsoid
@@ -50,3 +51,38 @@ def bounding_box(
     lat_min, lon_min = offset_point(lat_center, lon_center, -half_height, -half_width)
 
     return lat_min, lat_max, lon_min, lon_max
+
+
+def bounding_boxes(
+    lat_center: np.ndarray,
+    lon_center: np.ndarray,
+    width_m: np.ndarray,
+    height_m: np.ndarray,
+) -> np.ndarray:
+    """
+    Vectorized `bounding_box` for many rectangles at once.
+
+    Takes arrays (or scalars, broadcast together) of centres and sizes in
+    meters and returns an (N, 4) array of (lat_min, lat_max, lon_min,
+    lon_max) rows, identical to calling `bounding_box` on each centre.
+    Both corners of every rectangle go through one `GEOD.fwd` call per
+    direction, instead of four scalar calls per rectangle.
+    """
+    lat, lon, half_width, half_height = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(a, dtype=np.float64)) for a in (
+            lat_center, lon_center, np.abs(width_m) / 2, np.abs(height_m) / 2,
+        ))
+    )
+    n = lat.size
+
+    # Top-right corners first, then bottom-left corners, as in offset_point:
+    # north (or south) first, then east (or west) from there
+    lats = np.concatenate([lat.ravel(), lat.ravel()])
+    lons = np.concatenate([lon.ravel(), lon.ravel()])
+    north = np.concatenate([half_height.ravel(), -half_height.ravel()])
+    east = np.concatenate([half_width.ravel(), -half_width.ravel()])
+
+    lons, lats, _ = GEOD.fwd(lons, lats, np.zeros(2 * n), north)
+    lons, lats, _ = GEOD.fwd(lons, lats, np.full(2 * n, 90.0), east)
+
+    return np.column_stack([lats[n:], lats[:n], lons[n:], lons[:n]])
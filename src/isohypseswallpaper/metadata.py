@@ -1,9 +1,21 @@
 # /src/isohypseswallpaper/metadata.py
 
+import struct
+import zlib
 from datetime import datetime, timezone
 from typing import Tuple, Dict
+
+import numpy as np
 from PIL import PngImagePlugin, Image
 
+from . import png
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+EXIF_IFD = 0x8769
+EXIF_SOFTWARE = 0x0131
+EXIF_USER_COMMENT = 0x9286
+
 def build_exif_metadata(
     *,
     version: str,
@@ -19,6 +31,9 @@ def build_exif_metadata(
     background_color: str,
     dem_source: str = "SRTM1",
     dem_resolution: int = 30,
+    params_hash: str | None = None,
+    light: Tuple[float, float] | None = None,
+    theme: str | None = None,
 ) -> Dict[str, str]:
     """
     Build a dictionary of EXIF-compatible metadata for IsohypsesWallpaper.
@@ -41,6 +56,13 @@ def build_exif_metadata(
         "IsohypsesWallpaper:DEMSource": dem_source,
         "IsohypsesWallpaper:DEMResolutionM": str(dem_resolution),
     }
+    if theme is not None:
+        metadata["IsohypsesWallpaper:Theme"] = theme
+    if light is not None:
+        metadata["IsohypsesWallpaper:LightAzimuthDeg"] = f"{light[0]:g}"
+        metadata["IsohypsesWallpaper:LightAltitudeDeg"] = f"{light[1]:g}"
+    if params_hash is not None:
+        metadata["IsohypsesWallpaper:ParamsHash"] = params_hash
     return metadata
 
 
@@ -51,17 +73,148 @@ def exif_dict_to_usercomment(metadata: Dict[str, str]) -> str:
     return "\n".join(f"{k}={v}" for k, v in metadata.items())
 
 
+def usercomment_to_exif_dict(user_comment: str) -> Dict[str, str]:
+    """
+    Parse an EXIF UserComment string back into a metadata dictionary.
+    """
+    metadata = {}
+    for line in user_comment.splitlines():
+        key, sep, value = line.partition("=")
+        if sep:
+            metadata[key] = value
+    return metadata
+
+
+def read_png_text(image_path: str) -> Dict[str, str]:
+    """
+    Read the text chunks (tEXt, zTXt, iTXt) of a PNG file without
+    decoding its pixels.
+
+    Only the chunk headers are scanned, and reading stops at the first
+    IDAT chunk, where metadata written by `write_metadata` ends.
+    """
+    texts = {}
+    with open(image_path, "rb") as f:
+        if f.read(8) != PNG_SIGNATURE:
+            raise ValueError(f"Not a PNG file: {image_path}")
+
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            length, chunk_type = struct.unpack(">I4s", header)
+            if chunk_type in (b"IDAT", b"IEND"):
+                break
+            if chunk_type not in (b"tEXt", b"zTXt", b"iTXt"):
+                f.seek(length + 4, 1)  # skip data and CRC
+                continue
+
+            data = f.read(length)
+            f.seek(4, 1)  # CRC
+            keyword, _, rest = data.partition(b"\0")
+            if chunk_type == b"tEXt":
+                text = rest.decode("latin-1")
+            elif chunk_type == b"zTXt":
+                text = zlib.decompress(rest[1:]).decode("latin-1")
+            else:
+                compressed = rest[0]
+                _, _, rest = rest[2:].partition(b"\0")  # language tag
+                _, _, rest = rest.partition(b"\0")  # translated keyword
+                text = (zlib.decompress(rest) if compressed else rest).decode("utf-8")
+            texts[keyword.decode("latin-1")] = text
+
+    return texts
+
+
+def read_exif_usercomment(image_path: str) -> str:
+    """
+    Read the EXIF UserComment of an image (WebP, JPEG...), decoding its
+    character code prefix. Empty if the image has none.
+    """
+    with Image.open(image_path) as img:
+        exif = img.getexif()
+        value = exif.get_ifd(EXIF_IFD).get(EXIF_USER_COMMENT, b"")
+    if isinstance(value, str):
+        return value
+    code, text = value[:8], value[8:]
+    if code == b"UNICODE\0":
+        return text.decode("utf-16-be" if exif.endian == ">" else "utf-16-le")
+    return text.rstrip(b"\0").decode("latin-1")
+
+
+def read_exif_metadata(image_path: str) -> Dict[str, str]:
+    """
+    Return the metadata dictionary embedded by `write_metadata` or an
+    encoder, read from the PNG text chunks, or from the EXIF UserComment
+    of other formats. Empty if the image has none.
+    """
+    with open(image_path, "rb") as f:
+        is_png = f.read(8) == PNG_SIGNATURE
+    if is_png:
+        user_comment = read_png_text(image_path).get("UserComment", "")
+    else:
+        user_comment = read_exif_usercomment(image_path)
+    return usercomment_to_exif_dict(user_comment)
+
+
+def png_text(
+    exif_dict: Dict[str, str],
+    version: str = "0.2.0"
+) -> Dict[str, str]:
+    """
+    Return the PNG text chunks (UserComment, Software) holding the metadata.
+    """
+    return {
+        "UserComment": exif_dict_to_usercomment(exif_dict),
+        "Software": f"IsohypsesWallpaper {version}",
+    }
+
+
+def png_info(
+    exif_dict: Dict[str, str],
+    version: str = "0.2.0"
+) -> PngImagePlugin.PngInfo:
+    """
+    Build the PNG text chunks (UserComment, Software) holding the metadata.
+    """
+    info = PngImagePlugin.PngInfo()
+    for keyword, text in png_text(exif_dict, version).items():
+        info.add_text(keyword, text)
+    return info
+
+
+def exif_bytes(
+    exif_dict: Dict[str, str],
+    version: str = "0.2.0"
+) -> bytes:
+    """
+    Build an EXIF block holding the metadata, for formats without PNG text
+    chunks: the same text as the PNG UserComment, as a Unicode EXIF
+    UserComment, and the Software tag.
+    """
+    exif = Image.Exif()
+    exif[EXIF_SOFTWARE] = f"IsohypsesWallpaper {version}"
+    user_comment = exif_dict_to_usercomment(exif_dict)
+    # Image.Exif writes big-endian ("MM") blocks
+    exif.get_ifd(EXIF_IFD)[EXIF_USER_COMMENT] = b"UNICODE\0" + user_comment.encode("utf-16-be")
+    return exif.tobytes()
+
+
 def write_metadata(
     image_path: str,
     exif_dict: Dict[str, str],
     version: str = "0.2.0"
 ) -> None:
     """
-    Embed metadata into a PNG image at `image_path`.
+    Embed metadata into an existing PNG image at `image_path`.
+    `wallpaper.generate_wallpaper` embeds it while encoding instead.
+
+    8-bit RGB(A) and grayscale images are re-encoded with the parallel
+    `png.write_png`; other modes are re-saved by PIL.
     """
-    img = Image.open(image_path)
-    png_info = PngImagePlugin.PngInfo()
-    user_comment = exif_dict_to_usercomment(exif_dict)
-    png_info.add_text("UserComment", user_comment)
-    png_info.add_text("Software", f"IsohypsesWallpaper {version}")
-    img.save(image_path, pnginfo=png_info)
+    with Image.open(image_path) as img:
+        img.load()
+    if img.mode in ("RGB", "RGBA", "L", "LA"):
+        png.write_png(image_path, np.asarray(img), text=png_text(exif_dict, version))
+    else:
+        img.save(image_path, pnginfo=png_info(exif_dict, version))
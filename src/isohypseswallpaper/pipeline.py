@@ -0,0 +1,420 @@
+# /src/isohypseswallpaper/pipeline.py
+
+"""
+Pipelined execution of multi-render workloads.
+
+Run each render as a sequence of stages, each with its own pool of
+worker threads, joined by bounded queues: DEM fetch and clip on an I/O
+pool, terrain computation and compositing on a CPU pool, encoding and
+writing on a third. While one job renders, the DEM of the next one loads
+and the previous wallpaper is written, instead of the disk, network and
+CPU taking turns. The bounded queues keep the I/O stage at most a few
+jobs ahead, so memory stays bounded however many jobs are queued.
+
+Each stage records the time its workers spend working, waiting for input
+(starved) and waiting for room downstream (blocked); its utilisation is
+the working time over the wall time of its workers, so the bottleneck is
+the stage close to 1.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+from isohypseswallpaper import batch, encoders, srtm
+from isohypseswallpaper.batch import BatchJob
+from isohypseswallpaper.cache import MemoryCache, StageCache
+from isohypseswallpaper.renderer import Renderer, RenderedImage
+
+
+DEFAULT_QUEUE_SIZE = 2
+"""Items waiting between two stages."""
+
+DEFAULT_DEM_CACHE_MB = 512
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """
+    A pipeline stage: `func` maps the output of the previous stage (the
+    input item for the first one) to the input of the next one, on
+    `workers` threads.
+    """
+
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+
+
+@dataclass
+class StageStats:
+    """
+    Time spent by the workers of a stage, in seconds, summed over workers.
+    """
+
+    workers: int
+    items: int = 0
+    busy_s: float = 0.0
+    starved_s: float = 0.0
+    blocked_s: float = 0.0
+
+    def utilisation(self, wall_s: float) -> float:
+        """Return the fraction of the workers' time spent working."""
+        return self.busy_s / (self.workers * wall_s) if wall_s > 0 else 0.0
+
+
+@dataclass
+class PipelineResult:
+    """
+    Outcome of one item: the output of the last stage, or the exception
+    raised by the stage that failed.
+    """
+
+    item: Any
+    value: Any = None
+    error: BaseException | None = None
+
+
+@dataclass
+class _Envelope:
+    index: int
+    item: Any
+    value: Any
+    error: BaseException | None = None
+
+
+@dataclass
+class Pipeline:
+    """
+    Run items through stages of worker threads joined by bounded queues.
+
+    Parameters
+    ----------
+    stages : list[Stage]
+        Stages in order.
+    queue_size : int
+        Capacity of the queues feeding each stage.
+    """
+
+    stages: list[Stage]
+    queue_size: int = DEFAULT_QUEUE_SIZE
+    stats: dict[str, StageStats] = field(default_factory=dict, init=False)
+    wall_s: float = field(default=0.0, init=False)
+
+    def run(
+        self,
+        items: Iterable,
+        on_result: Callable[[PipelineResult], None] | None = None,
+    ) -> list[PipelineResult]:
+        """
+        Run `items` through the stages and return their results, in input
+        order. `on_result` is called in the calling thread as each item
+        completes, in completion order.
+
+        An exception raised by a stage is recorded in the result of its
+        item, which skips the following stages. If `on_result` raises, the
+        remaining items skip their stages and the exception is re-raised.
+        """
+        self.stats = {stage.name: StageStats(stage.workers) for stage in self.stages}
+        queues = [queue.Queue(self.queue_size) for _ in self.stages] + [queue.Queue()]
+        cancelled = threading.Event()
+        threads = [threading.Thread(target=self._feed, args=(items, queues[0], cancelled), daemon=True)]
+        for k, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            lock = threading.Lock()
+            for _ in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work,
+                    args=(k, queues[k], queues[k + 1], remaining, lock, cancelled),
+                    daemon=True,
+                ))
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        results: dict[int, PipelineResult] = {}
+        try:
+            while (envelope := queues[-1].get()) is not _DONE:
+                result = PipelineResult(envelope.item, envelope.value, envelope.error)
+                results[envelope.index] = result
+                if on_result is not None:
+                    on_result(result)
+        except BaseException:
+            cancelled.set()
+            raise
+        finally:
+            # The last queue is unbounded, so workers never block on it
+            for thread in threads:
+                thread.join()
+            self.wall_s = time.perf_counter() - start
+        return [results[index] for index in sorted(results)]
+
+    def _feed(self, items: Iterable, out: queue.Queue, cancelled: threading.Event) -> None:
+        for index, item in enumerate(items):
+            if cancelled.is_set():
+                break
+            out.put(_Envelope(index, item, item))
+        for _ in range(self.stages[0].workers):
+            out.put(_DONE)
+
+    def _work(
+        self,
+        k: int,
+        inbox: queue.Queue,
+        outbox: queue.Queue,
+        remaining: list[int],
+        lock: threading.Lock,
+        cancelled: threading.Event,
+    ) -> None:
+        stage = self.stages[k]
+        starved = busy = blocked = 0.0
+        items = 0
+        while True:
+            t0 = time.perf_counter()
+            envelope = inbox.get()
+            t1 = time.perf_counter()
+            starved += t1 - t0
+            if envelope is _DONE:
+                break
+            if envelope.error is None and not cancelled.is_set():
+                try:
+                    envelope.value = stage.func(envelope.value)
+                    items += 1
+                except Exception as e:
+                    envelope.error = e
+            t2 = time.perf_counter()
+            busy += t2 - t1
+            outbox.put(envelope)
+            blocked += time.perf_counter() - t2
+
+        with lock:
+            stats = self.stats[stage.name]
+            stats.items += items
+            stats.busy_s += busy
+            stats.starved_s += starved
+            stats.blocked_s += blocked
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            # The next stage (or the caller) stops once every worker of
+            # this one is done
+            next_workers = self.stages[k + 1].workers if k + 1 < len(self.stages) else 1
+            for _ in range(next_workers):
+                outbox.put(_DONE)
+
+    def report(self) -> dict:
+        """
+        Return the wall time of the last run and, per stage, its item
+        count, summed busy, starved and blocked times and utilisation.
+        """
+        return {
+            "wall_s": self.wall_s,
+            "stages": {
+                name: {
+                    "workers": stats.workers,
+                    "items": stats.items,
+                    "busy_s": stats.busy_s,
+                    "starved_s": stats.starved_s,
+                    "blocked_s": stats.blocked_s,
+                    "utilisation": stats.utilisation(self.wall_s),
+                }
+                for name, stats in self.stats.items()
+            },
+        }
+
+    def format_report(self) -> str:
+        """Return the report as lines of text, one per stage."""
+        lines = [f"{len(self.stats)} stages in {self.wall_s:.2f} s"]
+        for name, stats in self.stats.items():
+            lines.append(
+                f"{name:>8}: {stats.workers} worker(s), {stats.items} items, "
+                f"{stats.utilisation(self.wall_s):6.1%} busy, "
+                f"starved {stats.starved_s:.2f} s, blocked {stats.blocked_s:.2f} s"
+            )
+        return "\n".join(lines)
+
+
+class RenderPipeline:
+    """
+    Render batch jobs in three stages: DEM fetch on I/O threads, terrain
+    and compositing on CPU threads, encoding and writing on writer threads.
+
+    Parameters
+    ----------
+    io_workers, cpu_workers, write_workers : int | None
+        Threads of each stage (CPU workers default to the CPU count).
+    queue_size : int
+        Capacity of the queues between stages.
+    cache : StageCache | MemoryCache | None
+        Cache of terrain layers shared by the CPU workers. Defaults to an
+        in-memory cache, so the themes of one location share their layers.
+    dem_budget_bytes : int
+        Memory budget of the DEM window cache, shared by jobs covering the
+        same area.
+    tiles_dir : str | None
+        Optional directory of local DEM tiles, passed to `srtm.get_dem`.
+        Otherwise each I/O worker clips its downloads into its own file,
+        so downloads run concurrently.
+    """
+
+    def __init__(
+        self,
+        io_workers: int = 2,
+        cpu_workers: int | None = None,
+        write_workers: int = 1,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        cache: StageCache | MemoryCache | None = None,
+        dem_budget_bytes: int = DEFAULT_DEM_CACHE_MB * 1024**2,
+        tiles_dir: str | None = None,
+    ) -> None:
+        self.cache = cache if cache is not None else MemoryCache()
+        self.dems = MemoryCache(dem_budget_bytes)
+        self.tiles_dir = tiles_dir
+        self.pipeline = Pipeline(
+            [
+                Stage("fetch", self.fetch, io_workers),
+                Stage("render", self.render, cpu_workers or os.cpu_count() or 1),
+                Stage("write", self.write, write_workers),
+            ],
+            queue_size=queue_size,
+        )
+        # Concurrent downloads must clip into different files; a fetch
+        # checks one out of this pool
+        self._clip_names: queue.Queue[str] = queue.Queue()
+        for index in range(io_workers):
+            self._clip_names.put(f"dem-pipeline-{index}.tif")
+        # Jobs of one location arrive together; the first fetch of a
+        # window is shared by the workers asking for it meanwhile
+        self._inflight: dict[tuple, Future] = {}
+        self._inflight_lock = threading.Lock()
+        # Renderers are not thread-safe; each thread gets its own, all
+        # sharing the layer cache
+        self._local = threading.local()
+
+    def fetch(self, job: BatchJob) -> tuple[BatchJob, tuple[np.ndarray, dict]]:
+        """Return `job` and its DEM window, from memory when possible."""
+        bbox = batch.job_bbox(job)
+        key = tuple(round(v, 6) for v in bbox)
+        with self._inflight_lock:
+            entry = self.dems.get(key)
+            if entry is not None:
+                return job, entry
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            return job, future.result()
+
+        clip_name = self._clip_names.get()
+        try:
+            entry = srtm.get_dem(
+                *bbox, resolution=30, tiles_dir=self.tiles_dir, clip_name=clip_name
+            )
+            self.dems.put(key, entry)
+            future.set_result(entry)
+            return job, entry
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._clip_names.put(clip_name)
+            with self._inflight_lock:
+                del self._inflight[key]
+
+    def render(self, fetched: tuple[BatchJob, tuple[np.ndarray, dict]]) -> tuple[BatchJob, RenderedImage]:
+        """Render the wallpaper of a fetched job in memory."""
+        job, (dem_array, dem_meta) = fetched
+        renderer = getattr(self._local, "renderer", None)
+        if renderer is None:
+            renderer = self._local.renderer = Renderer(cache=self.cache)
+        rendered = renderer.render(
+            dem_array=dem_array,
+            lat=job.lat,
+            lon=job.lon,
+            zoom_level=job.zoom_level,
+            width=job.width,
+            height=job.height,
+            contour_interval=job.contour_interval,
+            background_color=job.background_color,
+            contour_color=job.contour_color,
+            theme=job.theme,
+            params_hash=batch.job_hash(job),
+            dem_transform=dem_meta.get("transform"),
+            contour_budget=batch.contour_budget(job),
+            dem_range=srtm.stats_range(dem_meta),
+        )
+        return job, rendered
+
+    def write(self, rendered: tuple[BatchJob, RenderedImage]) -> BatchJob:
+        """Encode a rendered wallpaper to the output of its job."""
+        job, image = rendered
+        os.makedirs(os.path.dirname(job.output) or ".", exist_ok=True)
+        image.save(job.output, encoder=encoders.encoder_for_path(job.output, job.encoder))
+        return job
+
+    def run(
+        self,
+        jobs: list[BatchJob],
+        on_result: Callable[[PipelineResult], None] | None = None,
+    ) -> list[PipelineResult]:
+        """Render `jobs`; see `Pipeline.run`."""
+        return self.pipeline.run(jobs, on_result)
+
+    def report(self) -> dict:
+        """Return the stage utilisation report of the last run."""
+        return self.pipeline.report()
+
+
+def run_batch_pipelined(
+    jobs: list[BatchJob],
+    manifest_path: str,
+    check_png: bool = False,
+    force: bool = False,
+    render_pipeline: RenderPipeline | None = None,
+) -> dict[str, list[BatchJob]]:
+    """
+    Like `batch.run_batch`, rendering the out-of-date jobs through a
+    `RenderPipeline`. The manifest is updated as each output is written.
+    A failed job does not stop the others; it is returned with the
+    exception it raised.
+
+    Returns
+    -------
+    dict
+        ``{"rendered": [...], "skipped": [...], "failed": [(job, error), ...]}``
+    """
+    render_pipeline = render_pipeline or RenderPipeline()
+    manifest = batch.load_manifest(manifest_path)
+    result = {"rendered": [], "skipped": [], "failed": []}
+
+    pending = []
+    for job in jobs:
+        if not force and batch.is_up_to_date(job, manifest, check_png=check_png):
+            result["skipped"].append(job)
+        else:
+            pending.append(job)
+
+    def on_result(outcome: PipelineResult) -> None:
+        job = outcome.item
+        if outcome.error is not None:
+            result["failed"].append((job, outcome.error))
+            return
+        manifest[os.path.abspath(job.output)] = batch.job_hash(job)
+        batch.save_manifest(manifest_path, manifest)
+        result["rendered"].append(job)
+
+    render_pipeline.run(pending, on_result)
+    return result
@@ -0,0 +1,113 @@
+# /src/isohypseswallpaper/profiling.py
+
+"""
+Profiling utilities.
+
+Record wall time, CPU time and peak traced memory of each pipeline stage
+(bbox computation, DEM fetch, resample, hillshade, ...) and write them as
+JSON or JSON Lines.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Iterator
+
+
+class Profiler:
+    """
+    Collect per-stage timings and peak memory of a render.
+
+    Stages are recorded in the order they run and must not be nested.
+    Peak memory is measured with `tracemalloc`, which is started on the
+    first stage if it is not already running, and is reported relative to
+    the memory in use when the stage starts.
+
+    Parameters
+    ----------
+    trace_memory : bool
+        Whether to trace memory allocations (slows down Python code).
+    """
+
+    def __init__(self, trace_memory: bool = True) -> None:
+        self.trace_memory = trace_memory
+        self.stages: list[dict] = []
+        self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Context manager recording one stage named `name`.
+        """
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            mem_start = tracemalloc.get_traced_memory()[0]
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            record = {
+                "stage": name,
+                "wall_s": time.perf_counter() - wall_start,
+                "cpu_s": time.process_time() - cpu_start,
+            }
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                record["peak_mem_bytes"] = max(peak - mem_start, 0)
+            self.stages.append(record)
+
+    def stop(self) -> None:
+        """
+        Stop memory tracing if this profiler started it.
+        """
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def report(self, **context) -> dict:
+        """
+        Return the recorded stages and totals, together with `context`
+        (e.g. output path and size) to identify the render.
+        """
+        report = dict(context)
+        report["stages"] = list(self.stages)
+        report["total_wall_s"] = sum(s["wall_s"] for s in self.stages)
+        report["total_cpu_s"] = sum(s["cpu_s"] for s in self.stages)
+        if self.trace_memory:
+            report["peak_mem_bytes"] = max(
+                (s["peak_mem_bytes"] for s in self.stages), default=0
+            )
+        return report
+
+    def write(self, path: str, **context) -> None:
+        """
+        Write the report to `path`.
+
+        Files ending in ``.jsonl`` get one line appended per report, so
+        several renders (e.g. a batch run) can be aggregated; any other
+        path is overwritten with an indented JSON document.
+        """
+        report = self.report(**context)
+        if path.endswith(".jsonl"):
+            with open(path, "a") as f:
+                f.write(json.dumps(report) + "\n")
+        else:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+
+
+def stage(profiler: Profiler | None, name: str):
+    """
+    Return ``profiler.stage(name)``, or a no-op context without a profiler.
+    """
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name)
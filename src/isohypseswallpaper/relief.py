@@ -0,0 +1,439 @@
+# /src/isohypseswallpaper/relief.py
+
+"""
+Relief index of DEM tiles, for sampling interesting wallpaper centres.
+
+Random centres often land on sea or plains, which wastes a DEM fetch and
+a render. A `ReliefIndex` is built once from a directory of GeoTIFF
+tiles (local SRTM tiles or the download cache) and holds, for every cell
+of a regular grid (1/8 degree by default), the elevation range, the
+roughness (mean absolute elevation difference between neighbouring DEM
+pixels) and the nodata fraction.
+
+`ReliefIndex.sample` then draws centres whose wallpaper footprint, for a
+zoom level and screen size, has at least a minimum relief. Candidate
+windows are computed once per footprint and criterion with sliding
+min/max filters over the grid; each draw afterwards only picks among
+them, in microseconds, before `srtm.get_dem` is ever called.
+
+Usage
+-----
+    isohypses-wallpaper-relief build tiles/ --index relief.npz
+    isohypses-wallpaper-relief sample relief.npz --zoom 12 --preset 4k --min-relief 1500 -n 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+import rasterio
+from scipy import ndimage
+
+from .presets import SCREEN_PRESETS
+
+
+CELLS_PER_DEGREE = 8
+"""Default resolution of the index grid: 1/8 degree cells."""
+
+
+@dataclass(eq=False)
+class ReliefIndex:
+    """
+    Per-cell terrain statistics on a regular latitude/longitude grid.
+
+    Row 0 is the northernmost row, whose north edge is at `lat_max`;
+    column 0 starts at `lon_min`. Cells without any data have NaN
+    statistics and a nodata fraction of 1.
+
+    Parameters
+    ----------
+    lat_max, lon_min : float
+        North-west corner of the grid, in degrees.
+    cells_per_degree : int
+        Cells per degree along both axes.
+    min, max : numpy.ndarray
+        Lowest and highest elevation of each cell, in meters.
+    roughness : numpy.ndarray
+        Mean absolute elevation difference between neighbouring pixels
+        of each cell, in meters.
+    nodata : numpy.ndarray
+        Fraction of nodata pixels of each cell.
+    """
+
+    lat_max: float
+    lon_min: float
+    cells_per_degree: int
+    min: np.ndarray
+    max: np.ndarray
+    roughness: np.ndarray
+    nodata: np.ndarray
+    _candidates: dict = field(default_factory=dict, repr=False)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.min.shape
+
+    @property
+    def relief(self) -> np.ndarray:
+        """Elevation range of each cell, in meters."""
+        return self.max - self.min
+
+    def cell(self, lat: float, lon: float) -> tuple[int, int]:
+        """
+        Return the (row, col) of the cell containing (`lat`, `lon`).
+
+        Raises
+        ------
+        ValueError
+            If the point is outside the index.
+        """
+        row = int(np.floor((self.lat_max - lat) * self.cells_per_degree))
+        col = int(np.floor((lon - self.lon_min) * self.cells_per_degree))
+        if not (0 <= row < self.shape[0] and 0 <= col < self.shape[1]):
+            raise ValueError(f"({lat}, {lon}) is outside the relief index")
+        return row, col
+
+    def cell_stats(self, lat: float, lon: float) -> dict[str, float]:
+        """
+        Return the statistics of the cell containing (`lat`, `lon`).
+        """
+        row, col = self.cell(lat, lon)
+        return {
+            "min": float(self.min[row, col]),
+            "max": float(self.max[row, col]),
+            "relief": float(self.relief[row, col]),
+            "roughness": float(self.roughness[row, col]),
+            "nodata": float(self.nodata[row, col]),
+        }
+
+    def footprint_span(
+        self, zoom_level: float, width: int, height: int, lat: np.ndarray
+    ) -> tuple[np.ndarray, float]:
+        """
+        Return the height (at latitudes `lat`; Web Mercator shortens it
+        towards the poles) and the width of the wallpaper footprint, in
+        cells.
+        """
+        cells_per_px = 360 / (256 * 2**zoom_level) * self.cells_per_degree
+        return height * cells_per_px * np.cos(np.radians(lat)), width * cells_per_px
+
+    def footprint_cells(self, zoom_level: float, width: int, height: int) -> tuple[np.ndarray, int]:
+        """
+        Return the wallpaper footprint in whole cells: its height for
+        each grid row and its width. Partial cells are left out, so
+        windows stay inside the view.
+        """
+        row_lats = self.lat_max - (np.arange(self.shape[0]) + 0.5) / self.cells_per_degree
+        rows, cols = self.footprint_span(zoom_level, width, height, row_lats)
+        return np.maximum(np.floor(rows), 1).astype(int), max(int(cols), 1)
+
+    def candidates(
+        self,
+        zoom_level: float,
+        width: int,
+        height: int,
+        min_relief: float,
+        max_nodata: float = 0.05,
+        min_roughness: float = 0.0,
+    ) -> np.ndarray:
+        """
+        Return the (top, left, rows, cols) cell windows of the footprints
+        meeting the criteria, as an (N, 4) array. Results are cached per
+        footprint and criteria.
+        """
+        key = (zoom_level, width, height, min_relief, max_nodata, min_roughness)
+        if key not in self._candidates:
+            self._candidates[key] = self._find_candidates(*key)
+        return self._candidates[key]
+
+    def _find_candidates(
+        self,
+        zoom_level: float,
+        width: int,
+        height: int,
+        min_relief: float,
+        max_nodata: float,
+        min_roughness: float,
+    ) -> np.ndarray:
+        row_heights, cols = self.footprint_cells(zoom_level, width, height)
+        n_rows, n_cols = self.shape
+        if cols > n_cols:
+            return np.empty((0, 4), dtype=int)
+
+        lows = np.where(np.isnan(self.min), np.inf, self.min)
+        highs = np.where(np.isnan(self.max), -np.inf, self.max)
+        roughness = np.nan_to_num(self.roughness)
+
+        windows = []
+        for rows in np.unique(row_heights):
+            if rows > n_rows:
+                continue
+            # Centred filters: output (r, c) covers the window whose
+            # top-left cell is (r - rows // 2, c - cols // 2)
+            size = (int(rows), cols)
+            with np.errstate(invalid="ignore"):
+                # Windows without data: -inf - inf = NaN, never selected
+                relief = ndimage.maximum_filter(highs, size, mode="constant", cval=-np.inf)
+                relief -= ndimage.minimum_filter(lows, size, mode="constant", cval=np.inf)
+            nodata = ndimage.uniform_filter(self.nodata, size, mode="constant", cval=1.0)
+            rough = ndimage.uniform_filter(roughness, size, mode="constant")
+
+            top = np.arange(n_rows)[:, np.newaxis] - rows // 2
+            left = np.arange(n_cols)[np.newaxis, :] - cols // 2
+            ok = (
+                (relief >= min_relief)
+                & (nodata <= max_nodata + 1e-9)
+                & (rough >= min_roughness)
+                & (top >= 0) & (top + rows <= n_rows)
+                & (left >= 0) & (left + cols <= n_cols)
+                # Windows centred on rows with this footprint height
+                & (row_heights == rows)[:, np.newaxis]
+            )
+            r, c = np.nonzero(ok)
+            windows.append(np.column_stack([
+                r - rows // 2, c - cols // 2, np.full(len(r), rows), np.full(len(r), cols)
+            ]))
+
+        return np.concatenate(windows) if windows else np.empty((0, 4), dtype=int)
+
+    def sample(
+        self,
+        zoom_level: float,
+        width: int,
+        height: int,
+        min_relief: float,
+        n: int = 1,
+        max_nodata: float = 0.05,
+        min_roughness: float = 0.0,
+        rng: np.random.Generator | None = None,
+    ) -> list[tuple[float, float]]:
+        """
+        Draw `n` wallpaper centres (lat, lon) whose footprint at
+        `zoom_level` and `width` x `height` pixels has at least
+        `min_relief` meters of relief, at most `max_nodata` nodata and a
+        mean roughness of at least `min_roughness` meters.
+
+        Raises
+        ------
+        ValueError
+            If no footprint in the index meets the criteria.
+        """
+        windows = self.candidates(
+            zoom_level, width, height, min_relief, max_nodata, min_roughness
+        )
+        if not len(windows):
+            raise ValueError(
+                f"No location in the index has {min_relief:g} m of relief "
+                f"at zoom {zoom_level:g} and {width}x{height}"
+            )
+        rng = rng if rng is not None else np.random.default_rng()
+        top, left, rows, cols = windows[rng.integers(len(windows), size=n)].T
+        # Move the centre as far as the footprint still covers the window
+        centre_rows, centre_cols = top + rows / 2, left + cols / 2
+        span_rows, span_cols = self.footprint_span(
+            zoom_level, width, height, self.lat_max - centre_rows / self.cells_per_degree
+        )
+        slack_rows = np.maximum(span_rows - rows, 0) / 2
+        slack_cols = np.maximum(span_cols - cols, 0) / 2
+        lats = self.lat_max - (centre_rows + rng.uniform(-1, 1, n) * slack_rows) / self.cells_per_degree
+        lons = self.lon_min + (centre_cols + rng.uniform(-1, 1, n) * slack_cols) / self.cells_per_degree
+        return [(float(lat), float(lon)) for lat, lon in zip(lats, lons)]
+
+    def save(self, path: str) -> None:
+        """Write the index to a ``.npz`` file."""
+        np.savez(
+            path,
+            lat_max=self.lat_max,
+            lon_min=self.lon_min,
+            cells_per_degree=self.cells_per_degree,
+            min=self.min,
+            max=self.max,
+            roughness=self.roughness,
+            nodata=self.nodata,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> ReliefIndex:
+        """Read an index written by `save`."""
+        with np.load(path) as data:
+            return cls(
+                lat_max=float(data["lat_max"]),
+                lon_min=float(data["lon_min"]),
+                cells_per_degree=int(data["cells_per_degree"]),
+                min=data["min"],
+                max=data["max"],
+                roughness=data["roughness"],
+                nodata=data["nodata"],
+            )
+
+
+def tile_paths(tiles_dir: str) -> list[str]:
+    """Return the GeoTIFF tiles under `tiles_dir`, recursively."""
+    return sorted(glob.glob(os.path.join(tiles_dir, "**", "*.tif"), recursive=True))
+
+
+def build_index(tiles_dir: str, cells_per_degree: int = CELLS_PER_DEGREE) -> ReliefIndex:
+    """
+    Build the relief index of the GeoTIFF tiles under `tiles_dir`.
+
+    Each tile is read once; pixels are assigned to cells by their centre,
+    and statistics of cells shared by several tiles are merged.
+
+    Raises
+    ------
+    ValueError
+        If there are no tiles.
+    """
+    paths = tile_paths(tiles_dir)
+    if not paths:
+        raise ValueError(f"No DEM tiles in {tiles_dir}")
+
+    bounds = []
+    for path in paths:
+        with rasterio.open(path) as src:
+            bounds.append(src.bounds)
+    cpd = cells_per_degree
+    lat_max = np.ceil(max(b.top for b in bounds) * cpd) / cpd
+    lon_min = np.floor(min(b.left for b in bounds) * cpd) / cpd
+    n_rows = int(np.ceil((lat_max - min(b.bottom for b in bounds)) * cpd))
+    n_cols = int(np.ceil((max(b.right for b in bounds) - lon_min) * cpd))
+
+    totals = {
+        "min": np.full((n_rows, n_cols), np.inf),
+        "max": np.full((n_rows, n_cols), -np.inf),
+        "diff_sum": np.zeros((n_rows, n_cols)),
+        "diff_count": np.zeros((n_rows, n_cols)),
+        "nodata_count": np.zeros((n_rows, n_cols)),
+        "pixel_count": np.zeros((n_rows, n_cols)),
+    }
+    for path in paths:
+        with rasterio.open(path) as src:
+            dem = src.read(1)
+            accumulate_tile(totals, dem, src.nodata, src.transform, lat_max, lon_min, cpd)
+
+    covered = totals["pixel_count"] > 0
+    valid = np.isfinite(totals["min"])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        roughness = totals["diff_sum"] / totals["diff_count"]
+        nodata = np.where(covered, totals["nodata_count"] / totals["pixel_count"], 1.0)
+    return ReliefIndex(
+        lat_max=float(lat_max),
+        lon_min=float(lon_min),
+        cells_per_degree=cpd,
+        min=np.where(valid, totals["min"], np.nan).astype(np.float32),
+        max=np.where(valid, totals["max"], np.nan).astype(np.float32),
+        roughness=np.where(totals["diff_count"] > 0, roughness, np.nan).astype(np.float32),
+        nodata=nodata.astype(np.float32),
+    )
+
+
+def accumulate_tile(
+    totals: dict[str, np.ndarray],
+    dem: np.ndarray,
+    nodata: float | None,
+    transform,
+    lat_max: float,
+    lon_min: float,
+    cells_per_degree: int,
+) -> None:
+    """
+    Merge the per-cell statistics of one tile into `totals`, with block
+    reductions over the runs of rows and columns falling in each cell.
+    """
+    height, width = dem.shape
+    lats = transform.f + (np.arange(height) + 0.5) * transform.e
+    lons = transform.c + (np.arange(width) + 0.5) * transform.a
+    n_rows, n_cols = totals["min"].shape
+    row_cells = np.clip(np.floor((lat_max - lats) * cells_per_degree).astype(int), 0, n_rows - 1)
+    col_cells = np.clip(np.floor((lons - lon_min) * cells_per_degree).astype(int), 0, n_cols - 1)
+    row_starts = np.flatnonzero(np.diff(row_cells, prepend=-1))
+    col_starts = np.flatnonzero(np.diff(col_cells, prepend=-1))
+    cells = np.ix_(row_cells[row_starts], col_cells[col_starts])
+
+    def block_reduce(ufunc, array):
+        return ufunc.reduceat(ufunc.reduceat(array, row_starts, axis=0), col_starts, axis=1)
+
+    valid = np.isfinite(dem) if dem.dtype.kind == "f" else np.ones(dem.shape, dtype=bool)
+    if nodata is not None:
+        valid &= dem != nodata
+    values = dem.astype(np.float32)
+
+    totals["min"][cells] = np.fmin(
+        totals["min"][cells], block_reduce(np.minimum, np.where(valid, values, np.inf))
+    )
+    totals["max"][cells] = np.fmax(
+        totals["max"][cells], block_reduce(np.maximum, np.where(valid, values, -np.inf))
+    )
+    totals["nodata_count"][cells] += block_reduce(np.add, (~valid).astype(np.int64))
+    totals["pixel_count"][cells] += np.outer(
+        np.diff(row_starts, append=height), np.diff(col_starts, append=width)
+    )
+
+    # Differences to the right and lower neighbours, counted in the cell
+    # of the first pixel when both pixels are valid
+    diff = np.zeros(dem.shape, dtype=np.float32)
+    count = np.zeros(dem.shape, dtype=np.int64)
+    pair = valid[:, 1:] & valid[:, :-1]
+    diff[:, :-1] += np.where(pair, np.abs(values[:, 1:] - values[:, :-1]), 0)
+    count[:, :-1] += pair
+    pair = valid[1:] & valid[:-1]
+    diff[:-1] += np.where(pair, np.abs(values[1:] - values[:-1]), 0)
+    count[:-1] += pair
+    totals["diff_sum"][cells] += block_reduce(np.add, diff.astype(np.float64))
+    totals["diff_count"][cells] += block_reduce(np.add, count)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build a relief index of DEM tiles, or sample wallpaper centres from it."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Index the GeoTIFF tiles of a directory")
+    build.add_argument("tiles_dir", type=str, help="Directory of DEM tiles (searched recursively)")
+    build.add_argument("--index", type=str, required=True, help="Output index (.npz)")
+    build.add_argument(
+        "--cells-per-degree",
+        type=int,
+        default=CELLS_PER_DEGREE,
+        help=f"Index cells per degree (default: {CELLS_PER_DEGREE})",
+    )
+
+    sample = commands.add_parser("sample", help="Print wallpaper centres meeting a relief criterion")
+    sample.add_argument("index", type=str, help="Relief index (.npz)")
+    sample.add_argument("--zoom_level", "--zoom", type=float, required=True, help="Zoom level")
+    sample.add_argument("--preset", type=str, choices=list(SCREEN_PRESETS), default="1080p")
+    sample.add_argument("--min-relief", type=float, required=True, help="Minimum relief in meters")
+    sample.add_argument(
+        "--max-nodata", type=float, default=0.05, help="Maximum nodata fraction (default: 0.05)"
+    )
+    sample.add_argument("-n", type=int, default=1, help="Number of centres (default: 1)")
+    sample.add_argument("--seed", type=int, default=None, help="Random seed")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = build_index(args.tiles_dir, args.cells_per_degree)
+        index.save(args.index)
+        print(f"Relief index of {index.shape[0]}x{index.shape[1]} cells saved to {args.index}")
+        return
+
+    index = ReliefIndex.load(args.index)
+    width, height = SCREEN_PRESETS[args.preset]
+    try:
+        centres = index.sample(
+            args.zoom_level, width, height, args.min_relief, n=args.n,
+            max_nodata=args.max_nodata, rng=np.random.default_rng(args.seed),
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    for lat, lon in centres:
+        print(f"{lat:.5f} {lon:.5f}")
+
+
+if __name__ == "__main__":
+    main()
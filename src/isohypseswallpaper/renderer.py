@@ -0,0 +1,325 @@
+# /src/isohypseswallpaper/renderer.py
+
+"""
+Reusable render sessions.
+
+A `Renderer` renders wallpapers in memory and keeps state across calls:
+cached terrain layers, resampling plans and color lookup tables, and the
+figures and color buffers of the last few output sizes. Images come back as numpy
+arrays, encoded PNG bytes, or are written to any file-like object.
+
+`Renderer.preview` renders the same view at a fraction of the size, for
+quick drafts while choosing location, zoom and theme.
+"""
+
+from __future__ import annotations
+
+import io
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import BinaryIO
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from . import __version__, encoders, profiling, wallpaper
+from .cache import MemoryCache, StageCache
+from .contours import ContourBudget
+from .profiling import Profiler
+
+
+DEFAULT_PREVIEW_FACTOR = 4
+"""Previews are this many times smaller than the wallpaper along each axis."""
+
+MAX_CACHED_SIZES = 2
+"""Output sizes whose figure and buffer a Renderer keeps (e.g. a wallpaper
+and its preview); older ones are released."""
+
+
+def preview_size(width: int, height: int, factor: int = DEFAULT_PREVIEW_FACTOR) -> tuple[int, int]:
+    """
+    Return the (width, height) of the preview of a `width` x `height`
+    wallpaper.
+    """
+    return max(1, round(width / factor)), max(1, round(height / factor))
+
+
+@dataclass
+class RenderedImage:
+    """
+    A rendered wallpaper: RGB pixels and the metadata to embed.
+    """
+
+    image: np.ndarray
+    metadata: dict[str, str]
+
+    def save(self, fp: str | BinaryIO, encoder: str = encoders.DEFAULT_ENCODER) -> None:
+        """
+        Encode with embedded metadata into a path or file-like object, as
+        PNG unless another `encoder` is given (see `encoders.ENCODERS`).
+        """
+        encoders.encode(self.image, fp, self.metadata, encoder=encoder, version=__version__)
+
+    def to_bytes(self, encoder: str = encoders.DEFAULT_ENCODER) -> bytes:
+        """
+        Return the encoded image with embedded metadata.
+        """
+        buffer = io.BytesIO()
+        self.save(buffer, encoder)
+        return buffer.getvalue()
+
+
+class Renderer:
+    """
+    Render session holding reusable state across calls.
+
+    A Renderer is not thread-safe: use one per thread. Renderers may share
+    a layer `cache`.
+
+    Parameters
+    ----------
+    cache : StageCache | MemoryCache | None
+        Cache of terrain layers. Defaults to a private in-memory cache.
+    dpi : int
+        Resolution of the internal figures; it does not change the output
+        size in pixels.
+    """
+
+    def __init__(
+        self,
+        cache: StageCache | MemoryCache | None = None,
+        dpi: int = 100,
+    ) -> None:
+        self.cache = cache if cache is not None else MemoryCache()
+        self.dpi = dpi
+        self._figures: OrderedDict[tuple[int, int], tuple[Figure, FigureCanvasAgg]] = OrderedDict()
+        self._buffers: OrderedDict[tuple[int, int], np.ndarray] = OrderedDict()
+
+    def layers(
+        self,
+        dem_array: np.ndarray,
+        width: int,
+        height: int,
+        profiler: Profiler | None = None,
+        azdeg: float = wallpaper.LIGHT_AZDEG,
+        altdeg: float = wallpaper.LIGHT_ALTDEG,
+        view: wallpaper.MercatorView | None = None,
+        dem_range: tuple[float, float] | None = None,
+    ) -> dict[str, np.ndarray]:
+        """
+        Return the terrain layers of `dem_array` at the output size,
+        from the cache when possible.
+        """
+        return wallpaper.terrain_layers(
+            dem_array, width, height, cache=self.cache, profiler=profiler,
+            azdeg=azdeg, altdeg=altdeg, view=view, dem_range=dem_range,
+        )
+
+    def render(
+        self,
+        dem_array: np.ndarray,
+        lat: float,
+        lon: float,
+        zoom_level: int,
+        width: int,
+        height: int,
+        contour_interval: float | None = None,
+        background_color: str | list[str] = "#2a2a2a",
+        contour_color: str | list[str] = "white",
+        theme: str | None = None,
+        dem_source: str = "SRTM1",
+        dem_resolution: int = 30,
+        params_hash: str | None = None,
+        profiler: Profiler | None = None,
+        azdeg: float = wallpaper.LIGHT_AZDEG,
+        altdeg: float = wallpaper.LIGHT_ALTDEG,
+        dem_transform: tuple | None = None,
+        contour_budget: ContourBudget | None = None,
+        dem_range: tuple[float, float] | None = None,
+    ) -> RenderedImage:
+        """
+        Render a wallpaper in memory.
+
+        Takes the same parameters as `wallpaper.generate_wallpaper`, except
+        for the output path.
+        """
+        background_color, contour_color = wallpaper.theme_colors(
+            theme, background_color, contour_color
+        )
+        layers = self.layers(
+            dem_array, width, height, profiler=profiler, azdeg=azdeg, altdeg=altdeg,
+            view=wallpaper.mercator_view(lat, lon, zoom_level, dem_transform),
+            dem_range=dem_range,
+        )
+        dem_min, dem_max = (float(v) for v in layers["dem_range"])
+        contour_interval, min_ring_area = wallpaper.apply_contour_budget(
+            layers["dem"], dem_min, dem_max, contour_interval, contour_budget, profiler
+        )
+        image = self.composite(
+            layers,
+            contour_interval=contour_interval,
+            background_color=background_color,
+            contour_color=contour_color,
+            profiler=profiler,
+            min_ring_area=min_ring_area,
+        )
+        exif_dict = wallpaper.wallpaper_metadata(
+            lat,
+            lon,
+            zoom_level,
+            width,
+            height,
+            contour_interval,
+            background_color,
+            contour_color,
+            dem_source=dem_source,
+            dem_resolution=dem_resolution,
+            params_hash=params_hash,
+            light=(azdeg, altdeg),
+            theme=theme,
+        )
+        return RenderedImage(image=image, metadata=exif_dict)
+
+    def preview(
+        self,
+        dem_array: np.ndarray,
+        lat: float,
+        lon: float,
+        zoom_level: int,
+        width: int,
+        height: int,
+        factor: int = DEFAULT_PREVIEW_FACTOR,
+        **kwargs,
+    ) -> RenderedImage:
+        """
+        Render a draft of the `width` x `height` wallpaper, `factor` times
+        smaller along each axis.
+
+        The draft covers the same area: it is rendered at
+        ``zoom_level - log2(factor)``. `dem_array` is best read decimated
+        by the same factor (``srtm.get_dem(..., decimation=factor)``);
+        pass the full-resolution ``dem_meta["stats"]`` range as
+        `dem_range` when known, so colors and contour levels match the
+        final render. Other parameters are those of `render`.
+        """
+        preview_width, preview_height = preview_size(width, height, factor)
+        return self.render(
+            dem_array,
+            lat,
+            lon,
+            zoom_level - math.log2(factor),
+            preview_width,
+            preview_height,
+            **kwargs,
+        )
+
+    def composite(
+        self,
+        layers: dict[str, np.ndarray],
+        contour_interval: float | None = None,
+        background_color: str | list[str] = "#2a2a2a",
+        contour_color: str | list[str] = "white",
+        profiler: Profiler | None = None,
+        min_ring_area: float = 0.0,
+    ) -> np.ndarray:
+        """
+        Color the terrain layers and draw contours; returns (height, width, 3)
+        uint8 RGB pixels.
+        """
+        height, width = layers["dem"].shape
+        dem_min, dem_max = (float(v) for v in layers["dem_range"])
+
+        with profiling.stage(profiler, "colorize"):
+            hillshade_rgb = wallpaper.colorize(
+                layers["hillshade"],
+                layers["dem_norm"],
+                background_color,
+                out=self._buffer(width, height),
+            )
+
+        fig, canvas = self._figure(width, height)
+        ax = fig.axes[0]
+        ax.clear()
+        ax.set_axis_off()
+        wallpaper.draw_wallpaper(
+            ax,
+            hillshade_rgb,
+            layers["dem"],
+            dem_min,
+            dem_max,
+            contour_interval=contour_interval,
+            contour_color=contour_color,
+            profiler=profiler,
+            min_ring_area=min_ring_area,
+        )
+
+        with profiling.stage(profiler, "rasterize"):
+            canvas.draw()
+            image = np.ascontiguousarray(np.asarray(canvas.buffer_rgba())[:, :, :3])
+        return image
+
+    def contour_overlay(
+        self,
+        layers: dict[str, np.ndarray],
+        contour_interval: float,
+        contour_color: str | list[str] = "white",
+        profiler: Profiler | None = None,
+    ) -> np.ndarray:
+        """
+        Draw only the contour lines on a transparent background; returns
+        (height, width, 4) float RGBA values in 0..1 (straight alpha).
+
+        The overlay can be blended over any number of recolored or
+        reshaded backgrounds of the same terrain.
+        """
+        height, width = layers["dem"].shape
+        dem_min, dem_max = (float(v) for v in layers["dem_range"])
+
+        fig, canvas = self._figure(width, height)
+        ax = fig.axes[0]
+        ax.clear()
+        ax.set_axis_off()
+        ax.set_xlim(0, width)
+        ax.set_ylim(0, height)
+        fig.patch.set_alpha(0)
+        try:
+            wallpaper.draw_contours(
+                ax,
+                layers["dem"],
+                dem_min,
+                dem_max,
+                contour_interval,
+                contour_color,
+                profiler=profiler,
+            )
+            with profiling.stage(profiler, "rasterize"):
+                canvas.draw()
+                overlay = np.asarray(canvas.buffer_rgba()) / 255
+        finally:
+            fig.patch.set_alpha(None)
+        return overlay
+
+    def _figure(self, width: int, height: int) -> tuple[Figure, FigureCanvasAgg]:
+        key = (width, height)
+        if key in self._figures:
+            self._figures.move_to_end(key)
+        else:
+            fig = Figure(figsize=(width / self.dpi, height / self.dpi), dpi=self.dpi)
+            canvas = FigureCanvasAgg(fig)
+            fig.add_axes((0, 0, 1, 1))
+            self._figures[key] = (fig, canvas)
+            while len(self._figures) > MAX_CACHED_SIZES:
+                _, (old_fig, _) = self._figures.popitem(last=False)
+                old_fig.clear()
+        return self._figures[key]
+
+    def _buffer(self, width: int, height: int) -> np.ndarray:
+        key = (width, height)
+        if key in self._buffers:
+            self._buffers.move_to_end(key)
+        else:
+            self._buffers[key] = np.empty((height, width, 3))
+            while len(self._buffers) > MAX_CACHED_SIZES:
+                self._buffers.popitem(last=False)
+        return self._buffers[key]
@@ -11,6 +11,8 @@ from __future__ import annotations
 
 import math
 
+import numpy as np
+
 
 WEB_MERCATOR_INITIAL_RESOLUTION = 156543.03392804097
 """
@@ -43,6 +45,26 @@ def meters_per_pixel(latitude_deg: float, zoom: int) -> float:
     return WEB_MERCATOR_INITIAL_RESOLUTION * math.cos(latitude_rad) / (2**zoom)
 
 
+def meters_per_pixel_array(
+    latitude_deg: np.ndarray, zoom: np.ndarray
+) -> np.ndarray:
+    """
+    Vectorized `meters_per_pixel` over arrays of latitudes and zoom levels
+    (broadcast together).
+
+    Raises
+    ------
+    ValueError
+        If any zoom level is negative.
+    """
+    zoom = np.asarray(zoom, dtype=np.float64)
+    if np.any(zoom < 0):
+        raise ValueError("zoom level must be non-negative")
+
+    latitude_rad = np.radians(np.asarray(latitude_deg, dtype=np.float64))
+    return WEB_MERCATOR_INITIAL_RESOLUTION * np.cos(latitude_rad) / np.exp2(zoom)
+
+
 def extent_meters(
     latitude_deg: float,
     zoom: int,
@@ -74,3 +96,67 @@ def extent_meters(
 
     mpp = meters_per_pixel(latitude_deg, zoom)
     return width_px * mpp, height_px * mpp
+
+
+def world_to_lonlat(
+    x: np.ndarray | float, y: np.ndarray | float
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convert normalized Web Mercator world coordinates to degrees.
+
+    Parameters
+    ----------
+    x, y : array_like
+        World coordinates in 0..1, from the antimeridian eastwards and from
+        the top (north) of the map downwards, as in XYZ tile schemes.
+
+    Returns
+    -------
+    (numpy.ndarray, numpy.ndarray)
+        Longitude and latitude in degrees.
+    """
+    lon = np.asarray(x, dtype=np.float64) * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y, dtype=np.float64)))))
+    return lon, lat
+
+
+def lonlat_to_world(
+    lon: np.ndarray | float, lat: np.ndarray | float
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convert degrees to normalized Web Mercator world coordinates
+    (inverse of `world_to_lonlat`).
+    """
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+    lat_rad = np.radians(np.asarray(lat, dtype=np.float64))
+    y = (1 - np.arcsinh(np.tan(lat_rad)) / np.pi) / 2
+    return x, y
+
+
+def pixel_grid(
+    latitude_deg: float,
+    longitude_deg: float,
+    zoom: float,
+    width_px: int,
+    height_px: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return the geographic coordinates of the pixel centres of an image
+    centred on a point, on the Web Mercator grid of a zoom level.
+
+    Web Mercator is separable: every column shares a longitude and every
+    row a latitude.
+
+    Returns
+    -------
+    (numpy.ndarray, numpy.ndarray)
+        Longitudes of the `width_px` columns and latitudes of the
+        `height_px` rows (north to south), in degrees.
+    """
+    world_px = 256 * 2**zoom
+    cx, cy = lonlat_to_world(longitude_deg, latitude_deg)
+    x = cx + (np.arange(width_px) + 0.5 - width_px / 2) / world_px
+    y = cy + (np.arange(height_px) + 0.5 - height_px / 2) / world_px
+    lon, _ = world_to_lonlat(x, 0.5)
+    _, lat = world_to_lonlat(0.5, y)
+    return lon, lat
@@ -0,0 +1,428 @@
+# /src/isohypseswallpaper/scheduler.py
+
+"""
+Background pre-render scheduler for wallpaper rotation.
+
+Keep a ready pool of rendered wallpapers filled ahead of a desktop
+rotation, so switching wallpaper never waits for a render. Jobs come from
+a batch configuration (see `batch`: locations x zoom levels x themes,
+with screen presets) and are rendered in order, cycling through the queue,
+into a pool directory holding at most ``pool_size`` ready wallpapers.
+The rotation takes the oldest one with `take_ready` (or the ``next``
+command), which frees a slot.
+
+Rendering stays in the background:
+
+- the process runs at a lower priority (``nice``); on Linux the I/O
+  priority of a process without an explicit I/O class follows its nice
+  level, so DEM reads are deprioritized too;
+- at most ``workers`` renders run at once, in worker processes;
+- no render starts while the load average per CPU, not counting the
+  scheduler's own renders, is above ``max_load``.
+
+DEM windows are kept in memory and reused across queued jobs, and
+consecutive jobs of one location and zoom level (several themes) are
+rendered together in one worker, sharing its terrain layers.
+Wallpapers are written under a hidden temporary name and renamed into
+the pool when complete, so the rotation never sees a partial file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import replace
+from typing import Callable
+
+import numpy as np
+
+from isohypseswallpaper import batch, srtm
+from isohypseswallpaper.batch import BatchJob
+from isohypseswallpaper.cache import MemoryCache
+
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_NICE = 10
+DEFAULT_DEM_CACHE_MB = 512
+DEFAULT_POLL_INTERVAL = 10.0
+
+PARTIAL_PREFIX = ".partial-"
+"""Prefix of wallpapers being written into the pool."""
+
+
+def ready_wallpapers(pool_dir: str) -> list[str]:
+    """
+    Return the paths of the ready wallpapers in `pool_dir`, oldest first.
+
+    Hidden files (including wallpapers still being written) are ignored.
+    """
+    try:
+        entries = [e for e in os.scandir(pool_dir) if e.is_file() and not e.name.startswith(".")]
+    except FileNotFoundError:
+        return []
+    entries.sort(key=lambda e: (e.stat().st_mtime_ns, e.name))
+    return [e.path for e in entries]
+
+
+def take_ready(pool_dir: str, dest: str) -> str | None:
+    """
+    Move the oldest ready wallpaper of `pool_dir` to `dest`, freeing its
+    slot in the pool.
+
+    `dest` is a file path, replaced if it exists, or an existing directory
+    to move the wallpaper into. Returns the new path of the wallpaper, or
+    None if the pool is empty.
+    """
+    ready = ready_wallpapers(pool_dir)
+    if not ready:
+        return None
+    if os.path.isdir(dest):
+        dest = os.path.join(dest, os.path.basename(ready[0]))
+    return shutil.move(ready[0], dest)
+
+
+def load_average() -> float:
+    """Return the 1-minute load average per CPU."""
+    return os.getloadavg()[0] / (os.cpu_count() or 1)
+
+
+def render_group(jobs: list[BatchJob], dem: tuple[np.ndarray, dict]) -> list[str]:
+    """
+    Render jobs sharing one DEM window, then move each wallpaper from its
+    temporary name to its output path. Terrain layers are computed once
+    and reused by the following jobs.
+
+    Returns the output paths.
+    """
+    layers = MemoryCache()
+    for job in jobs:
+        directory, name = os.path.split(job.output)
+        partial = os.path.join(directory, PARTIAL_PREFIX + name)
+        batch.render_job(replace(job, output=partial), cache=layers, dem=dem)
+        os.replace(partial, job.output)
+    return [job.output for job in jobs]
+
+
+def _set_nice(increment: int) -> None:
+    if increment:
+        os.nice(increment)
+
+
+class Scheduler:
+    """
+    Render queued wallpapers ahead into a bounded ready pool.
+
+    Parameters
+    ----------
+    jobs : list[BatchJob]
+        Upcoming wallpapers, in rotation order. Outputs are written to
+        `pool_dir` under the file name of ``job.output``.
+    pool_dir : str
+        Directory of the ready pool.
+    pool_size : int
+        Maximum number of ready (and in progress) wallpapers in the pool.
+    workers : int
+        Maximum number of concurrent renders. With 1, renders run in the
+        scheduler process.
+    nice : int
+        Niceness increment applied to the scheduler process (inherited by
+        its workers) when it starts running.
+    max_load : float | None
+        Pause while the load average per CPU, minus the running renders,
+        is above this value. None never pauses.
+    cycle : bool
+        Queue each job again after rendering it, for an endless rotation.
+    dem_budget_bytes : int
+        Memory budget of the DEM window cache.
+    tiles_dir : str | None
+        Optional directory of local DEM tiles, passed to `srtm.get_dem`.
+    load_average : callable
+        Returns the load average per CPU (for tests).
+    """
+
+    def __init__(
+        self,
+        jobs: list[BatchJob],
+        pool_dir: str,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        workers: int = 1,
+        nice: int = DEFAULT_NICE,
+        max_load: float | None = None,
+        cycle: bool = True,
+        dem_budget_bytes: int = DEFAULT_DEM_CACHE_MB * 1024**2,
+        tiles_dir: str | None = None,
+        load_average: Callable[[], float] = load_average,
+    ) -> None:
+        if pool_size < 1 or workers < 1:
+            raise ValueError("pool_size and workers must be at least 1")
+        self.queue = deque(
+            replace(job, output=os.path.join(pool_dir, os.path.basename(job.output)))
+            for job in jobs
+        )
+        self.pool_dir = pool_dir
+        self.pool_size = pool_size
+        self.workers = workers
+        self.nice = nice
+        self.max_load = max_load
+        self.cycle = cycle
+        self.tiles_dir = tiles_dir
+        self.load_average = load_average
+        self.dems = MemoryCache(dem_budget_bytes)
+        self.rendered = 0
+        self.failures: list[tuple[BatchJob, Exception]] = []
+        self.paused = 0
+        self._running: dict[Future, list[BatchJob]] = {}
+        self._niced = False
+
+    def in_progress(self) -> int:
+        """Return the number of wallpapers being rendered."""
+        return sum(len(group) for group in self._running.values())
+
+    def free_slots(self) -> int:
+        """Return the number of pool slots not ready nor in progress."""
+        return self.pool_size - len(ready_wallpapers(self.pool_dir)) - self.in_progress()
+
+    def overloaded(self) -> bool:
+        """
+        Return True if the load from other processes is above `max_load`.
+        """
+        if self.max_load is None:
+            return False
+        cpus = os.cpu_count() or 1
+        return self.load_average() - len(self._running) / cpus > self.max_load
+
+    def fetch_dem(self, job: BatchJob) -> tuple[np.ndarray, dict]:
+        """
+        Return the DEM window of `job` and its metadata, from memory when
+        possible.
+        """
+        bbox = batch.job_bbox(job)
+        key = tuple(round(v, 6) for v in bbox)
+        entry = self.dems.get(key)
+        if entry is None:
+            entry = srtm.get_dem(*bbox, resolution=30, tiles_dir=self.tiles_dir)
+            self.dems.put(key, entry)
+        return entry
+
+    def next_group(self, slots: int) -> list[BatchJob]:
+        """
+        Dequeue up to `slots` jobs to render together: the next job whose
+        wallpaper is not already in the pool, and the queued jobs right
+        after it with the same DEM window. Returns [] if the queue has no
+        job to render.
+        """
+        group: list[BatchJob] = []
+        busy = {job.output for jobs in self._running.values() for job in jobs}
+        for _ in range(len(self.queue)):
+            if len(group) == slots:
+                break
+            job = self.queue[0]
+            if group and batch.job_bbox(job) != batch.job_bbox(group[0]):
+                break
+            self.queue.popleft()
+            if os.path.exists(job.output) or job.output in busy:
+                # Still in the pool from a previous cycle
+                if self.cycle:
+                    self.queue.append(job)
+                if group:
+                    break
+                continue
+            group.append(job)
+        return group
+
+    def start(self, executor: ProcessPoolExecutor | None) -> bool:
+        """
+        Start rendering the next group of jobs if a worker and pool slots
+        are free and the system is not overloaded; returns True if a
+        render was started. A group whose DEM cannot be fetched is
+        recorded as failed by the next `collect`.
+        """
+        slots = self.free_slots()
+        if slots <= 0 or len(self._running) >= self.workers or not self.queue:
+            return False
+        if self.overloaded():
+            self.paused += 1
+            return False
+
+        group = self.next_group(slots)
+        if not group:
+            return False
+        if self.cycle:
+            self.queue.extend(group)
+
+        os.makedirs(self.pool_dir, exist_ok=True)
+        try:
+            dem = self.fetch_dem(group[0])
+            if executor is None:
+                future = Future()
+                future.set_result(render_group(group, dem))
+            else:
+                future = executor.submit(render_group, group, dem)
+        except Exception as e:
+            # A failed DEM fetch (or inline render) fails the group through
+            # collect, like a failed worker render
+            future = Future()
+            future.set_exception(e)
+        self._running[future] = group
+        return True
+
+    def collect(self, timeout: float | None = 0) -> list[str]:
+        """
+        Wait up to `timeout` seconds for a running render to finish, and
+        return the outputs of the finished ones. Failed renders are
+        recorded in `failures`, with their exception, and their partial
+        files removed.
+        """
+        done, _ = wait(self._running, timeout=timeout, return_when=FIRST_COMPLETED)
+        outputs = []
+        for future in done:
+            group = self._running.pop(future)
+            try:
+                outputs.extend(future.result())
+                self.rendered += len(group)
+            except Exception as e:
+                # Tracebacks would keep the DEM of the render alive
+                e = e.with_traceback(None)
+                self.failures.extend((job, e) for job in group)
+                for job in group:
+                    directory, name = os.path.split(job.output)
+                    partial = os.path.join(directory, PARTIAL_PREFIX + name)
+                    if os.path.exists(partial):
+                        os.remove(partial)
+        return outputs
+
+    def run(
+        self,
+        until_full: bool = False,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ) -> None:
+        """
+        Keep the ready pool filled, forever or, with `until_full`, until
+        the pool is full or the queue has nothing left to render.
+
+        While the pool is full or the system overloaded, the pool and load
+        are checked again every `poll_interval` seconds.
+        """
+        if not self._niced:
+            _set_nice(self.nice)
+            self._niced = True
+
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            while True:
+                if self.start(executor):
+                    continue
+                if self._running:
+                    self.collect(timeout=poll_interval)
+                    continue
+                if until_full and (self.free_slots() <= 0 or not self.next_startable()):
+                    break
+                time.sleep(poll_interval)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+            if self._running:
+                self.collect(timeout=None)
+
+    def next_startable(self) -> bool:
+        """
+        Return True if some queued wallpaper is not already in the pool.
+        """
+        return any(not os.path.exists(job.output) for job in self.queue)
+
+    def stats(self) -> dict:
+        """
+        Return the pool state and render counts.
+        """
+        return {
+            "ready": len(ready_wallpapers(self.pool_dir)),
+            "in_progress": self.in_progress(),
+            "queued": len(self.queue),
+            "rendered": self.rendered,
+            "failed": len(self.failures),
+            "paused": self.paused,
+            "dem_cache": {"hits": self.dems.hits, "misses": self.dems.misses},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pre-render wallpapers into a ready pool for desktop rotation."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Keep the ready pool filled in the background")
+    run.add_argument("config", type=str, help="Path to the TOML batch configuration")
+    run.add_argument("--pool", type=str, required=True, help="Directory of the ready pool")
+    run.add_argument(
+        "--pool-size", type=int, default=DEFAULT_POOL_SIZE,
+        help=f"Number of wallpapers kept ready (default: {DEFAULT_POOL_SIZE})",
+    )
+    run.add_argument(
+        "--workers", type=int, default=1, help="Maximum concurrent renders (default: 1)"
+    )
+    run.add_argument(
+        "--nice", type=int, default=DEFAULT_NICE,
+        help=f"Niceness increment of the renders (default: {DEFAULT_NICE})",
+    )
+    run.add_argument(
+        "--max-load", type=float, default=None,
+        help="Pause while the load average per CPU from other processes is above this",
+    )
+    run.add_argument(
+        "--poll", type=float, default=DEFAULT_POLL_INTERVAL,
+        help=f"Seconds between pool and load checks (default: {DEFAULT_POLL_INTERVAL:g})",
+    )
+    run.add_argument(
+        "--once", action="store_true",
+        help="Exit once the pool is full instead of running forever",
+    )
+    run.add_argument(
+        "--dem-cache-mb", type=int, default=DEFAULT_DEM_CACHE_MB,
+        help="Memory budget for cached DEM windows",
+    )
+    run.add_argument(
+        "--tiles-dir", type=str, default=None,
+        help="Read DEM tiles from this local directory instead of downloading",
+    )
+
+    take = commands.add_parser("next", help="Move the oldest ready wallpaper out of the pool")
+    take.add_argument("pool", type=str, help="Directory of the ready pool")
+    take.add_argument("dest", type=str, help="Destination file or directory")
+
+    args = parser.parse_args()
+
+    if args.command == "next":
+        path = take_ready(args.pool, args.dest)
+        if path is None:
+            parser.exit(1, "The ready pool is empty\n")
+        print(path)
+        return
+
+    scheduler = Scheduler(
+        batch.load_jobs(args.config),
+        pool_dir=args.pool,
+        pool_size=args.pool_size,
+        workers=args.workers,
+        nice=args.nice,
+        max_load=args.max_load,
+        cycle=not args.once,
+        dem_budget_bytes=args.dem_cache_mb * 1024**2,
+        tiles_dir=args.tiles_dir,
+    )
+    try:
+        scheduler.run(until_full=args.once, poll_interval=args.poll)
+    except KeyboardInterrupt:
+        pass
+    for job, error in scheduler.failures:
+        print(f"Render of {job.output} failed: {error}")
+    stats = scheduler.stats()
+    print(f"{stats['rendered']} rendered, {stats['ready']} ready in {args.pool}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+# /src/isohypseswallpaper/service.py
+
+"""
+Local render service.
+
+Expose wallpaper rendering over HTTP, on a TCP port or a Unix socket,
+from a long-running process that keeps DEM windows, terrain layers and
+theme color tables warm in memory. Identical concurrent requests are
+coalesced into a single render.
+
+API
+---
+``POST /render``
+    JSON body with ``lat``, ``lon``, ``zoom_level``, either ``preset`` or
+    ``width`` and ``height``, and optionally ``contour``, ``bgcolor``,
+    ``contour_color`` and ``theme`` (same names as the CLI options).
+    Returns the PNG image.
+``GET /tiles/{theme}/{z}/{x}/{y}.png``
+    Returns an XYZ tile of the styled relief (see `tiles`); add
+    ``?contour=50`` for contour lines. Tiles are cached on disk.
+``GET /health``
+    Returns cache and render statistics as JSON.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import queue
+import re
+import socketserver
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from isohypseswallpaper import __version__, geometry, scale, srtm, themes
+from isohypseswallpaper.cache import MemoryCache, stage_key
+from isohypseswallpaper.renderer import Renderer
+from isohypseswallpaper.tiles import DEFAULT_TILE_SIZE, TileRenderer
+
+from .presets import SCREEN_PRESETS
+
+
+DEFAULT_PORT = 8765
+
+DEFAULT_DEM_CACHE_MB = 512
+DEFAULT_LAYER_CACHE_MB = 2048
+
+DEFAULT_RENDER_WORKERS = 2
+
+MAX_PIXELS = 7680 * 4320
+"""Largest accepted render (8K), so one request cannot exhaust memory."""
+
+TILE_PATH = re.compile(r"^/tiles/(\w+)/(\d+)/(\d+)/(\d+)\.png$")
+
+
+class RenderService:
+    """
+    Render wallpapers on demand, reusing DEMs and terrain layers.
+
+    Parameters
+    ----------
+    dem_budget_bytes : int
+        Memory budget of the DEM window cache.
+    layer_budget_bytes : int
+        Memory budget of the terrain layer cache (resampled DEM,
+        hillshade, normalized DEM).
+    tiles_dir : str | None
+        Optional directory of local DEM tiles, passed to `srtm.get_dem`.
+    tile_cache_dir : str | None
+        Directory of the XYZ tile cache (see `tiles.TileRenderer`).
+    tile_size : int
+        Size of XYZ tiles in pixels.
+    render_workers : int
+        Number of wallpapers rendered at once; further requests wait for
+        a free renderer.
+    """
+
+    def __init__(
+        self,
+        dem_budget_bytes: int = DEFAULT_DEM_CACHE_MB * 1024**2,
+        layer_budget_bytes: int = DEFAULT_LAYER_CACHE_MB * 1024**2,
+        tiles_dir: str | None = None,
+        tile_cache_dir: str | None = None,
+        tile_size: int = DEFAULT_TILE_SIZE,
+        render_workers: int = DEFAULT_RENDER_WORKERS,
+    ) -> None:
+        self.dems = MemoryCache(dem_budget_bytes)
+        self.layers = MemoryCache(layer_budget_bytes)
+        self.tiles_dir = tiles_dir
+        self.tiles = TileRenderer(
+            cache_dir=tile_cache_dir, fetch_dem=self.fetch_bbox_dem, tile_size=tile_size
+        )
+        self.renders = 0
+        self.coalesced = 0
+        self._inflight: dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        # Handler threads update the counters concurrently
+        self._stats_lock = threading.Lock()
+        # get_dem clips into a shared file, so fetches run one at a time
+        self._fetch_lock = threading.Lock()
+        # Renderers are not thread-safe; handler threads check one out of
+        # a fixed pool, all sharing the layer cache, which also bounds the
+        # number of concurrent renders
+        self._renderers: queue.Queue[Renderer] = queue.Queue()
+        for _ in range(render_workers):
+            self._renderers.put(Renderer(cache=self.layers))
+
+    def parse_request(self, payload: dict) -> dict:
+        """
+        Validate a render request and return normalized parameters.
+
+        Raises
+        ------
+        ValueError
+            If a required field is missing or a value is invalid.
+        """
+        try:
+            params = {
+                "lat": float(payload["lat"]),
+                "lon": float(payload["lon"]),
+                "zoom_level": int(payload["zoom_level"]),
+            }
+        except KeyError as e:
+            raise ValueError(f"Missing field: {e.args[0]}") from None
+
+        preset = payload.get("preset")
+        if preset:
+            if preset not in SCREEN_PRESETS:
+                raise ValueError(f"Unknown preset '{preset}'")
+            params["width"], params["height"] = SCREEN_PRESETS[preset]
+        elif "width" in payload and "height" in payload:
+            params["width"], params["height"] = int(payload["width"]), int(payload["height"])
+        else:
+            raise ValueError("Either preset or both width and height must be provided")
+        if params["width"] <= 0 or params["height"] <= 0:
+            raise ValueError("width and height must be positive")
+        if params["width"] * params["height"] > MAX_PIXELS:
+            raise ValueError(f"Renders are limited to {MAX_PIXELS} pixels")
+
+        theme = payload.get("theme")
+        if theme is not None and theme not in themes.THEMES:
+            raise ValueError(f"Unknown theme '{theme}'")
+
+        contour = float(payload["contour"]) if payload.get("contour") is not None else None
+        if contour is not None and not (math.isfinite(contour) and contour > 0):
+            raise ValueError("contour must be a positive number")
+        params.update(
+            contour_interval=contour,
+            background_color=payload.get("bgcolor", "#2a2a2a"),
+            contour_color=payload.get("contour_color", "white"),
+            theme=theme,
+        )
+        return params
+
+    def fetch_dem(
+        self, lat: float, lon: float, zoom_level: int, width: int, height: int
+    ) -> tuple[np.ndarray, dict]:
+        """
+        Return the DEM window for a render and its metadata, from memory
+        when possible.
+        """
+        m_per_px = scale.meters_per_pixel(lat, zoom_level)
+        bbox = geometry.bounding_box(lat, lon, width * m_per_px, height * m_per_px)
+        return self.fetch_bbox_dem(bbox)
+
+    def fetch_bbox_dem(
+        self, bbox: tuple[float, float, float, float]
+    ) -> tuple[np.ndarray, dict]:
+        """
+        Return the DEM window covering `bbox` and its metadata, from
+        memory when possible.
+        """
+        key = tuple(round(v, 6) for v in bbox)
+
+        entry = self.dems.get(key)
+        if entry is None:
+            with self._fetch_lock:
+                # Another thread may have fetched it while this one waited
+                entry = self.dems.get(key)
+                if entry is None:
+                    entry = srtm.get_dem(*bbox, resolution=30, tiles_dir=self.tiles_dir)
+                    self.dems.put(key, entry)
+        return entry
+
+    def render(self, params: dict) -> bytes:
+        """
+        Render the wallpaper described by `params` and return PNG bytes.
+
+        Concurrent calls with identical parameters wait for the first one
+        and share its result.
+        """
+        key = stage_key(**params)
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                with self._stats_lock:
+                    self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            image = self._render(params)
+            future.set_result(image)
+            return image
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+
+    def _render(self, params: dict) -> bytes:
+        dem_array, dem_meta = self.fetch_dem(
+            params["lat"], params["lon"], params["zoom_level"],
+            params["width"], params["height"],
+        )
+
+        renderer = self._renderers.get()
+        try:
+            image = renderer.render(
+                dem_array=dem_array,
+                dem_transform=dem_meta.get("transform"),
+                dem_range=srtm.stats_range(dem_meta),
+                **params,
+            ).to_bytes()
+        finally:
+            self._renderers.put(renderer)
+        with self._stats_lock:
+            self.renders += 1
+        return image
+
+    def stats(self) -> dict:
+        """
+        Return render counts and cache statistics.
+        """
+        with self._stats_lock:
+            renders, coalesced = self.renders, self.coalesced
+        return {
+            "version": __version__,
+            "renders": renders,
+            "coalesced": coalesced,
+            "dem_cache": {
+                "entries": len(self.dems),
+                "bytes": self.dems.size_bytes(),
+                "hits": self.dems.hits,
+                "misses": self.dems.misses,
+            },
+            "layer_cache": {
+                "entries": len(self.layers),
+                "bytes": self.layers.size_bytes(),
+                "hits": self.layers.hits,
+                "misses": self.layers.misses,
+            },
+            "tiles": self.tiles.stats(),
+        }
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler for the render service (``server.service``).
+    """
+
+    server_version = f"IsohypsesWallpaper/{__version__}"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            self._send_json(200, self.server.service.stats())
+            return
+
+        match = TILE_PATH.match(url.path)
+        if match is None:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        theme = match.group(1)
+        z, x, y = (int(v) for v in match.groups()[1:])
+        try:
+            contour = parse_qs(url.query).get("contour")
+            contour_interval = float(contour[0]) if contour else None
+            tile = self.server.service.tiles.get_tile(theme, z, x, y, contour_interval)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        self._send_png(tile)
+
+    def do_POST(self):
+        if self.path != "/render":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        service = self.server.service
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            params = service.parse_request(payload)
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        try:
+            image = service.render(params)
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        self._send_png(image)
+
+    def address_string(self):
+        # Unix socket clients have no (host, port) address
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "unix"
+
+    def _send_png(self, image: bytes) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(image)))
+        self.end_headers()
+        self.wfile.write(image)
+
+    def _send_json(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Threaded HTTP server listening on a Unix socket.
+    """
+
+    daemon_threads = True
+
+
+def make_server(
+    service: RenderService,
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    socket_path: str | None = None,
+):
+    """
+    Create an HTTP server for `service`, on a Unix socket if `socket_path`
+    is given, otherwise on `host`:`port`.
+    """
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, RenderRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), RenderRequestHandler)
+    server.service = service
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve wallpaper renders over a local HTTP API."
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port")
+    parser.add_argument(
+        "--socket", type=str, default=None, help="Listen on this Unix socket instead"
+    )
+    parser.add_argument(
+        "--dem-cache-mb", type=int, default=DEFAULT_DEM_CACHE_MB,
+        help="Memory budget for cached DEM windows",
+    )
+    parser.add_argument(
+        "--layer-cache-mb", type=int, default=DEFAULT_LAYER_CACHE_MB,
+        help="Memory budget for cached terrain layers",
+    )
+    parser.add_argument(
+        "--tiles-dir", type=str, default=None,
+        help="Read DEM tiles from this local directory instead of downloading",
+    )
+    parser.add_argument(
+        "--tile-cache", type=str, default=None,
+        help="Directory of the rendered XYZ tile cache",
+    )
+    parser.add_argument(
+        "--tile-size", type=int, choices=[256, 512], default=DEFAULT_TILE_SIZE,
+        help="Size of XYZ tiles in pixels",
+    )
+    parser.add_argument(
+        "--render-workers", type=int, default=DEFAULT_RENDER_WORKERS,
+        help="Wallpapers rendered at once; further requests wait",
+    )
+
+    args = parser.parse_args()
+
+    service = RenderService(
+        dem_budget_bytes=args.dem_cache_mb * 1024**2,
+        layer_budget_bytes=args.layer_cache_mb * 1024**2,
+        tiles_dir=args.tiles_dir,
+        tile_cache_dir=args.tile_cache,
+        tile_size=args.tile_size,
+        render_workers=args.render_workers,
+    )
+    server = make_server(service, args.host, args.port, args.socket)
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"Serving wallpapers on {where}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
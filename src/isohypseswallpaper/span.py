@@ -0,0 +1,330 @@
+# /src/isohypseswallpaper/span.py
+
+"""
+Multi-monitor span mode.
+
+Render one continuous terrain across several displays of mixed sizes.
+The layout gives each display's size (a `SCREEN_PRESETS` name or
+``WIDTHxHEIGHT``) and its position on a shared pixel canvas; the canvas
+is centred on the requested location and every display is a window of
+the same Web Mercator pixel grid, so terrain, hillshade and contours line
+up across bezels.
+
+One DEM covering the whole layout is fetched once. Regions are rendered
+with a halo of extra pixels, and share the elevation range and the
+hillshade stretch of the whole canvas, so there are no seams whether the
+canvas is rendered in one piece or strip by strip (one strip per
+display, which needs far less memory on wide desks).
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+from . import encoders, scale, srtm, wallpaper
+from .presets import SCREEN_PRESETS
+from .renderer import RenderedImage, Renderer
+
+
+DEFAULT_HALO = 16
+"""Extra pixels rendered around each region, then cropped."""
+
+LAYOUT_PATTERN = re.compile(
+    r"^(?:(?P<name>[\w-]+)=)?(?P<size>\w+)@(?P<x>-?\d+),(?P<y>-?\d+)$"
+)
+
+
+@dataclass(frozen=True)
+class Display:
+    """
+    A display of the layout: its size and the position of its top-left
+    corner on the canvas, in pixels.
+    """
+
+    name: str
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+def parse_display(spec: str, index: int = 0) -> Display:
+    """
+    Parse a display spec ``[NAME=]SIZE@X,Y``, where SIZE is a screen
+    preset (e.g. ``4k``) or ``WIDTHxHEIGHT``. Unnamed displays are called
+    ``screen<index + 1>``.
+
+    Raises
+    ------
+    ValueError
+        If the spec or its size is invalid.
+    """
+    match = LAYOUT_PATTERN.match(spec.strip())
+    if match is None:
+        raise ValueError(f"Invalid display '{spec}', expected [NAME=]SIZE@X,Y")
+
+    size = match["size"]
+    if size in SCREEN_PRESETS:
+        width, height = SCREEN_PRESETS[size]
+    else:
+        dims = re.fullmatch(r"(\d+)x(\d+)", size)
+        if dims is None:
+            raise ValueError(
+                f"Unknown display size '{size}': use one of "
+                f"{', '.join(SCREEN_PRESETS)} or WIDTHxHEIGHT"
+            )
+        width, height = int(dims[1]), int(dims[2])
+
+    return Display(
+        name=match["name"] or f"screen{index + 1}",
+        x=int(match["x"]),
+        y=int(match["y"]),
+        width=width,
+        height=height,
+    )
+
+
+def parse_layout(specs: list[str]) -> list[Display]:
+    """
+    Parse display specs (see `parse_display`) into a layout.
+
+    Raises
+    ------
+    ValueError
+        If a spec is invalid, names repeat or displays overlap.
+    """
+    displays = [parse_display(spec, i) for i, spec in enumerate(specs)]
+    if not displays:
+        raise ValueError("The layout has no displays")
+
+    names = [d.name for d in displays]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Display names must be unique: {', '.join(names)}")
+
+    for i, a in enumerate(displays):
+        for b in displays[i + 1 :]:
+            if (
+                a.x < b.x + b.width and b.x < a.x + a.width
+                and a.y < b.y + b.height and b.y < a.y + a.height
+            ):
+                raise ValueError(f"Displays '{a.name}' and '{b.name}' overlap")
+    return displays
+
+
+def canvas_size(displays: list[Display]) -> tuple[int, int, int, int]:
+    """
+    Return the (x, y, width, height) pixel box covering every display.
+    """
+    x0 = min(d.x for d in displays)
+    y0 = min(d.y for d in displays)
+    x1 = max(d.x + d.width for d in displays)
+    y1 = max(d.y + d.height for d in displays)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def region_center(
+    lat: float,
+    lon: float,
+    zoom_level: int,
+    displays: list[Display],
+    x: float,
+    y: float,
+    width: int,
+    height: int,
+) -> tuple[float, float]:
+    """
+    Return the (lat, lon) centre of the canvas region at (`x`, `y`) of
+    size (`width`, `height`), the canvas being centred on (`lat`, `lon`).
+    """
+    cx0, cy0, canvas_w, canvas_h = canvas_size(displays)
+    world_px = 256 * 2**zoom_level
+    wx, wy = scale.lonlat_to_world(lon, lat)
+    dx = x + width / 2 - (cx0 + canvas_w / 2)
+    dy = y + height / 2 - (cy0 + canvas_h / 2)
+    region_lon, region_lat = scale.world_to_lonlat(wx + dx / world_px, wy + dy / world_px)
+    return float(region_lat), float(region_lon)
+
+
+def layout_bbox(
+    lat: float,
+    lon: float,
+    zoom_level: int,
+    displays: list[Display],
+    halo: int = DEFAULT_HALO,
+) -> tuple[float, float, float, float]:
+    """
+    Return the (lat_min, lat_max, lon_min, lon_max) bounding box of the
+    canvas grown by `halo` pixels, with one more pixel of margin for
+    resampling.
+    """
+    _, _, canvas_w, canvas_h = canvas_size(displays)
+    margin = halo + 1
+    lons, lats = scale.pixel_grid(
+        lat, lon, zoom_level, canvas_w + 2 * margin, canvas_h + 2 * margin
+    )
+    return float(lats[-1]), float(lats[0]), float(lons[0]), float(lons[-1])
+
+
+def display_path(output: str, display: Display) -> str:
+    """
+    Return the output path of `display`: ``root_<name>.ext``.
+    """
+    root, ext = os.path.splitext(output)
+    return f"{root}_{display.name}{ext or '.png'}"
+
+
+def render_span(
+    dem_array: np.ndarray,
+    dem_transform,
+    lat: float,
+    lon: float,
+    zoom_level: int,
+    displays: list[Display],
+    contour_interval: float | None = None,
+    background_color: str | list[str] = "#2a2a2a",
+    contour_color: str | list[str] = "white",
+    theme: str | None = None,
+    strips: bool = False,
+    halo: int = DEFAULT_HALO,
+    renderer: Renderer | None = None,
+    dem_source: str = "SRTM1",
+    dem_resolution: int = 30,
+) -> dict[str, RenderedImage]:
+    """
+    Render the terrain spanning `displays`, one image per display.
+
+    Parameters
+    ----------
+    dem_array : numpy.ndarray
+        DEM covering `layout_bbox` of the layout.
+    dem_transform : affine.Affine
+        Geotransform of `dem_array` (``dem_meta["transform"]``).
+    lat, lon : float
+        Centre of the canvas.
+    strips : bool
+        Render each display separately instead of the whole canvas at
+        once. Backgrounds are identical; contour lines may differ by a
+        pixel of antialiasing.
+
+    Returns
+    -------
+    dict
+        Display name to `RenderedImage`, in layout order.
+    """
+    renderer = renderer if renderer is not None else Renderer()
+    background_color, contour_color = wallpaper.theme_colors(
+        theme, background_color, contour_color
+    )
+
+    if strips:
+        regions = [(d.x, d.y, d.width, d.height) for d in displays]
+    else:
+        regions = [canvas_size(displays)]
+
+    # Region of each display and its window in that region's (haloed) arrays
+    windows = []
+    for display in displays:
+        index = displays.index(display) if strips else 0
+        x0, y0, _, _ = regions[index]
+        rows = slice(display.y - y0 + halo, display.y - y0 + halo + display.height)
+        cols = slice(display.x - x0 + halo, display.x - x0 + halo + display.width)
+        windows.append((index, (rows, cols)))
+
+    # Terrain of every region, with its halo, on the shared pixel grid
+    terrain = []
+    for x, y, width, height in regions:
+        region_lat, region_lon = region_center(
+            lat, lon, zoom_level, displays, x, y, width, height
+        )
+        view = wallpaper.mercator_view(region_lat, region_lon, zoom_level, dem_transform)
+        dem = wallpaper.reproject_dem(dem_array, view, width + 2 * halo, height + 2 * halo)
+        intensity = wallpaper.compute_hillshade(dem, stretch=False)
+        terrain.append((dem, intensity))
+
+    # Elevation range and hillshade stretch over the displays only, so
+    # canvas and strips agree whatever gaps the layout has
+    dem_min = min(float(terrain[i][0][w].min()) for i, w in windows)
+    dem_max = max(float(terrain[i][0][w].max()) for i, w in windows)
+    imin = min(float(terrain[i][1][w].min()) for i, w in windows)
+    imax = max(float(terrain[i][1][w].max()) for i, w in windows)
+
+    images = []
+    for dem, intensity in terrain:
+        dem_norm, _, _ = wallpaper.normalize_dem(dem, (dem_min, dem_max))
+        layers = {
+            "dem": dem,
+            "hillshade": wallpaper.stretch_intensity(intensity, imin, imax),
+            "dem_norm": dem_norm,
+            "dem_range": np.array([dem_min, dem_max]),
+        }
+        images.append(
+            renderer.composite(
+                layers,
+                contour_interval=contour_interval,
+                background_color=background_color,
+                contour_color=contour_color,
+            )
+        )
+
+    rendered = {}
+    for display, (index, window) in zip(displays, windows):
+        display_lat, display_lon = region_center(
+            lat, lon, zoom_level, displays,
+            display.x, display.y, display.width, display.height,
+        )
+        exif_dict = wallpaper.wallpaper_metadata(
+            display_lat,
+            display_lon,
+            zoom_level,
+            display.width,
+            display.height,
+            contour_interval,
+            background_color,
+            contour_color,
+            dem_source=dem_source,
+            dem_resolution=dem_resolution,
+            theme=theme,
+        )
+        rendered[display.name] = RenderedImage(
+            image=np.ascontiguousarray(images[index][window]), metadata=exif_dict
+        )
+    return rendered
+
+
+def fetch_span_dem(
+    lat: float,
+    lon: float,
+    zoom_level: int,
+    displays: list[Display],
+    resolution: int = 30,
+    tiles_dir: str | None = None,
+) -> tuple[np.ndarray, dict]:
+    """
+    Fetch the one DEM covering the whole layout (see `srtm.get_dem`).
+    """
+    return srtm.get_dem(
+        *layout_bbox(lat, lon, zoom_level, displays), resolution=resolution, tiles_dir=tiles_dir
+    )
+
+
+def save_span(
+    rendered: dict[str, RenderedImage],
+    displays: list[Display],
+    output: str,
+    encoder: str | None = None,
+) -> list[str]:
+    """
+    Write one image per display (see `display_path`), with `encoder` or
+    the one matching the output extension; returns the paths.
+    """
+    encoder = encoders.encoder_for_path(output, encoder)
+    paths = []
+    for display in displays:
+        path = display_path(output, display)
+        rendered[display.name].save(path, encoder)
+        paths.append(path)
+    return paths
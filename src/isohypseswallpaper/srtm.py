@@ -4,19 +4,69 @@
 SRTM utilities.
 
 Download, merge, and clip SRTM DEM tiles for a given bounding box.
+
+Voids (nodata cells) are filled at fetch time, and the elevation
+statistics of the DEM are computed in the same pass and returned as
+``dem_meta["stats"]``. For downloaded DEMs they are also stored in a
+sidecar next to the clipped file, so fetching the same bounding box
+again reuses the file and its statistics.
 """
 
 from __future__ import annotations
 
+import glob
+import json
 import os
 import tempfile
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
+
 import numpy as np
 import rasterio
+from rasterio.enums import Resampling
 from rasterio.merge import merge
 from rasterio.windows import from_bounds
+from scipy import ndimage
 import elevation
 
 
+SRTM_NODATA = -32768
+"""Void value of SRTM tiles, used when the raster declares no nodata."""
+
+PERCENTILES = (1, 5, 50, 95, 99)
+
+HISTOGRAM_BINS = 64
+
+STATS_CHUNK_SIZE = 1 << 16
+"""Cells counted at a time when scanning a DEM, to bound temporaries."""
+
+
+@dataclass(frozen=True)
+class DemStats:
+    """
+    Elevation statistics of a DEM, computed after filling voids.
+
+    ``percentiles`` maps each of `PERCENTILES` (as a string) to its
+    elevation; ``histogram`` counts cells in ``len(histogram)`` equal bins
+    between ``min`` and ``max``. ``voids`` is the number of filled cells.
+    """
+
+    min: float
+    max: float
+    percentiles: dict[str, float]
+    histogram: list[int]
+    voids: int = 0
+
+    @property
+    def range(self) -> tuple[float, float]:
+        """(min, max) elevation."""
+        return self.min, self.max
+
+    def bin_edges(self) -> np.ndarray:
+        """Return the elevations bounding the histogram bins."""
+        return np.linspace(self.min, self.max, len(self.histogram) + 1)
+
+
 def get_dem(
     lat_min: float,
     lat_max: float,
@@ -24,6 +74,9 @@ def get_dem(
     lon_max: float,
     resolution: int = 30,
     cache_dir: str | None = None,
+    tiles_dir: str | None = None,
+    decimation: int = 1,
+    clip_name: str = "dem.tif",
 ) -> tuple[np.ndarray, dict]:
     """
     Fetch SRTM DEM data for the given bounding box.
@@ -36,35 +89,364 @@ def get_dem(
         Target resolution in meters (default 30m).
     cache_dir : str | None
         Optional directory to cache downloaded tiles.
+    tiles_dir : str | None
+        Optional directory of local GeoTIFF DEM tiles (EPSG:4326). When
+        given, the tiles covering the bounding box are merged offline and
+        nothing is downloaded.
+    decimation : int
+        Read the DEM `decimation` times coarser along each axis, averaging
+        blocks of cells, for quick previews. A later full-resolution fetch
+        of the same bounding box reuses the clipped file.
+    clip_name : str
+        Name of the clipped GeoTIFF in `cache_dir`. A call reuses the file
+        when it was clipped to the same bounds; calls running at the same
+        time must use different names.
 
     Returns
     -------
     tuple
-        (DEM array as numpy.ndarray, rasterio metadata dict)
+        (DEM array as numpy.ndarray, rasterio metadata dict). Voids are
+        filled, and ``dem_meta["stats"]`` holds the `DemStats` of the
+        array (of the full-resolution DEM when already known).
     """
+    if tiles_dir is not None:
+        dem_array, dem_meta = merge_local_tiles(
+            tiles_dir, lat_min, lat_max, lon_min, lon_max, decimation=decimation
+        )
+        dem_array, dem_meta["stats"] = prepare_dem(dem_array, dem_meta.get("nodata"))
+        return dem_array, dem_meta
+
     # Determine cache location
     if cache_dir is None:
         cache_dir = os.path.join(tempfile.gettempdir(), "isohypseswallpaper_srtm")
     os.makedirs(cache_dir, exist_ok=True)
 
     # Temporary output file path
-    dem_file = os.path.join(cache_dir, "dem.tif")
+    dem_file = os.path.join(cache_dir, clip_name)
 
-    # Use elevation CLI wrapper to fetch and clip SRTM
-    elevation.clip(bounds=(lon_min, lat_min, lon_max, lat_max),
-                    output=dem_file,
-                    product="SRTM1",
-                    cache_dir=cache_dir)
+    # Use elevation CLI wrapper to fetch and clip SRTM, unless the clipped
+    # file of the previous call already covers the same bounds
+    bounds = (lon_min, lat_min, lon_max, lat_max)
+    sidecar = read_sidecar(dem_file, bounds)
+    stats = sidecar_stats(sidecar)
+    if sidecar is None:
+        elevation.clip(bounds=bounds,
+                        output=dem_file,
+                        product="SRTM1",
+                        cache_dir=cache_dir)
 
     # Open clipped DEM with rasterio
     with rasterio.open(dem_file) as src:
         window = from_bounds(lon_min, lat_min, lon_max, lat_max, src.transform)
-        dem_array = src.read(1, window=window)
+        transform = rasterio.windows.transform(window, src.transform)
+        if decimation > 1:
+            out_shape = (
+                max(1, round(window.height / decimation)),
+                max(1, round(window.width / decimation)),
+            )
+            dem_array = src.read(
+                1, window=window, out_shape=out_shape, resampling=Resampling.average
+            )
+            transform = transform * transform.scale(
+                window.width / out_shape[1], window.height / out_shape[0]
+            )
+        else:
+            dem_array = src.read(1, window=window)
         dem_meta = src.meta.copy()
         dem_meta.update({
             "height": dem_array.shape[0],
             "width": dem_array.shape[1],
-            "transform": rasterio.windows.transform(window, src.transform),
+            "transform": transform,
         })
 
+    dem_array, dem_meta["stats"] = prepare_dem(dem_array, dem_meta.get("nodata"), stats)
+    if stats is None:
+        # Statistics of a decimated read are not those of the file
+        write_stats(dem_file, bounds, dem_meta["stats"] if decimation == 1 else None)
+
+    return dem_array, dem_meta
+
+
+def merge_local_tiles(
+    tiles_dir: str,
+    lat_min: float,
+    lat_max: float,
+    lon_min: float,
+    lon_max: float,
+    decimation: int = 1,
+) -> tuple[np.ndarray, dict]:
+    """
+    Merge the local GeoTIFF tiles in `tiles_dir` that intersect the
+    bounding box, and clip them to it, `decimation` times coarser than
+    the tiles when greater than 1.
+
+    Returns
+    -------
+    tuple
+        (DEM array as numpy.ndarray, rasterio metadata dict)
+    """
+    paths = sorted(glob.glob(os.path.join(tiles_dir, "*.tif")))
+
+    with ExitStack() as stack:
+        sources = []
+        for path in paths:
+            src = stack.enter_context(rasterio.open(path))
+            left, bottom, right, top = src.bounds
+            if left < lon_max and right > lon_min and bottom < lat_max and top > lat_min:
+                sources.append(src)
+
+        if not sources:
+            raise ValueError(
+                f"No DEM tiles in {tiles_dir} cover the bounding box "
+                f"({lat_min}, {lat_max}, {lon_min}, {lon_max})"
+            )
+
+        if decimation > 1:
+            res_x, res_y = sources[0].res
+            mosaic, transform = merge(
+                sources,
+                bounds=(lon_min, lat_min, lon_max, lat_max),
+                res=(res_x * decimation, res_y * decimation),
+                resampling=Resampling.average,
+            )
+        else:
+            mosaic, transform = merge(
+                sources, bounds=(lon_min, lat_min, lon_max, lat_max)
+            )
+        dem_meta = sources[0].meta.copy()
+
+    dem_array = mosaic[0]
+    dem_meta.update({
+        "height": dem_array.shape[0],
+        "width": dem_array.shape[1],
+        "transform": transform,
+    })
     return dem_array, dem_meta
+
+
+def stats_range(dem_meta: dict) -> tuple[float, float] | None:
+    """
+    Return the (min, max) elevation recorded in `dem_meta` by `get_dem`,
+    or None if it holds no statistics.
+    """
+    stats = dem_meta.get("stats")
+    return stats.range if stats is not None else None
+
+
+def prepare_dem(
+    dem_array: np.ndarray, nodata: float | None = None, stats: DemStats | None = None
+) -> tuple[np.ndarray, DemStats]:
+    """
+    Fill the voids of `dem_array` and compute its statistics.
+
+    Voids are cells equal to `nodata` (NaN for float rasters without a
+    nodata value, `SRTM_NODATA` for integer ones). For integer DEMs the
+    voids are counted in the same pass as the statistics. Known `stats`
+    skip the statistics pass, and the void scan when they record no voids.
+
+    Returns
+    -------
+    tuple
+        (filled DEM array, `DemStats`)
+    """
+    if nodata is None:
+        nodata = np.nan if np.issubdtype(dem_array.dtype, np.floating) else SRTM_NODATA
+    if stats is not None and not stats.voids:
+        return dem_array, stats
+
+    counts = elevation_counts(dem_array)
+    if counts is not None:
+        offset = np.iinfo(dem_array.dtype).min
+        index = int(nodata) - offset if float(nodata).is_integer() else -1
+        voids = int(counts[index]) if 0 <= index < len(counts) else 0
+    elif np.isnan(nodata):
+        voids = int(np.count_nonzero(np.isnan(dem_array)))
+    else:
+        voids = int(np.count_nonzero(dem_array == nodata))
+
+    if voids:
+        void = np.isnan(dem_array) if np.isnan(nodata) else dem_array == nodata
+        dem_array = fill_voids(dem_array, void)
+        counts = None
+    if stats is None:
+        stats = dem_stats(dem_array, voids=voids, counts=counts)
+    return dem_array, stats
+
+
+def elevation_counts(dem_array: np.ndarray) -> np.ndarray | None:
+    """
+    Count the cells of every value of an integer DEM of at most 16 bits,
+    indexed from the smallest value of its dtype. Returns None for other
+    dtypes.
+
+    The array is scanned in chunks of `STATS_CHUNK_SIZE` cells, so the
+    count needs no full-size temporary.
+    """
+    if not (np.issubdtype(dem_array.dtype, np.integer) and dem_array.dtype.itemsize <= 2):
+        return None
+    offset = np.iinfo(dem_array.dtype).min
+    counts = np.zeros(2 ** (8 * dem_array.dtype.itemsize), dtype=np.int64)
+    cells = dem_array.reshape(-1)
+    for start in range(0, len(cells), STATS_CHUNK_SIZE):
+        chunk = cells[start : start + STATS_CHUNK_SIZE].astype(np.int32) - offset
+        counts += np.bincount(chunk, minlength=len(counts))
+    return counts
+
+
+def fill_voids(dem_array: np.ndarray, void: np.ndarray) -> np.ndarray:
+    """
+    Fill the cells of `dem_array` flagged in `void` from the surrounding
+    data, with a pull-push pyramid.
+
+    Valid cells are averaged 2x2 into coarser levels until no void is left
+    (pull); each level is then upsampled bilinearly into the voids of the
+    finer one (push). The cost is a few passes over the array whatever the
+    size of the voids, and large voids get smooth surfaces rather than
+    flat patches. Only the bounding box of the voids, grown by its own
+    size, is processed. Integer DEMs keep their dtype.
+    """
+    rows = np.flatnonzero(void.any(axis=1))
+    cols = np.flatnonzero(void.any(axis=0))
+    margin = max(rows[-1] - rows[0], cols[-1] - cols[0]) + 2
+    box = (
+        slice(max(rows[0] - margin, 0), rows[-1] + margin + 1),
+        slice(max(cols[0] - margin, 0), cols[-1] + margin + 1),
+    )
+    filled = dem_array.copy()
+    filled[box] = _pull_push(dem_array[box], void[box])
+    return filled
+
+
+def _pull_push(dem_array: np.ndarray, void: np.ndarray) -> np.ndarray:
+    """Fill the voids of a DEM window with the pull-push pyramid."""
+    values = np.where(void, 0, dem_array).astype(np.float32)
+    weights = (~void).astype(np.float32)
+
+    # Pull: premultiplied 2x2 sums
+    levels = [(values, weights)]
+    while not weights.all() and min(weights.shape) > 1:
+        values, weights = _sum2x2(values), _sum2x2(weights)
+        levels.append((values, weights))
+
+    # Push: coarse estimates fill the empty cells of each finer level
+    values, weights = levels[-1]
+    filled = np.divide(values, weights, out=np.zeros_like(values), where=weights > 0)
+    for values, weights in reversed(levels[:-1]):
+        up = ndimage.zoom(filled, 2, order=1, mode="nearest", grid_mode=True)
+        up = up[: values.shape[0], : values.shape[1]]
+        filled = np.divide(values, weights, out=up, where=weights > 0)
+
+    if np.issubdtype(dem_array.dtype, np.integer):
+        filled = np.rint(filled)
+    return np.where(void, filled, dem_array).astype(dem_array.dtype)
+
+
+def _sum2x2(array: np.ndarray) -> np.ndarray:
+    """Sum 2x2 blocks, padding odd sizes with zeros."""
+    h, w = array.shape
+    padded = np.pad(array, ((0, h % 2), (0, w % 2)))
+    return padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2).sum(axis=(1, 3))
+
+
+def dem_stats(
+    dem_array: np.ndarray,
+    voids: int = 0,
+    bins: int = HISTOGRAM_BINS,
+    counts: np.ndarray | None = None,
+) -> DemStats:
+    """
+    Compute the elevation statistics of `dem_array`.
+
+    For integer DEMs (such as SRTM's int16), the range, percentiles and
+    histogram are all read off the exact per-value `counts` of
+    `elevation_counts`, computed here unless given. Float DEMs use numpy's
+    reductions.
+    """
+    if counts is None:
+        counts = elevation_counts(dem_array)
+
+    if counts is not None:
+        present = np.flatnonzero(counts)
+        elevations = present + np.iinfo(dem_array.dtype).min
+        cumulative = np.cumsum(counts[present])
+        ranks = [q / 100 * (cumulative[-1] - 1) for q in PERCENTILES]
+        percentiles = elevations[np.searchsorted(cumulative, ranks, side="right")]
+        vmin, vmax = elevations[0], elevations[-1]
+        histogram, _ = np.histogram(
+            elevations, bins=bins, range=(vmin, vmax), weights=counts[present]
+        )
+    else:
+        vmin, vmax = np.nanmin(dem_array), np.nanmax(dem_array)
+        percentiles = np.nanpercentile(dem_array, PERCENTILES)
+        histogram, _ = np.histogram(dem_array, bins=bins, range=(vmin, vmax))
+
+    return DemStats(
+        min=float(vmin),
+        max=float(vmax),
+        percentiles={f"{q:g}": float(v) for q, v in zip(PERCENTILES, percentiles)},
+        histogram=[int(c) for c in histogram],
+        voids=voids,
+    )
+
+
+def stats_path(dem_file: str) -> str:
+    """Return the path of the statistics sidecar of `dem_file`."""
+    return f"{dem_file}.stats.json"
+
+
+def write_stats(dem_file: str, bounds: tuple, stats: DemStats | None) -> None:
+    """
+    Store `stats` next to `dem_file`, tagged with the clip bounds and the
+    size and modification time of the file they describe. None records
+    the clip alone, for statistics to be filled in by a later fetch.
+    """
+    try:
+        st = os.stat(dem_file)
+    except FileNotFoundError:
+        return
+    sidecar = {
+        "bounds": list(bounds),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "stats": asdict(stats) if stats is not None else None,
+    }
+    tmp_path = f"{stats_path(dem_file)}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(sidecar, f)
+    os.replace(tmp_path, stats_path(dem_file))
+
+
+def read_sidecar(dem_file: str, bounds: tuple) -> dict | None:
+    """
+    Return the sidecar stored next to `dem_file`, or None if there is none
+    or it does not describe the current file clipped to `bounds`.
+    """
+    try:
+        with open(stats_path(dem_file)) as f:
+            sidecar = json.load(f)
+        st = os.stat(dem_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if (
+        sidecar.get("bounds") != list(bounds)
+        or sidecar.get("size") != st.st_size
+        or sidecar.get("mtime_ns") != st.st_mtime_ns
+    ):
+        return None
+    return sidecar
+
+
+def sidecar_stats(sidecar: dict | None) -> DemStats | None:
+    """Return the `DemStats` held by a sidecar, if any."""
+    try:
+        return DemStats(**sidecar["stats"])
+    except (KeyError, TypeError):
+        return None
+
+
+def read_stats(dem_file: str, bounds: tuple) -> DemStats | None:
+    """
+    Return the statistics stored next to `dem_file`, or None if there are
+    none or they do not describe the current file clipped to `bounds`.
+    """
+    return sidecar_stats(read_sidecar(dem_file, bounds))
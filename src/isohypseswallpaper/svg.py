@@ -0,0 +1,194 @@
+# /src/isohypseswallpaper/svg.py
+
+"""
+Streaming SVG output.
+
+Write wallpapers as SVG: the shaded background is embedded as a
+compressed raster underlay and contour lines are written as vector
+paths, one level at a time, straight to the file. No document tree is
+built in memory, so dense 4K contour sets stay cheap to write.
+
+Polylines are simplified to a pixel tolerance and their coordinates
+quantized to 1 / `COORD_SCALE` pixel, written as relative integer moves
+inside a scaled group.
+"""
+
+from __future__ import annotations
+
+import base64
+import io
+from typing import TextIO
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+from matplotlib.colors import LinearSegmentedColormap, Normalize, to_hex
+from PIL import Image
+
+from . import contours, metadata, profiling
+from .profiling import Profiler
+
+
+DEFAULT_TOLERANCE = 0.5
+"""Douglas-Peucker tolerance of contour simplification, in pixels."""
+
+COORD_SCALE = 10
+"""Coordinates are quantized to 1 / COORD_SCALE pixel."""
+
+UNDERLAY_FORMATS = {"jpeg": "image/jpeg", "png": "image/png"}
+
+POINTS_TO_PX = 100 / 72
+"""Line widths are given in points, as for the 100 dpi raster output."""
+
+
+def write_svg(
+    path: str,
+    background_rgb: np.ndarray,
+    dem: np.ndarray,
+    dem_min: float,
+    dem_max: float,
+    contour_interval: float | None = None,
+    contour_color: str | list[str] = "white",
+    linewidth: float = 0.6,
+    tolerance: float = DEFAULT_TOLERANCE,
+    min_ring_area: float = 0.0,
+    underlay: str | None = "jpeg",
+    quality: int = 85,
+    exif_dict: dict[str, str] | None = None,
+    profiler: Profiler | None = None,
+) -> None:
+    """
+    Write a wallpaper as SVG.
+
+    Parameters
+    ----------
+    path : str
+        Output file path.
+    background_rgb : numpy.ndarray
+        (height, width, 3) shaded background in 0..1, as returned by
+        `wallpaper.colorize`.
+    dem : numpy.ndarray
+        Resampled DEM the contours are traced on.
+    dem_min, dem_max : float
+        Elevation range of the contour levels and color gradient.
+    min_ring_area : float
+        Closed contour rings enclosing less than this area (square pixels)
+        are left out.
+    underlay : str | None
+        Raster format of the embedded background ("jpeg" or "png"), or
+        None for contour lines only.
+    exif_dict : dict | None
+        Metadata written to the ``<metadata>`` element, in the same
+        ``key=value`` form as the PNG UserComment.
+    """
+    height, width = dem.shape
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write(
+            '<svg xmlns="http://www.w3.org/2000/svg" '
+            'xmlns:xlink="http://www.w3.org/1999/xlink" '
+            f'width="{width}" height="{height}" viewBox="0 0 {width} {height}">\n'
+        )
+        if exif_dict:
+            f.write(
+                f"<metadata>{escape(metadata.exif_dict_to_usercomment(exif_dict))}</metadata>\n"
+            )
+
+        if underlay is not None:
+            with profiling.stage(profiler, "underlay"):
+                write_underlay(f, background_rgb, underlay, quality)
+
+        if contour_interval is not None:
+            with profiling.stage(profiler, "contour"):
+                write_contours(
+                    f, dem, dem_min, dem_max, contour_interval, contour_color,
+                    linewidth=linewidth, tolerance=tolerance,
+                    min_ring_area=min_ring_area,
+                )
+
+        f.write("</svg>\n")
+
+
+def write_underlay(f: TextIO, background_rgb: np.ndarray, fmt: str, quality: int) -> None:
+    """
+    Write the background as an embedded, base64-encoded raster image.
+    """
+    height, width = background_rgb.shape[:2]
+    image = Image.fromarray(np.rint(background_rgb * 255).astype(np.uint8))
+    buffer = io.BytesIO()
+    if fmt == "jpeg":
+        image.save(buffer, format="JPEG", quality=quality)
+    else:
+        image.save(buffer, format="PNG", optimize=True)
+
+    f.write(
+        f'<image width="{width}" height="{height}" preserveAspectRatio="none" '
+        f'xlink:href="data:{UNDERLAY_FORMATS[fmt]};base64,'
+    )
+    f.write(base64.b64encode(buffer.getvalue()).decode("ascii"))
+    f.write('"/>\n')
+
+
+def write_contours(
+    f: TextIO,
+    dem: np.ndarray,
+    dem_min: float,
+    dem_max: float,
+    contour_interval: float,
+    contour_color: str | list[str] = "white",
+    linewidth: float = 0.6,
+    tolerance: float = DEFAULT_TOLERANCE,
+    min_ring_area: float = 0.0,
+) -> None:
+    """
+    Trace, simplify and write contour lines, one ``<path>`` per level.
+    """
+    if isinstance(contour_color, list):
+        cmap = LinearSegmentedColormap.from_list("contour_gradient", contour_color)
+        norm = Normalize(vmin=dem_min, vmax=dem_max)
+
+        def level_color(level: float) -> str:
+            return to_hex(cmap(norm(level)))
+    else:
+        color = to_hex(contour_color)
+
+        def level_color(level: float) -> str:
+            return color
+
+    stroke_width = linewidth * POINTS_TO_PX * COORD_SCALE
+    f.write(
+        f'<g fill="none" stroke-width="{stroke_width:.3g}" stroke-linejoin="round" '
+        f'stroke-linecap="round" transform="scale({1 / COORD_SCALE:g})">\n'
+    )
+
+    levels = contours.contour_levels(dem_min, dem_max, contour_interval)
+    for level, lines in contours.contour_lines(dem, levels):
+        lines = contours.drop_small_rings(lines, min_ring_area)
+        lines = contours.simplify_lines(lines, tolerance)
+        data = [d for d in map(path_data, lines) if d]
+        if data:
+            f.write(
+                f'<path data-elevation="{level:g}" stroke={quoteattr(level_color(level))} '
+                f'd="{"".join(data)}"/>\n'
+            )
+
+    f.write("</g>\n")
+
+
+def path_data(line: np.ndarray) -> str:
+    """
+    Return the SVG path data of one (simplified) polyline, quantized, as
+    an absolute move followed by relative moves (closed rings end with
+    ``z``). Returns an empty string for degenerate lines.
+    """
+    closed = len(line) > 2 and np.array_equal(line[0], line[-1])
+    q = contours.quantize(line, COORD_SCALE)
+    if closed:
+        q = q[:-1] if len(q) > 1 and np.array_equal(q[0], q[-1]) else q
+        if len(q) < 3:
+            return ""
+    elif len(q) < 2:
+        return ""
+
+    moves = " ".join(map(str, np.diff(q, axis=0).ravel().tolist()))
+    return f"M{q[0, 0]} {q[0, 1]}l{moves}{'z' if closed else ''}"
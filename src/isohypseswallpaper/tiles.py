@@ -0,0 +1,282 @@
+# /src/isohypseswallpaper/tiles.py
+
+"""
+XYZ map tiles.
+
+Render standard Web Mercator ("slippy map") tiles of the styled relief,
+for interactive previews in any XYZ client. Each tile is computed with a
+halo of extra pixels so hillshade gradients and contour lines continue
+across tile edges, and with a fixed elevation range and unscaled shading
+so colors match between neighbours. Rendered tiles are kept in an
+on-disk cache laid out as ``{theme}/{contour}/{size}/{z}/{x}/{y}.png``.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import tempfile
+import threading
+from collections.abc import Callable
+
+import numpy as np
+
+from . import scale, srtm, themes, wallpaper
+from .renderer import RenderedImage, Renderer
+
+
+DEFAULT_TILE_SIZE = 256
+DEFAULT_HALO = 16
+
+DEFAULT_ELEVATION_RANGE = (-500.0, 9000.0)
+"""
+Elevation range (meters) mapped onto theme gradients and contour levels,
+shared by all tiles. It covers the whole span of SRTM, from the Dead Sea
+shore to Everest, so no terrain is clipped.
+"""
+
+MIN_ZOOM = 8
+"""
+Lowest zoom level served: lower zooms would read very large SRTM windows.
+"""
+
+MAX_ZOOM = 18
+
+WINDOW_LEVELS = 2
+"""
+Tiles are sampled from the DEM window of their ancestor this many zoom
+levels up (but not below `MIN_ZOOM`), so neighbouring tiles share one
+fetch instead of clipping a window each.
+"""
+
+
+def tile_bounds(
+    z: int, x: int, y: int, halo_fraction: float = 0.0
+) -> tuple[float, float, float, float]:
+    """
+    Return the (lat_min, lat_max, lon_min, lon_max) bounds of tile
+    `z`/`x`/`y`, grown by `halo_fraction` of a tile on every side.
+    """
+    n = 2**z
+    lon_min, lat_max = scale.world_to_lonlat((x - halo_fraction) / n, (y - halo_fraction) / n)
+    lon_max, lat_min = scale.world_to_lonlat(
+        (x + 1 + halo_fraction) / n, (y + 1 + halo_fraction) / n
+    )
+    return float(lat_min), float(lat_max), float(lon_min), float(lon_max)
+
+
+def sample_tile(
+    dem_array: np.ndarray,
+    transform,
+    z: int,
+    x: int,
+    y: int,
+    size: int,
+    halo: int = 0,
+) -> np.ndarray:
+    """
+    Resample an EPSG:4326 DEM onto the Web Mercator pixel grid of a tile.
+
+    Returns a (size + 2 * halo) square array. Every pixel centre is taken
+    from the global pixel grid of zoom `z`, so overlapping halos of
+    adjacent tiles hold identical values.
+    """
+    world = size * 2**z
+    pixels = np.arange(-halo, size + halo) + 0.5
+    lon, _ = scale.world_to_lonlat((x * size + pixels) / world, 0.5)
+    _, lat = scale.world_to_lonlat(0.5, (y * size + pixels) / world)
+
+    cols = (lon - transform.c) / transform.a - 0.5
+    rows = (lat - transform.f) / transform.e - 0.5
+    return wallpaper.apply_plan(
+        dem_array,
+        wallpaper.linear_plan(rows, dem_array.shape[0]),
+        wallpaper.linear_plan(cols, dem_array.shape[1]),
+    )
+
+
+def fetch_srtm(bbox: tuple[float, float, float, float]) -> tuple[np.ndarray, dict]:
+    """
+    Default DEM fetcher of `TileRenderer`: SRTM1 through `srtm.get_dem`.
+    """
+    return srtm.get_dem(*bbox, resolution=30)
+
+
+class TileRenderer:
+    """
+    Render and cache XYZ tiles of the styled relief.
+
+    Thread-safe: each thread renders with its own `Renderer`.
+
+    Parameters
+    ----------
+    cache_dir : str | None
+        Directory of the tile cache. Defaults to a folder in the system
+        temporary directory.
+    fetch_dem : callable | None
+        ``fetch_dem((lat_min, lat_max, lon_min, lon_max))`` returning a
+        (DEM array, rasterio metadata) pair covering the bounding box.
+        Neighbouring tiles ask for the same window (see `window_bounds`),
+        so a fetcher caching by bounding box reads it once. Defaults to
+        SRTM1 through `srtm.get_dem`, uncached.
+    tile_size : int
+        Tile size in pixels (256, or 512 for high-DPI clients).
+    halo : int
+        Extra pixels rendered around each tile, then cropped.
+    elevation_range : tuple[float, float]
+        Elevations mapped onto theme gradients, identical for every tile.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | None = None,
+        fetch_dem: Callable[[tuple], tuple[np.ndarray, dict]] | None = None,
+        tile_size: int = DEFAULT_TILE_SIZE,
+        halo: int = DEFAULT_HALO,
+        elevation_range: tuple[float, float] = DEFAULT_ELEVATION_RANGE,
+    ) -> None:
+        if cache_dir is None:
+            cache_dir = os.path.join(tempfile.gettempdir(), "isohypseswallpaper_tiles")
+        self.cache_dir = cache_dir
+        self.fetch_dem = fetch_dem if fetch_dem is not None else fetch_srtm
+        self.tile_size = tile_size
+        self.halo = halo
+        self.elevation_range = elevation_range
+        self.rendered = 0
+        self.cached = 0
+        # Tiles are served from concurrent handler threads
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+
+    def tile_path(
+        self, theme: str, z: int, x: int, y: int, contour_interval: float | None = None
+    ) -> str:
+        """
+        Return the cache path of a tile.
+        """
+        contour = f"c{contour_interval:g}" if contour_interval else "nocontour"
+        return os.path.join(
+            self.cache_dir, theme, contour, str(self.tile_size), str(z), str(x), f"{y}.png"
+        )
+
+    def get_tile(
+        self, theme: str, z: int, x: int, y: int, contour_interval: float | None = None
+    ) -> bytes:
+        """
+        Return the PNG bytes of a tile, from the cache when possible.
+
+        Raises
+        ------
+        ValueError
+            If the theme is unknown, the tile is out of range or the
+            contour interval is not positive.
+        """
+        self.validate(theme, z, x, y, contour_interval)
+        path = self.tile_path(theme, z, x, y, contour_interval)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            with self._stats_lock:
+                self.cached += 1
+            return data
+        except FileNotFoundError:
+            pass
+
+        data = self.render_tile(theme, z, x, y, contour_interval).to_bytes()
+
+        # Write atomically: concurrent readers never see partial tiles
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tile-", dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return data
+
+    def render_tile(
+        self, theme: str, z: int, x: int, y: int, contour_interval: float | None = None
+    ) -> RenderedImage:
+        """
+        Render one tile, bypassing the cache.
+        """
+        self.validate(theme, z, x, y, contour_interval)
+        size, halo = self.tile_size, self.halo
+
+        dem_array, dem_meta = self.fetch_dem(self.window_bounds(z, x, y))
+        dem = sample_tile(dem_array, dem_meta["transform"], z, x, y, size, halo)
+
+        dem_norm, dem_min, dem_max = wallpaper.normalize_dem(dem, self.elevation_range)
+        layers = {
+            "dem": dem,
+            "hillshade": wallpaper.shade_normals(
+                wallpaper.surface_normals(dem), rescale=False
+            ),
+            "dem_norm": dem_norm,
+            "dem_range": np.array([dem_min, dem_max]),
+        }
+        background_color, contour_color = wallpaper.theme_colors(theme, None, None)
+        image = self._renderer().composite(
+            layers,
+            contour_interval=contour_interval,
+            background_color=background_color,
+            contour_color=contour_color,
+        )
+        image = np.ascontiguousarray(image[halo : halo + size, halo : halo + size])
+
+        lat_min, lat_max, lon_min, lon_max = tile_bounds(z, x, y)
+        exif_dict = wallpaper.wallpaper_metadata(
+            (lat_min + lat_max) / 2,
+            (lon_min + lon_max) / 2,
+            z,
+            size,
+            size,
+            contour_interval,
+            background_color,
+            contour_color,
+            theme=theme,
+        )
+        with self._stats_lock:
+            self.rendered += 1
+        return RenderedImage(image=image, metadata=exif_dict)
+
+    def stats(self) -> dict:
+        """
+        Return the numbers of rendered tiles and of tiles served from the
+        cache.
+        """
+        with self._stats_lock:
+            return {"rendered": self.rendered, "cached": self.cached}
+
+    def window_bounds(self, z: int, x: int, y: int) -> tuple[float, float, float, float]:
+        """
+        Return the bounds of the DEM window tile `z`/`x`/`y` is sampled
+        from: its ancestor `WINDOW_LEVELS` zoom levels up, grown by the
+        halo of its tiles. Every descendant at zoom `z` gets the same
+        bounds, so a caching `fetch_dem` fetches the window once.
+        """
+        window_z = max(MIN_ZOOM, z - WINDOW_LEVELS)
+        shift = z - window_z
+        return tile_bounds(window_z, x >> shift, y >> shift, self.halo / self.tile_size / 2**shift)
+
+    def validate(
+        self, theme: str, z: int, x: int, y: int, contour_interval: float | None = None
+    ) -> None:
+        """
+        Raise ValueError for unknown themes, out-of-range tiles and
+        non-positive contour intervals.
+        """
+        if theme not in themes.THEMES:
+            raise ValueError(f"Unknown theme '{theme}'")
+        if not MIN_ZOOM <= z <= MAX_ZOOM:
+            raise ValueError(f"Zoom level must be between {MIN_ZOOM} and {MAX_ZOOM}")
+        if not (0 <= x < 2**z and 0 <= y < 2**z):
+            raise ValueError(f"Tile {z}/{x}/{y} does not exist")
+        if contour_interval is not None and not (
+            math.isfinite(contour_interval) and contour_interval > 0
+        ):
+            raise ValueError("Contour interval must be a positive number")
+
+    def _renderer(self) -> Renderer:
+        renderer = getattr(self._local, "renderer", None)
+        if renderer is None:
+            renderer = self._local.renderer = Renderer()
+        return renderer
@@ -1,5 +1,8 @@
 # src/isohypseswallpaper/wallpaper.py
 
+import functools
+from dataclasses import dataclass
+
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.colors import (
@@ -8,8 +11,29 @@ from matplotlib.colors import (
     LinearSegmentedColormap,
     Normalize,
 )
+from matplotlib.axes import Axes
+from matplotlib.path import Path
 from scipy.ndimage import zoom
-from . import metadata, scale, themes
+from . import __version__, contours, encoders, metadata, profiling, scale, svg, themes
+from .cache import MemoryCache, StageCache, array_digest, stage_key
+from .profiling import Profiler
+
+
+RESAMPLE_ORDER = 1
+"""Spline order used to resample the DEM to the output size."""
+
+LIGHT_AZDEG = 315
+LIGHT_ALTDEG = 45
+VERT_EXAG = 1
+"""Light source parameters used for the hillshade."""
+
+LAYER_NAMES = ["dem", "hillshade", "dem_norm", "dem_range"]
+
+LUT_SIZE = 4096
+"""Number of entries of the color lookup tables used for gradients."""
+
+FLAT_BLOCK = 128
+"""Side in pixels of the blocks checked for relief before shading."""
 
 
 def interpolate_colors(colors: list[str], values: np.ndarray) -> np.ndarray:
@@ -31,76 +55,471 @@ def interpolate_colors(colors: list[str], values: np.ndarray) -> np.ndarray:
     return (1 - t[..., None]) * colors_rgb[idx_floor] + t[..., None] * colors_rgb[idx_ceil]
 
 
+@functools.lru_cache(maxsize=64)
+def gradient_lut(colors: tuple[str, ...], size: int = LUT_SIZE) -> np.ndarray:
+    """
+    Return a read-only (size, 3) lookup table of RGB colors interpolated
+    linearly between `colors`. Tables are memoized per color tuple.
+    """
+    lut = interpolate_colors(list(colors), np.linspace(0, 1, size))
+    lut.flags.writeable = False
+    return lut
+
+
 def make_colormap(colors: list[str], name: str = "custom"):
     """Create a matplotlib colormap from a list of colors."""
     return LinearSegmentedColormap.from_list(name, colors)
 
 
-def generate_wallpaper(
+@functools.lru_cache(maxsize=32)
+def resample_plan(n_in: int, n_out: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return the linear resampling plan of one axis from `n_in` to `n_out`
+    samples: lower and upper source indices and the upper weight.
+
+    Matches the sample positions of `scipy.ndimage.zoom` (corners aligned).
+    Plans are memoized per size pair.
+    """
+    if n_in == 1 or n_out == 1:
+        coords = np.zeros(n_out)
+    else:
+        coords = np.arange(n_out) * ((n_in - 1) / (n_out - 1))
+    i0, i1, weight = linear_plan(coords, n_in)
+    for a in (i0, i1, weight):
+        a.flags.writeable = False
+    return i0, i1, weight
+
+
+def linear_plan(
+    coords: np.ndarray, n_in: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return the linear resampling plan sampling an axis of `n_in` samples
+    at fractional source positions `coords` (clamped to the axis).
+    """
+    coords = np.clip(coords, 0, n_in - 1)
+    i0 = np.minimum(np.floor(coords).astype(np.intp), n_in - 1)
+    i1 = np.minimum(i0 + 1, n_in - 1)
+    weight = coords - i0
+    return i0, i1, weight
+
+
+def apply_plan(
+    dem_array: np.ndarray,
+    row_plan: tuple[np.ndarray, np.ndarray, np.ndarray],
+    col_plan: tuple[np.ndarray, np.ndarray, np.ndarray],
+) -> np.ndarray:
+    """
+    Resample `dem_array` with separable row and column plans. Integer
+    DEMs keep their dtype.
+    """
+    r0, r1, rw = row_plan
+    c0, c1, cw = col_plan
+
+    rows = dem_array[r0].astype(np.float64)
+    rows *= (1 - rw)[:, None]
+    rows += dem_array[r1] * rw[:, None]
+
+    dem_resampled = rows[:, c0]
+    dem_resampled *= 1 - cw
+    dem_resampled += rows[:, c1] * cw
+
+    if np.issubdtype(dem_array.dtype, np.integer):
+        return np.rint(dem_resampled).astype(dem_array.dtype)
+    return dem_resampled
+
+
+def resample_dem(
+    dem_array: np.ndarray, width: int, height: int, order: int = RESAMPLE_ORDER
+) -> np.ndarray:
+    """
+    Resample the DEM to the output size (height, width).
+
+    Linear resampling (order 1) is separable and runs through cached
+    per-axis plans; other orders use `scipy.ndimage.zoom`. Integer DEMs
+    keep their dtype, as with `zoom`.
+    """
+    if order != 1:
+        zoom_y = height / dem_array.shape[0]
+        zoom_x = width / dem_array.shape[1]
+        return zoom(dem_array, (zoom_y, zoom_x), order=order)
+
+    return apply_plan(
+        dem_array,
+        resample_plan(dem_array.shape[0], height),
+        resample_plan(dem_array.shape[1], width),
+    )
+
+
+@dataclass(frozen=True)
+class MercatorView:
+    """
+    Centre and zoom level of a Web Mercator render, with the geotransform
+    (``dem_meta["transform"]``) of its EPSG:4326 DEM.
+    """
+
+    lat: float
+    lon: float
+    zoom_level: float
+    dem_transform: tuple
+
+
+@functools.lru_cache(maxsize=64)
+def mercator_plan(
+    view: MercatorView, width: int, height: int, dem_shape: tuple[int, int]
+) -> tuple[tuple[np.ndarray, ...], tuple[np.ndarray, ...]]:
+    """
+    Return the (row, column) resampling plans mapping the Web Mercator
+    pixel grid of `view` onto the DEM.
+
+    Plans are memoized per view, output size and DEM shape, so renders
+    that only change colors or contours reuse them.
+    """
+    lon, lat = scale.pixel_grid(view.lat, view.lon, view.zoom_level, width, height)
+    a, _, c, _, e, f = tuple(view.dem_transform)[:6]
+    row_plan = linear_plan((lat - f) / e - 0.5, dem_shape[0])
+    col_plan = linear_plan((lon - c) / a - 0.5, dem_shape[1])
+    for plan in (*row_plan, *col_plan):
+        plan.flags.writeable = False
+    return row_plan, col_plan
+
+
+def reproject_dem(
+    dem_array: np.ndarray, view: MercatorView, width: int, height: int
+) -> np.ndarray:
+    """
+    Resample an EPSG:4326 DEM onto the Web Mercator pixel grid of `view`,
+    so the output has the scale of `scale.meters_per_pixel` along both
+    axes. Integer DEMs keep their dtype.
+    """
+    return apply_plan(dem_array, *mercator_plan(view, width, height, dem_array.shape))
+
+
+def compute_hillshade(
+    dem: np.ndarray,
+    azdeg: float = LIGHT_AZDEG,
+    altdeg: float = LIGHT_ALTDEG,
+    vert_exag: float = VERT_EXAG,
+    block: int = FLAT_BLOCK,
+    stretch: bool = True,
+) -> np.ndarray:
+    """
+    Compute a 0-1 hillshade of the DEM; equal to `LightSource.hillshade`.
+
+    Flat blocks (see `relief_blocks`), such as sea and lakes, face
+    straight up and get the flat intensity directly; surface normals are
+    only computed for the runs of blocks with relief.
+
+    With `stretch=False`, the raw intensities (-1..1) are returned, to be
+    stretched with `stretch_intensity` over a range shared by several
+    parts of one image.
+    """
+    ls = LightSource(azdeg=azdeg, altdeg=altdeg)
+    relief = relief_blocks(dem, block)
+    if relief.all() and stretch:
+        return ls.hillshade(dem, vert_exag=vert_exag)
+
+    height, width = dem.shape
+    intensity = np.full(dem.shape, ls.direction[2])
+    for by, bx0, bx1 in block_runs(relief):
+        r0, r1 = by * block, min((by + 1) * block, height)
+        c0, c1 = bx0 * block, min(bx1 * block, width)
+        # One pixel of halo keeps the central differences of the full DEM
+        h0, h1 = max(r0 - 1, 0), min(r1 + 1, height)
+        w0, w1 = max(c0 - 1, 0), min(c1 + 1, width)
+        normals = surface_normals(dem[h0:h1, w0:w1], vert_exag)
+        shaded = normals[r0 - h0 : r1 - h0, c0 - w0 : c1 - w0] @ ls.direction
+        intensity[r0:r1, c0:c1] = shaded
+
+    if not stretch:
+        return intensity
+    return stretch_intensity(intensity, intensity.min(), intensity.max())
+
+
+def stretch_intensity(intensity: np.ndarray, imin: float, imax: float) -> np.ndarray:
+    """
+    Stretch raw hillshade intensities from (`imin`, `imax`) to 0..1 in
+    place, as `LightSource.shade_normals` does over a whole image.
+    """
+    if imax - imin > 1e-6:
+        intensity -= imin
+        intensity /= imax - imin
+    return np.clip(intensity, 0, 1, out=intensity)
+
+
+def relief_blocks(dem: np.ndarray, block: int = FLAT_BLOCK) -> np.ndarray:
+    """
+    Flag the `block` x `block` tiles of the DEM that have relief.
+
+    A tile is flat when it and the pixels bordering it (which enter its
+    gradients) all hold the same elevation. Block-wise minima and maxima
+    are computed once, then widened by the edge rows and columns of the
+    neighbouring blocks. Tiles with NaN count as relief.
+
+    Returns
+    -------
+    numpy.ndarray
+        (ceil(height / block), ceil(width / block)) boolean array.
+    """
+    height, width = dem.shape
+    padded = np.pad(dem, ((0, -height % block), (0, -width % block)), mode="edge")
+    nby, nbx = padded.shape[0] // block, padded.shape[1] // block
+    blocks = padded.reshape(nby, block, nbx, block)
+    lo, hi = blocks.min(axis=(1, 3)), blocks.max(axis=(1, 3))
+
+    # Rows just above and below each block, columns just left and right
+    above = padded[block - 1 : -1 : block].reshape(nby - 1, nbx, block)
+    below = padded[block::block].reshape(nby - 1, nbx, block)
+    left = padded[:, block - 1 : -1 : block].reshape(nby, block, nbx - 1)
+    right = padded[:, block::block].reshape(nby, block, nbx - 1)
+    for edge, rows, cols, axis in (
+        (above, slice(1, None), slice(None), 2),
+        (below, slice(None, -1), slice(None), 2),
+        (left, slice(None), slice(1, None), 1),
+        (right, slice(None), slice(None, -1), 1),
+    ):
+        if edge.size:
+            lo[rows, cols] = np.minimum(lo[rows, cols], edge.min(axis=axis))
+            hi[rows, cols] = np.maximum(hi[rows, cols], edge.max(axis=axis))
+
+    return ~(hi == lo)
+
+
+def block_runs(relief: np.ndarray) -> list[tuple[int, int, int]]:
+    """
+    Return the (block row, first column, end column) of every horizontal
+    run of consecutive flagged blocks.
+    """
+    padded = np.zeros((relief.shape[0], relief.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = relief
+    rows, starts = np.nonzero(np.diff(padded, axis=1) == 1)
+    _, ends = np.nonzero(np.diff(padded, axis=1) == -1)
+    return list(zip(rows.tolist(), starts.tolist(), ends.tolist()))
+
+
+def surface_normals(dem: np.ndarray, vert_exag: float = VERT_EXAG) -> np.ndarray:
+    """
+    Return the (height, width, 3) unit surface normals of the DEM, as
+    computed by `LightSource.hillshade`.
+
+    Normals do not depend on the light, so they can be shaded under any
+    number of light positions with `shade_normals`.
+    """
+    # Rows run top to bottom, so the y spacing is negative
+    e_dy, e_dx = np.gradient(vert_exag * np.asarray(dem, dtype=np.float64), -1, 1)
+    normals = np.empty(dem.shape + (3,))
+    normals[..., 0] = -e_dx
+    normals[..., 1] = -e_dy
+    normals[..., 2] = 1
+    normals /= np.sqrt(np.einsum("...i,...i", normals, normals))[..., None]
+    return normals
+
+
+def shade_normals(
+    normals: np.ndarray,
+    azdeg: float = LIGHT_AZDEG,
+    altdeg: float = LIGHT_ALTDEG,
+    rescale: bool = True,
+) -> np.ndarray:
+    """
+    Compute a 0-1 hillshade from precomputed `surface_normals`; equal to
+    `compute_hillshade` of the same DEM and light.
+
+    With `rescale=False`, intensities are not stretched to the range of
+    the image, so adjacent tiles shade identically along shared edges.
+    """
+    ls = LightSource(azdeg=azdeg, altdeg=altdeg)
+    if rescale:
+        return ls.shade_normals(normals)
+    return np.clip(normals @ ls.direction, 0, 1)
+
+
+def normalize_dem(
+    dem: np.ndarray, dem_range: tuple[float, float] | None = None
+) -> tuple[np.ndarray, float, float]:
+    """
+    Normalize the DEM to 0..1. Returns (dem_norm, dem_min, dem_max).
+
+    A fixed `dem_range` (min, max) keeps colors consistent across renders
+    of overlapping areas; by default the DEM's own range is used.
+    """
+    if dem_range is not None:
+        dem_min, dem_max = dem_range
+        dem_norm = np.clip((dem - dem_min) / (dem_max - dem_min + 1e-9), 0, 1)
+        return dem_norm, dem_min, dem_max
+    dem_min = dem.min()
+    dem_max = dem.max()
+    dem_norm = (dem - dem_min) / (dem_max - dem_min + 1e-9)
+    return dem_norm, dem_min, dem_max
+
+
+def terrain_layers(
     dem_array: np.ndarray,
-    lat: float,
-    lon: float,
-    zoom_level: int,
     width: int,
     height: int,
-    contour_interval: float | None = None,
-    background_color: str | list[str] = "#2a2a2a",
-    contour_color: str | list[str] = "white",
-    theme: str | None = None,
-    dem_source: str = "SRTM1",
-    dem_resolution: int = 30,
-    output_path: str = "wallpaper.png",
-) -> None:
+    cache: StageCache | MemoryCache | None = None,
+    profiler: Profiler | None = None,
+    azdeg: float = LIGHT_AZDEG,
+    altdeg: float = LIGHT_ALTDEG,
+    view: MercatorView | None = None,
+    dem_range: tuple[float, float] | None = None,
+) -> dict[str, np.ndarray]:
     """
-    Generate a desktop wallpaper with hillshades, optional contour lines,
-    and dynamic/static color themes.
+    Compute the terrain layers that do not depend on colors or contours:
+    the resampled DEM, its hillshade under the light at (`azdeg`,
+    `altdeg`), the normalized DEM and its (min, max) range.
+
+    With a `view`, the DEM is reprojected onto its Web Mercator pixel
+    grid; otherwise it is stretched to the output size. A known
+    `dem_range` (such as ``srtm.stats_range(dem_meta)``) is used for the
+    normalization instead of reducing the resampled DEM.
+
+    When a `cache` is given, the layers are looked up by a hash of the
+    DEM and of the resampling and light parameters, and stored on a miss.
     """
+    key = None
+    if cache is not None:
+        with profiling.stage(profiler, "cache_lookup"):
+            key = stage_key(
+                dem=array_digest(dem_array),
+                width=width,
+                height=height,
+                order=RESAMPLE_ORDER,
+                azdeg=azdeg,
+                altdeg=altdeg,
+                vert_exag=VERT_EXAG,
+                view=view,
+                dem_range=dem_range,
+            )
+            layers = cache.load(key, LAYER_NAMES)
+        if layers is not None:
+            return layers
 
-    # --- Apply theme ---
+    with profiling.stage(profiler, "resample"):
+        if view is None:
+            dem_resampled = resample_dem(dem_array, width, height)
+        else:
+            dem_resampled = reproject_dem(dem_array, view, width, height)
+    with profiling.stage(profiler, "hillshade"):
+        hillshade = compute_hillshade(dem_resampled, azdeg=azdeg, altdeg=altdeg)
+    with profiling.stage(profiler, "normalize"):
+        dem_norm, dem_min, dem_max = normalize_dem(dem_resampled, dem_range)
+
+    layers = {
+        "dem": dem_resampled,
+        "hillshade": hillshade,
+        "dem_norm": dem_norm,
+        "dem_range": np.array([dem_min, dem_max]),
+    }
+    if cache is not None:
+        with profiling.stage(profiler, "cache_store"):
+            cache.store(key, layers)
+    return layers
+
+
+def mercator_view(
+    lat: float, lon: float, zoom_level: float, dem_transform: tuple | None
+) -> MercatorView | None:
+    """Return the `MercatorView` of a render, or None without a geotransform."""
+    if dem_transform is None:
+        return None
+    return MercatorView(lat, lon, zoom_level, tuple(dem_transform)[:6])
+
+
+def theme_colors(
+    theme: str | None,
+    background_color: str | list[str],
+    contour_color: str | list[str],
+) -> tuple[str | list[str], str | list[str]]:
+    """Return (background, contour) colors, taken from `theme` if given."""
     if theme:
         theme_def = themes.get_theme(theme)
-        background_color = theme_def["background"]
-        contour_color = theme_def["contour"]
+        return theme_def["background"], theme_def["contour"]
+    return background_color, contour_color
 
-    # --- Resample DEM ---
-    zoom_y = height / dem_array.shape[0]
-    zoom_x = width / dem_array.shape[1]
-    dem_resampled = zoom(dem_array, (zoom_y, zoom_x), order=1)
 
-    # --- Hillshade ---
-    ls = LightSource(azdeg=315, altdeg=45)
-    hillshade = ls.hillshade(dem_resampled, vert_exag=1)
+def colorize(
+    hillshade: np.ndarray,
+    dem_norm: np.ndarray,
+    background_color: str | list[str],
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Shade the background with the hillshade.
 
-    # --- Normalize DEM ---
-    dem_min = dem_resampled.min()
-    dem_max = dem_resampled.max()
-    dem_norm = (dem_resampled - dem_min) / (dem_max - dem_min + 1e-9)
+    A list of colors is mapped over the normalized DEM through a cached
+    lookup table; a single color is uniform. Returns a (height, width, 3)
+    float RGB array, written into `out` when given.
+    """
+    if out is None:
+        out = np.empty(hillshade.shape + (3,))
 
-    # --- Background ---
     if isinstance(background_color, list):
-        bg_rgb = interpolate_colors(background_color, dem_norm)
+        lut = gradient_lut(tuple(background_color))
+        idx = np.multiply(dem_norm, len(lut) - 1)
+        idx += 0.5
+        np.take(lut, idx.astype(np.intp), axis=0, out=out)
     else:
-        bg_rgb = np.ones((height, width, 3)) * np.array(to_rgb(background_color))
+        out[...] = to_rgb(background_color)
 
-    hillshade_rgb = bg_rgb * hillshade[:, :, None]
+    out *= hillshade[:, :, None]
+    return out
 
-    # --- Figure ---
-    fig, ax = plt.subplots(figsize=(width / 100, height / 100), dpi=100)
-    ax.axis("off")
+
+def draw_wallpaper(
+    ax: Axes,
+    hillshade_rgb: np.ndarray,
+    dem: np.ndarray,
+    dem_min: float,
+    dem_max: float,
+    contour_interval: float | None = None,
+    contour_color: str | list[str] = "white",
+    profiler: Profiler | None = None,
+    min_ring_area: float = 0.0,
+) -> None:
+    """
+    Draw the shaded background and optional contour lines on `ax`.
+    """
+    height, width = dem.shape
     extent = (0, width, 0, height)
 
     ax.imshow(hillshade_rgb, origin="upper", extent=extent)
 
-    # --- Contours ---
-    if contour_interval is not None:
-        levels = np.arange(dem_min, dem_max, contour_interval)
+    if contour_interval is None:
+        return
+
+    draw_contours(
+        ax, dem, dem_min, dem_max, contour_interval, contour_color,
+        profiler=profiler, min_ring_area=min_ring_area,
+    )
+
+
+def draw_contours(
+    ax: Axes,
+    dem: np.ndarray,
+    dem_min: float,
+    dem_max: float,
+    contour_interval: float,
+    contour_color: str | list[str] = "white",
+    profiler: Profiler | None = None,
+    min_ring_area: float = 0.0,
+) -> None:
+    """
+    Draw contour lines of `dem` every `contour_interval` meters on `ax`,
+    leaving out closed rings smaller than `min_ring_area` square pixels.
+    """
+    height, width = dem.shape
+    extent = (0, width, 0, height)
+
+    with profiling.stage(profiler, "contour"):
+        levels = contours.contour_levels(dem_min, dem_max, contour_interval)
 
         if isinstance(contour_color, list):
             cmap = make_colormap(contour_color, name="contour_gradient")
             norm = Normalize(vmin=dem_min, vmax=dem_max)
 
-            ax.contour(
-                dem_resampled,
+            contour_set = ax.contour(
+                dem,
                 levels=levels,
                 cmap=cmap,
                 norm=norm,
@@ -109,8 +528,8 @@ def generate_wallpaper(
                 extent=extent,
             )
         else:
-            ax.contour(
-                dem_resampled,
+            contour_set = ax.contour(
+                dem,
                 levels=levels,
                 colors=contour_color,
                 linewidths=0.6,
@@ -118,12 +537,78 @@ def generate_wallpaper(
                 extent=extent,
             )
 
-    # --- Save ---
-    plt.tight_layout(pad=0)
-    plt.savefig(output_path, bbox_inches="tight", pad_inches=0)
-    plt.close()
+        if min_ring_area > 0:
+            contour_set.set_paths(
+                [drop_small_rings(path, min_ring_area) for path in contour_set.get_paths()]
+            )
 
-    # --- Metadata ---
+
+def drop_small_rings(path: Path, min_area: float) -> Path:
+    """
+    Remove closed rings enclosing less than `min_area` from the path of
+    one contour level, which holds one sub-path per polyline.
+    """
+    if not len(path.vertices):
+        return path
+
+    bounds = np.append(np.flatnonzero(path.codes == Path.MOVETO), len(path.codes))
+    pieces = list(zip(bounds[:-1], bounds[1:]))
+
+    # Closed rings end with CLOSEPOLY, whose vertex is ignored: close them
+    # on their first vertex before measuring
+    rings = {
+        k: np.vstack([path.vertices[s : e - 1], path.vertices[s : s + 1]])
+        for k, (s, e) in enumerate(pieces)
+        if path.codes[e - 1] == Path.CLOSEPOLY
+    }
+    areas = dict(zip(rings, contours.ring_areas(list(rings.values()))))
+    keep = [k for k in range(len(pieces)) if areas.get(k, np.inf) >= min_area]
+    if len(keep) == len(pieces):
+        return path
+    if not keep:
+        return Path(np.empty((0, 2)))
+
+    index = np.concatenate([np.arange(*pieces[k]) for k in keep])
+    return Path(path.vertices[index], path.codes[index])
+
+
+def apply_contour_budget(
+    dem: np.ndarray,
+    dem_min: float,
+    dem_max: float,
+    contour_interval: float | None,
+    budget: contours.ContourBudget | None,
+    profiler: Profiler | None = None,
+) -> tuple[float | None, float]:
+    """
+    Return the contour interval and minimum ring area to draw under
+    `budget` (see `contours.budget_interval`).
+    """
+    if budget is None or contour_interval is None:
+        return contour_interval, 0.0
+    with profiling.stage(profiler, "contour_budget"):
+        contour_interval = contours.budget_interval(
+            dem, dem_min, dem_max, contour_interval, budget
+        )
+    return contour_interval, budget.min_ring_area
+
+
+def wallpaper_metadata(
+    lat: float,
+    lon: float,
+    zoom_level: int,
+    width: int,
+    height: int,
+    contour_interval: float | None,
+    background_color: str | list[str],
+    contour_color: str | list[str],
+    dem_source: str = "SRTM1",
+    dem_resolution: int = 30,
+    params_hash: str | None = None,
+    light: tuple[float, float] | None = None,
+    theme: str | None = None,
+) -> dict[str, str]:
+    """Build the metadata dictionary embedded in generated images."""
     meters_per_pixel = scale.meters_per_pixel(lat, zoom_level)
     bbox = (
         lat - height * meters_per_pixel / 2,
@@ -132,8 +617,8 @@ def generate_wallpaper(
         lon + width * meters_per_pixel / 2,
     )
 
-    exif_dict = metadata.build_exif_metadata(
-        version="0.3.0",
+    return metadata.build_exif_metadata(
+        version=__version__,
         lat=lat,
         lon=lon,
         zoom_level=zoom_level,
@@ -146,10 +631,151 @@ def generate_wallpaper(
         background_color=str(background_color),
         dem_source=dem_source,
         dem_resolution=dem_resolution,
+        params_hash=params_hash,
+        light=light,
+        theme=theme,
+    )
+
+
+def generate_wallpaper(
+    dem_array: np.ndarray,
+    lat: float,
+    lon: float,
+    zoom_level: int,
+    width: int,
+    height: int,
+    contour_interval: float | None = None,
+    background_color: str | list[str] = "#2a2a2a",
+    contour_color: str | list[str] = "white",
+    theme: str | None = None,
+    dem_source: str = "SRTM1",
+    dem_resolution: int = 30,
+    output_path: str = "wallpaper.png",
+    cache: StageCache | MemoryCache | None = None,
+    params_hash: str | None = None,
+    profiler: Profiler | None = None,
+    azdeg: float = LIGHT_AZDEG,
+    altdeg: float = LIGHT_ALTDEG,
+    dem_transform: tuple | None = None,
+    contour_budget: contours.ContourBudget | None = None,
+    dem_range: tuple[float, float] | None = None,
+    encoder: str | None = None,
+) -> None:
+    """
+    Generate a desktop wallpaper with hillshades, optional contour lines,
+    and dynamic/static color themes. The hillshade is lit from azimuth
+    `azdeg` and altitude `altdeg` (degrees).
+
+    Given the geotransform of the DEM (`dem_transform`, from
+    ``dem_meta["transform"]``), the DEM is reprojected onto the Web
+    Mercator pixel grid of the wallpaper; otherwise it is stretched to
+    the output size. A known elevation `dem_range` (from
+    ``srtm.stats_range(dem_meta)``) saves reducing the resampled DEM.
+
+    An `output_path` ending in ``.svg`` is written as SVG: the shaded
+    background as a raster underlay and contour lines as vector paths.
+    Other outputs are rasterized at exactly `width` x `height` and encoded
+    once, metadata included, with `encoder` (see `encoders.ENCODERS`),
+    picked from the extension when not given: WebP for ``.webp``, the
+    parallel PNG writer otherwise.
+
+    With a `contour_budget`, the contour interval is widened as needed to
+    bound the number of levels and contour vertices, and the interval
+    actually drawn is recorded in the metadata.
+
+    If a stage `cache` is given, the resampled DEM, hillshade and
+    normalized DEM are reused across calls that only change colors or
+    contour settings. `params_hash` is embedded in the image metadata so
+    batch runs can detect up-to-date outputs. A `profiler` records the
+    timings and peak memory of each stage.
+    """
+
+    # --- Apply theme ---
+    background_color, contour_color = theme_colors(
+        theme, background_color, contour_color
     )
 
-    metadata.write_metadata(
-        image_path=output_path,
-        exif_dict=exif_dict,
-        version="0.3.0",
+    # --- Resample DEM, hillshade and normalize ---
+    layers = terrain_layers(
+        dem_array, width, height, cache=cache, profiler=profiler,
+        azdeg=azdeg, altdeg=altdeg,
+        view=mercator_view(lat, lon, zoom_level, dem_transform),
+        dem_range=dem_range,
     )
+    dem_resampled = layers["dem"]
+    hillshade = layers["hillshade"]
+    dem_norm = layers["dem_norm"]
+    dem_min, dem_max = (float(v) for v in layers["dem_range"])
+    contour_interval, min_ring_area = apply_contour_budget(
+        dem_resampled, dem_min, dem_max, contour_interval, contour_budget, profiler
+    )
+
+    # --- Background ---
+    with profiling.stage(profiler, "colorize"):
+        hillshade_rgb = colorize(hillshade, dem_norm, background_color)
+
+    # --- Metadata ---
+    with profiling.stage(profiler, "metadata"):
+        exif_dict = wallpaper_metadata(
+            lat,
+            lon,
+            zoom_level,
+            width,
+            height,
+            contour_interval,
+            background_color,
+            contour_color,
+            dem_source=dem_source,
+            dem_resolution=dem_resolution,
+            params_hash=params_hash,
+            light=(azdeg, altdeg),
+            theme=theme,
+        )
+
+    if output_path.lower().endswith(".svg"):
+        with profiling.stage(profiler, "encode"):
+            svg.write_svg(
+                output_path,
+                hillshade_rgb,
+                dem_resampled,
+                dem_min,
+                dem_max,
+                contour_interval=contour_interval,
+                contour_color=contour_color,
+                min_ring_area=min_ring_area,
+                exif_dict=exif_dict,
+                profiler=profiler,
+            )
+        return
+
+    # --- Figure ---
+    fig, ax = plt.subplots(figsize=(width / 100, height / 100), dpi=100)
+    ax.axis("off")
+
+    # --- Background image and contours ---
+    draw_wallpaper(
+        ax,
+        hillshade_rgb,
+        dem_resampled,
+        dem_min,
+        dem_max,
+        contour_interval=contour_interval,
+        contour_color=contour_color,
+        profiler=profiler,
+        min_ring_area=min_ring_area,
+    )
+
+    # --- Rasterize and encode once, metadata included ---
+    with profiling.stage(profiler, "rasterize"):
+        ax.set_position((0, 0, 1, 1))
+        fig.canvas.draw()
+        image = np.ascontiguousarray(np.asarray(fig.canvas.buffer_rgba())[:, :, :3])
+        plt.close(fig)
+    with profiling.stage(profiler, "encode"):
+        encoders.encode(
+            image,
+            output_path,
+            exif_dict,
+            encoder=encoders.encoder_for_path(output_path, encoder),
+            version=__version__,
+        )
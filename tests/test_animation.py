@@ -0,0 +1,167 @@
+# /tests/test_animation.py
+
+import numpy as np
+import pytest
+from affine import Affine
+from PIL import Image
+from unittest.mock import patch
+
+from isohypseswallpaper import animation, metadata, wallpaper
+from isohypseswallpaper.animation import DemPyramid, Frame
+from isohypseswallpaper.renderer import Renderer
+
+
+@pytest.fixture
+def dem_and_meta():
+    frames = animation.zoom_frames(46.5, 8.0, 11, 12, n_frames=3)
+    lat_min, lat_max, lon_min, lon_max = animation.covering_bbox(frames, 64, 48)
+    # ~1 arcsecond grid covering every frame
+    res = 1 / 3600
+    rows = int(np.ceil((lat_max - lat_min) / res))
+    cols = int(np.ceil((lon_max - lon_min) / res))
+    y, x = np.mgrid[0:rows, 0:cols]
+    dem = (1000 + 500 * np.sin(x / 40) * np.cos(y / 30)).astype(np.int16)
+    meta = {"transform": Affine(res, 0, lon_min, 0, -res, lat_max)}
+    return frames, dem, meta
+
+
+def test_zoom_frames_interpolate_zoom_and_pan():
+    frames = animation.zoom_frames(46.0, 8.0, 10, 12, n_frames=5, pan_to=(47.0, 9.0))
+
+    assert [f.index for f in frames] == list(range(5))
+    assert [f.zoom_level for f in frames] == [10, 10.5, 11, 11.5, 12]
+    assert (frames[0].lat, frames[0].lon) == (46.0, 8.0)
+    assert (frames[-1].lat, frames[-1].lon) == (47.0, 9.0)
+
+
+def test_covering_bbox_contains_every_frame():
+    frames = animation.zoom_frames(46.0, 8.0, 10, 12, n_frames=4, pan_to=(46.2, 8.3))
+    lat_min, lat_max, lon_min, lon_max = animation.covering_bbox(frames, 100, 50)
+
+    for frame in frames:
+        f_lat_min, f_lat_max, f_lon_min, f_lon_max = animation.frame_bbox(frame, 100, 50)
+        assert lat_min <= f_lat_min and f_lat_max <= lat_max
+        assert lon_min <= f_lon_min and f_lon_max <= lon_max
+
+
+def test_pyramid_sample_matches_mercator_reprojection():
+    res = 1 / 3600
+    dem = np.random.default_rng(0).normal(size=(1080, 1080)).cumsum(axis=1)
+    transform = Affine(res, 0, 7.85, 0, -res, 46.65)
+    pyramid = DemPyramid(dem, transform, min_size=16)
+    frame = Frame(index=0, lat=46.5, lon=8.0, zoom_level=12)
+
+    # Fewer than 2 source pixels per output pixel: full resolution
+    view = wallpaper.MercatorView(46.5, 8.0, 12, tuple(transform)[:6])
+    np.testing.assert_allclose(
+        pyramid.sample(frame, 64, 48), wallpaper.reproject_dem(dem, view, 64, 48)
+    )
+
+
+def test_pyramid_uses_coarser_level_when_zoomed_out():
+    res = 1 / 3600
+    dem = np.random.default_rng(0).normal(size=(1080, 1080)).cumsum(axis=1)
+    transform = Affine(res, 0, 7.85, 0, -res, 46.65)
+    pyramid = DemPyramid(dem, transform, min_size=16)
+    frame = Frame(index=0, lat=46.5, lon=8.0, zoom_level=9)
+
+    assert [level.shape for level in pyramid.levels[:3]] == [(1080, 1080), (540, 540), (270, 270)]
+    # ~7 source pixels per output pixel: read from level 2, 4x4 block means
+    level_transform = transform * Affine.scale(4)
+    view = wallpaper.MercatorView(46.5, 8.0, 9, tuple(level_transform)[:6])
+    np.testing.assert_allclose(
+        pyramid.sample(frame, 64, 48),
+        wallpaper.reproject_dem(pyramid.levels[2], view, 64, 48),
+    )
+
+
+def test_render_sequence(dem_and_meta, tmp_path):
+    frames, dem, meta = dem_and_meta
+    output = str(tmp_path / "zoom.png")
+
+    paths = animation.render_zoom_animation(
+        dem, meta, frames, 64, 48, output, contour_interval=100, theme="paper_map", workers=1
+    )
+
+    assert paths == [str(tmp_path / f"zoom_000{i}.png") for i in range(3)]
+    with Image.open(paths[0]) as im:
+        assert im.size == (64, 48)
+    assert metadata.read_exif_metadata(paths[-1])["IsohypsesWallpaper:ZoomLevel"] == "12.0"
+
+
+def test_render_animated_apng_in_parallel(dem_and_meta, tmp_path):
+    frames, dem, meta = dem_and_meta
+    output = str(tmp_path / "zoom.apng")
+
+    paths = animation.render_zoom_animation(dem, meta, frames, 64, 48, output, workers=2)
+
+    assert paths == [output]
+    with Image.open(output) as im:
+        assert im.n_frames == 3
+        assert im.size == (64, 48)
+
+
+def test_frames_use_fixed_dem_range(dem_and_meta):
+    frames, dem, meta = dem_and_meta
+    pyramid = DemPyramid(dem, meta["transform"])
+    renderer = Renderer()
+
+    with patch.object(
+        wallpaper, "normalize_dem", wraps=wallpaper.normalize_dem
+    ) as mock_normalize:
+        for frame in frames:
+            animation.render_frame(renderer, pyramid, frame, 32, 24, dem_range=(500, 1500))
+
+    assert [c.args[1] for c in mock_normalize.call_args_list] == [(500, 1500)] * 3
+
+
+def test_zoom_frames_rejects_empty_sequence():
+    with pytest.raises(ValueError):
+        animation.zoom_frames(46.0, 8.0, 10, 12, n_frames=0)
+
+
+def test_sun_path_rises_and_sets():
+    lights = animation.sun_path(5)
+
+    assert [az for az, _ in lights] == [90, 135, 180, 225, 270]
+    altitudes = [alt for _, alt in lights]
+    assert altitudes[0] == pytest.approx(5) and altitudes[-1] == pytest.approx(5)
+    assert max(altitudes) == pytest.approx(60) == altitudes[2]
+
+
+def test_light_sweep_shades_cached_terrain_once(tmp_path):
+    dem = np.random.default_rng(0).normal(size=(40, 40)).cumsum(axis=0) * 20
+    lights = animation.sun_path(3)
+
+    with patch.object(
+        wallpaper, "resample_dem", wraps=wallpaper.resample_dem
+    ) as mock_resample, patch.object(
+        wallpaper, "surface_normals", wraps=wallpaper.surface_normals
+    ) as mock_normals:
+        paths = animation.render_light_sweep(
+            dem, 42.0, 12.0, 12, 64, 48, lights, str(tmp_path / "day.png"),
+            contour_interval=20, theme="paper_map",
+        )
+        mock_resample.assert_called_once()
+        mock_normals.assert_called_once()
+
+    assert len(paths) == 3
+    images = [np.asarray(Image.open(p)) for p in paths]
+    assert images[0].shape == (48, 64, 3)
+    assert not np.array_equal(images[0], images[1])
+    assert metadata.read_exif_metadata(paths[1])["IsohypsesWallpaper:LightAzimuthDeg"] == "180"
+
+
+def test_shaded_normals_match_hillshade():
+    dem = np.random.default_rng(1).normal(size=(40, 40)).cumsum(axis=0) * 20
+    renderer = Renderer()
+
+    full = renderer.render(
+        dem, lat=42.0, lon=12.0, zoom_level=12, width=64, height=48,
+        theme="mono_ink", azdeg=120, altdeg=30,
+    )
+    layers = renderer.layers(dem, 64, 48)
+    hillshade = wallpaper.shade_normals(wallpaper.surface_normals(layers["dem"]), 120, 30)
+
+    np.testing.assert_allclose(hillshade, wallpaper.compute_hillshade(layers["dem"], 120, 30))
+    assert full.metadata["IsohypsesWallpaper:LightAltitudeDeg"] == "30"
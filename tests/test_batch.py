@@ -0,0 +1,133 @@
+# /tests/test_batch.py
+
+import os
+from dataclasses import replace
+
+import numpy as np
+from PIL import Image
+from unittest.mock import patch
+
+from isohypseswallpaper import batch, metadata, themes
+from isohypseswallpaper.batch import BatchJob, expand_config, job_hash, run_batch
+from isohypseswallpaper.presets import SCREEN_PRESETS
+
+
+def fake_render(job, cache=None, profiler=None):
+    """Write a small PNG carrying the job hash, like generate_wallpaper."""
+    Image.fromarray(np.zeros((2, 2, 3), dtype=np.uint8)).save(job.output)
+    metadata.write_metadata(
+        job.output, {"IsohypsesWallpaper:ParamsHash": job_hash(job)}
+    )
+
+
+def test_expand_config_names_outputs(tmp_path):
+    config = {
+        "output_dir": "out",
+        "preset": "1080p",
+        "zoom_levels": [10, 12],
+        "themes": ["mono_ink", "paper_map"],
+        "locations": [
+            {"name": "alps", "lat": 46.5, "lon": 8.0},
+            {"name": "etna", "lat": 37.7, "lon": 15.0, "zoom_levels": [11]},
+        ],
+    }
+
+    jobs = expand_config(config, base_dir=str(tmp_path))
+
+    assert len(jobs) == 6
+    assert jobs[0].output == os.path.join(str(tmp_path), "out", "alps_z10_mono_ink.png")
+    assert (jobs[0].width, jobs[0].height) == SCREEN_PRESETS["1080p"]
+    assert jobs[-1].output.endswith("etna_z11_paper_map.png")
+
+
+def test_job_hash_ignores_output_path():
+    job = BatchJob(lat=1.0, lon=2.0, zoom_level=12, width=10, height=10, output="a.png")
+
+    assert job_hash(job) == job_hash(replace(job, output="b.png"))
+    assert job_hash(job) != job_hash(replace(job, theme="mono_ink"))
+
+
+def test_run_batch_skips_unchanged_outputs(tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    jobs = [
+        BatchJob(lat=1.0, lon=2.0, zoom_level=12, width=10, height=10,
+                 output=str(tmp_path / f"{theme}.png"), theme=theme)
+        for theme in ("mono_ink", "paper_map")
+    ]
+
+    with patch.object(batch, "render_job", side_effect=fake_render) as mock_render:
+        first = run_batch(jobs, manifest_path)
+        second = run_batch(jobs, manifest_path)
+
+        changed = [jobs[0], replace(jobs[1], contour_interval=50)]
+        third = run_batch(changed, manifest_path)
+
+    assert len(first["rendered"]) == 2
+    assert len(second["skipped"]) == 2
+    assert third["rendered"] == [changed[1]]
+    assert mock_render.call_count == 3
+
+
+def test_run_batch_renders_jobs_of_edited_themes(tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    jobs = [
+        BatchJob(lat=1.0, lon=2.0, zoom_level=12, width=10, height=10,
+                 output=str(tmp_path / f"{theme}.png"), theme=theme)
+        for theme in ("mono_ink", "paper_map")
+    ]
+    edited = dict(themes.THEMES["paper_map"], contour="#ff0000")
+
+    with patch.object(batch, "render_job", side_effect=fake_render):
+        run_batch(jobs, manifest_path)
+        with patch.dict(themes.THEMES, {"paper_map": edited}):
+            result = run_batch(jobs, manifest_path)
+
+    assert result["rendered"] == [jobs[1]]
+    assert result["skipped"] == [jobs[0]]
+
+
+def test_run_batch_check_png_without_manifest(tmp_path):
+    """With check_png, the hash embedded in the PNG is enough to skip."""
+    job = BatchJob(lat=1.0, lon=2.0, zoom_level=12, width=10, height=10,
+                   output=str(tmp_path / "a.png"))
+    fake_render(job)
+
+    with patch.object(batch, "render_job") as mock_render:
+        result = run_batch([job], str(tmp_path / "manifest.json"), check_png=True)
+
+    mock_render.assert_not_called()
+    assert result["skipped"] == [job]
+
+
+def test_run_batch_check_png_renders_unreadable_outputs(tmp_path):
+    jobs = [
+        BatchJob(lat=1.0, lon=2.0, zoom_level=12, width=10, height=10,
+                 output=str(tmp_path / name), encoder=encoder)
+        for name, encoder in (("x.webp", "webp"), ("y.png", None))
+    ]
+    for job in jobs:
+        with open(job.output, "wb") as f:
+            f.write(b"garbage")
+
+    with patch.object(batch, "render_job") as mock_render:
+        result = run_batch(jobs, str(tmp_path / "manifest.json"), check_png=True)
+
+    assert result["rendered"] == jobs
+    assert mock_render.call_count == 2
+
+
+def test_expand_config_names_outputs_by_encoder(tmp_path):
+    config = {
+        "preset": "1080p",
+        "zoom_level": 12,
+        "locations": [
+            {"name": "alps", "lat": 46.5, "lon": 8.0, "encoder": "webp-lossy"},
+            {"name": "etna", "lat": 37.7, "lon": 15.0, "encoder": "png-palette"},
+        ],
+    }
+
+    alps, etna = expand_config(config, base_dir=str(tmp_path))
+
+    assert alps.output.endswith("alps_z12_custom.webp") and alps.encoder == "webp-lossy"
+    assert etna.output.endswith("etna_z12_custom.png")
+    assert job_hash(alps) != job_hash(replace(alps, encoder="webp"))
@@ -0,0 +1,73 @@
+# /tests/test_cache.py
+
+import os
+
+import numpy as np
+from unittest.mock import patch
+
+from isohypseswallpaper.cache import StageCache, array_digest, stage_key
+from isohypseswallpaper.wallpaper import generate_wallpaper, terrain_layers
+
+
+def test_store_and_load_roundtrip(tmp_path):
+    """Stored layers are loaded back as read-only memory maps."""
+    cache = StageCache(str(tmp_path))
+    layers = {"a": np.arange(6.0).reshape(2, 3), "b": np.ones(4)}
+
+    cache.store("key", layers)
+    loaded = cache.load("key", ["a", "b"])
+
+    assert isinstance(loaded["a"], np.memmap)
+    np.testing.assert_array_equal(loaded["a"], layers["a"])
+    np.testing.assert_array_equal(loaded["b"], layers["b"])
+    assert cache.load("missing", ["a"]) is None
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    """Entries over the budget are evicted oldest first."""
+    layer = {"a": np.zeros(1000)}  # ~8 kB per entry
+    cache = StageCache(str(tmp_path), budget_bytes=20_000)
+
+    cache.store("old", layer)
+    os.utime(tmp_path / "old", (0, 0))
+    cache.store("mid", layer)
+    cache.store("new", layer)
+
+    assert cache.load("old", ["a"]) is None
+    assert cache.load("mid", ["a"]) is not None
+    assert cache.load("new", ["a"]) is not None
+    assert cache.size_bytes() <= 20_000
+
+
+def test_keys_depend_on_dem_and_parameters():
+    dem = np.arange(9.0).reshape(3, 3)
+
+    assert array_digest(dem) == array_digest(dem.copy())
+    assert array_digest(dem) != array_digest(dem + 1)
+    assert stage_key(a=1, b=2) == stage_key(b=2, a=1)
+    assert stage_key(a=1) != stage_key(a=2)
+
+
+@patch("isohypseswallpaper.wallpaper.encoders.encode")
+def test_generate_wallpaper_reuses_cached_layers(
+    mock_encode, tmp_path
+):
+    """A second render with other colors skips the terrain stages."""
+    dem = np.linspace(0, 100, 100).reshape(10, 10)
+    cache = StageCache(str(tmp_path))
+    expected = terrain_layers(dem, 40, 20)
+
+    common = dict(
+        dem_array=dem, lat=42.0, lon=12.0, zoom_level=12,
+        width=40, height=20, contour_interval=10, cache=cache,
+    )
+    generate_wallpaper(background_color="#111111", **common)
+
+    with patch("isohypseswallpaper.wallpaper.resample_dem") as mock_resample:
+        generate_wallpaper(theme="mono_ink", **common)
+        mock_resample.assert_not_called()
+
+    cached = terrain_layers(dem, 40, 20, cache=cache)
+    np.testing.assert_allclose(cached["hillshade"], expected["hillshade"])
+    np.testing.assert_allclose(cached["dem_norm"], expected["dem_norm"])
+    assert mock_encode.call_count == 2
@@ -0,0 +1,101 @@
+# /tests/test_catalog.py
+
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from isohypseswallpaper import encoders, themes, wallpaper
+from isohypseswallpaper.catalog import Catalog, footprint, parse_fields
+
+
+def write_wallpaper(path, lat, lon, zoom_level, theme=None, generated_at=None):
+    """Write a tiny image carrying the metadata of a wallpaper."""
+    background, contour = wallpaper.theme_colors(theme, "#2a2a2a", "white")
+    exif_dict = wallpaper.wallpaper_metadata(
+        lat, lon, zoom_level, 1920, 1080, 50, background, contour, theme=theme
+    )
+    if generated_at is not None:
+        exif_dict["IsohypsesWallpaper:GeneratedAt"] = generated_at
+    encoder = encoders.encoder_for_path(str(path))
+    encoders.encode(np.zeros((4, 4, 3), dtype=np.uint8), str(path), exif_dict, encoder=encoder)
+
+
+@pytest.fixture
+def library(tmp_path):
+    root = tmp_path / "library"
+    (root / "alps").mkdir(parents=True)
+    write_wallpaper(root / "alps" / "a.png", 46.5, 8.0, 12, "mono_ink", "2026-03-01T10:00:00Z")
+    write_wallpaper(root / "alps" / "b.webp", 46.0, 7.5, 10, "paper_map", "2026-05-01T10:00:00Z")
+    write_wallpaper(root / "etna.png", 37.7, 15.0, 12, None, "2026-06-01T10:00:00Z")
+    Image.fromarray(np.zeros((4, 4, 3), dtype=np.uint8)).save(root / "photo.png")
+    (root / "notes.txt").write_text("not an image")
+    return root
+
+
+def test_scan_indexes_metadata_without_decoding_pngs(library, tmp_path):
+    with Catalog(str(tmp_path / "catalog.sqlite")) as catalog:
+        with patch("PIL.Image.Image.load", side_effect=AssertionError("pixels decoded")):
+            result = catalog.scan(str(library))
+
+        assert (result.added, result.updated, result.removed) == (4, 0, 0)
+        assert catalog.count() == 3
+
+        (entry,) = catalog.query(theme="mono_ink")
+        assert entry.path == str(library / "alps" / "a.png")
+        assert (entry.lat, entry.lon, entry.zoom_level, entry.width) == (46.5, 8.0, 12, 1920)
+        assert entry.metadata["IsohypsesWallpaper:ContourIntervalM"] == "50"
+
+
+def test_query_filters(library, tmp_path):
+    with Catalog(str(tmp_path / "catalog.sqlite")) as catalog:
+        catalog.scan(str(library))
+
+        def names(**filters):
+            return [os.path.basename(e.path) for e in catalog.query(**filters)]
+
+        assert names() == ["etna.png", "b.webp", "a.png"]
+        assert names(zoom_level=12) == ["etna.png", "a.png"]
+        assert names(theme="paper_map") == ["b.webp"]
+        assert names(bbox=(45.5, 47.5, 6.0, 9.0)) == ["b.webp", "a.png"]
+        assert names(bbox=(46.55, 47.0, 8.05, 8.1)) == ["a.png"]
+        assert names(since="2026-04-01", before="2026-06-01") == ["b.webp"]
+        assert names(zoom_level=12, bbox=(45.5, 47.5, 6.0, 9.0), since="2026-01-01") == ["a.png"]
+        assert names(limit=1) == ["etna.png"]
+
+
+def test_rescan_is_incremental(library, tmp_path):
+    with Catalog(str(tmp_path / "catalog.sqlite")) as catalog:
+        catalog.scan(str(library))
+
+        with patch("isohypseswallpaper.catalog.read_fields") as mock_read:
+            result = catalog.scan(str(library))
+        mock_read.assert_not_called()
+        assert result.unchanged == 4
+
+        write_wallpaper(library / "etna.png", 37.7, 15.0, 13, None, "2026-07-01T10:00:00Z")
+        os.utime(library / "etna.png", ns=(1, 1))
+        os.remove(library / "alps" / "b.webp")
+        result = catalog.scan(str(library))
+
+        assert (result.updated, result.removed, result.unchanged) == (1, 1, 2)
+        assert [e.zoom_level for e in catalog.query(bbox=(37.0, 38.0, 14.0, 16.0))] == [13]
+        assert catalog.count() == 2
+
+
+def test_footprint_and_fields():
+    lat_min, lat_max, lon_min, lon_max = footprint(46.5, 8.0, 12, 1920, 1080)
+    assert lon_max - lon_min == pytest.approx(1920 * 360 / (256 * 2**12))
+    assert lat_min < 46.5 < lat_max
+
+    background, contour = themes.THEMES["mono_ink"]["background"], themes.THEMES["mono_ink"]["contour"]
+    exif_dict = wallpaper.wallpaper_metadata(46.5, 8.0, 12, 1920, 1080, 50, background, contour)
+    # Files without an embedded theme name fall back to its colors
+    assert parse_fields(exif_dict)["theme"] == "mono_ink"
+    exif_dict = wallpaper.wallpaper_metadata(
+        46.5, 8.0, 12, 1920, 1080, 50, background, contour, theme="mono_ink_v1"
+    )
+    assert parse_fields(exif_dict)["theme"] == "mono_ink_v1"
+    assert parse_fields({"Software": "other"}) is None
@@ -1,6 +1,7 @@
 # /tests/test_cli.py
 
 import builtins
+import json
 from argparse import Namespace
 
 import pytest
@@ -76,3 +77,194 @@ def test_cli_calls_pipeline(monkeypatch):
     assert wallpaper_call["background_color"] == "#1a1a1a"
     assert wallpaper_call["contour_color"] == "cyan"
     assert wallpaper_call["contour_interval"] == 50.0
+
+
+def test_cli_zoom_animation(monkeypatch):
+    mock_args = Namespace(
+        lat=42.0,
+        lon=12.0,
+        zoom_level=10,
+        width=64,
+        height=48,
+        preset=None,
+        contour=None,
+        bgcolor="#2a2a2a",
+        contour_color="white",
+        output="zoom.webp",
+        theme=None,
+        list_themes=False,
+        zoom_to=12.0,
+        frames=3,
+        pan_to=None,
+        fps=12,
+        workers=2,
+    )
+    monkeypatch.setattr(cli.argparse.ArgumentParser, "parse_args", lambda self: mock_args)
+
+    calls = {}
+
+    def mock_fetch(frames, width, height):
+        calls["fetch"] = (frames, width, height)
+        return "DEM_ARRAY", {"meta": "data"}
+
+    def mock_render(dem_array, dem_meta, frames, width, height, output, **kwargs):
+        calls["render"] = (dem_array, output, kwargs)
+        return [output]
+
+    monkeypatch.setattr(cli.animation, "fetch_animation_dem", mock_fetch)
+    monkeypatch.setattr(cli.animation, "render_zoom_animation", mock_render)
+    monkeypatch.setattr(cli.wallpaper, "generate_wallpaper", lambda **kwargs: pytest.fail())
+
+    cli.main()
+
+    frames, width, height = calls["fetch"]
+    assert [f.zoom_level for f in frames] == [10, 11, 12]
+    assert (width, height) == (64, 48)
+    dem_array, output, kwargs = calls["render"]
+    assert dem_array == "DEM_ARRAY"
+    assert output == "zoom.webp"
+    assert kwargs["fps"] == 12 and kwargs["workers"] == 2
+
+
+def test_cli_span(monkeypatch, capsys):
+    mock_args = Namespace(
+        lat=46.5,
+        lon=8.0,
+        zoom_level=12,
+        width=None,
+        height=None,
+        preset=None,
+        contour=50.0,
+        bgcolor="#2a2a2a",
+        contour_color="white",
+        output="desk.png",
+        theme=None,
+        list_themes=False,
+        span=["left=1440p@0,360", "4k@2560,0"],
+        span_strips=True,
+    )
+    monkeypatch.setattr(cli.argparse.ArgumentParser, "parse_args", lambda self: mock_args)
+
+    calls = {}
+
+    def mock_fetch(lat, lon, zoom_level, displays):
+        calls["fetch"] = (lat, lon, zoom_level, displays)
+        return "DEM_ARRAY", {"transform": "TRANSFORM"}
+
+    def mock_render(dem_array, dem_transform, lat, lon, zoom_level, displays, **kwargs):
+        calls["render"] = (dem_array, dem_transform, kwargs)
+        return {d.name: d for d in displays}
+
+    def mock_save(rendered, displays, output, encoder=None):
+        return [cli.span.display_path(output, d) for d in displays]
+
+    monkeypatch.setattr(cli.span, "fetch_span_dem", mock_fetch)
+    monkeypatch.setattr(cli.span, "render_span", mock_render)
+    monkeypatch.setattr(cli.span, "save_span", mock_save)
+    monkeypatch.setattr(cli.wallpaper, "generate_wallpaper", lambda **kwargs: pytest.fail())
+
+    cli.main()
+
+    _, _, _, displays = calls["fetch"]
+    assert [(d.name, d.width, d.x) for d in displays] == [("left", 2560, 0), ("screen2", 3840, 2560)]
+    dem_array, dem_transform, kwargs = calls["render"]
+    assert (dem_array, dem_transform) == ("DEM_ARRAY", "TRANSFORM")
+    assert kwargs["strips"] is True and kwargs["contour_interval"] == 50.0
+    assert "desk_screen2.png" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("preview_only", [False, True])
+def test_cli_preview(monkeypatch, capsys, preview_only):
+    mock_args = Namespace(
+        lat=42.0,
+        lon=12.0,
+        zoom_level=12,
+        width=1920,
+        height=1080,
+        preset=None,
+        contour=50.0,
+        bgcolor="#2a2a2a",
+        contour_color="white",
+        output="out/wallpaper.svg",
+        theme=None,
+        list_themes=False,
+        preview=8,
+        preview_only=preview_only,
+    )
+    monkeypatch.setattr(cli.argparse.ArgumentParser, "parse_args", lambda self: mock_args)
+    monkeypatch.setattr(cli.geometry, "bounding_box", lambda *args: (0.0, 1.0, 2.0, 3.0))
+
+    fetches = []
+
+    def mock_get_dem(lat_min, lat_max, lon_min, lon_max, resolution, decimation=1):
+        fetches.append(decimation)
+        return "DEM_ARRAY", {"transform": None}
+
+    class MockRenderer:
+        def preview(self, dem_array, lat, lon, zoom_level, width, height, factor, **kwargs):
+            assert (width, height, factor) == (1920, 1080, 8)
+            return rendered
+
+    rendered = Namespace(save=lambda path: saved.append(path))
+    saved = []
+    generated = []
+    monkeypatch.setattr(cli.srtm, "get_dem", mock_get_dem)
+    monkeypatch.setattr(cli.renderer, "Renderer", MockRenderer)
+    monkeypatch.setattr(cli.wallpaper, "generate_wallpaper", lambda **kwargs: generated.append(kwargs))
+
+    cli.main()
+
+    assert saved == ["out/wallpaper_preview.png"]
+    assert "Preview saved to out/wallpaper_preview.png" in capsys.readouterr().out
+    assert fetches == ([8] if preview_only else [8, 1])
+    assert len(generated) == (0 if preview_only else 1)
+
+
+def test_cli_profiles_light_sweep(monkeypatch, tmp_path):
+    profile_path = tmp_path / "run.json"
+    mock_args = Namespace(
+        lat=42.0,
+        lon=12.0,
+        zoom_level=12,
+        width=64,
+        height=48,
+        preset=None,
+        contour=50.0,
+        bgcolor="#2a2a2a",
+        contour_color="white",
+        output="sweep.webp",
+        theme=None,
+        list_themes=False,
+        light_sweep=4,
+        fps=12,
+        workers=1,
+        profile=str(profile_path),
+    )
+    monkeypatch.setattr(cli.argparse.ArgumentParser, "parse_args", lambda self: mock_args)
+    monkeypatch.setattr(cli.srtm, "get_dem", lambda *args, **kwargs: ("DEM_ARRAY", {}))
+    monkeypatch.setattr(cli.animation, "render_light_sweep", lambda *args, **kwargs: ["sweep.webp"])
+
+    cli.main()
+
+    report = json.loads(profile_path.read_text())
+    assert [s["stage"] for s in report["stages"]] == ["bbox", "dem_fetch", "light_sweep"]
+
+
+@pytest.mark.parametrize("option", [{"zoom_to": 14.0}, {"span": ["1080p@0,0"]}])
+def test_cli_rejects_profile_without_stages(monkeypatch, option):
+    mock_args = Namespace(
+        lat=42.0,
+        lon=12.0,
+        zoom_level=12,
+        width=64,
+        height=48,
+        preset=None,
+        output="out.png",
+        list_themes=False,
+        profile="run.json",
+        **option,
+    )
+    monkeypatch.setattr(cli.argparse.ArgumentParser, "parse_args", lambda self: mock_args)
+
+    with pytest.raises(SystemExit):
+        cli.main()
@@ -0,0 +1,61 @@
+# /tests/test_cli_startup.py
+
+"""
+Startup budget of the CLI, measured with ``python -X importtime``.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import isohypseswallpaper
+
+# Total import time allowed before the CLI can list themes, print help or
+# reject arguments.
+STARTUP_BUDGET_US = 100_000
+
+HEAVY_MODULES = {"numpy", "matplotlib", "rasterio", "pyproj", "scipy", "elevation", "PIL"}
+
+
+def run_cli(*cli_args):
+    """Run the CLI in a fresh interpreter; return (returncode, imports)."""
+    env = dict(os.environ)
+    src_dir = os.path.dirname(os.path.dirname(isohypseswallpaper.__file__))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src_dir, env.get("PYTHONPATH")]))
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "isohypseswallpaper.cli", *cli_args],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+
+    # Lines look like "import time:   self [us] | cumulative | imported package"
+    imports = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        imports[name.strip()] = int(self_us)
+    return proc.returncode, imports
+
+
+@pytest.mark.parametrize(
+    "cli_args, returncode",
+    [
+        (["--list-themes"], 0),
+        (["--help"], 0),
+        (["--lat", "42.0"], 2),  # missing required arguments
+        (["--lat", "42.0", "--lon", "12.0", "--zoom_level", "12", "--output", "x.png"], 2),
+    ],
+)
+def test_cli_fast_paths_skip_heavy_imports(cli_args, returncode):
+    code, imports = run_cli(*cli_args)
+
+    assert code == returncode
+    heavy = {name for name in imports if name.split(".")[0] in HEAVY_MODULES}
+    assert not heavy, f"heavy modules imported: {sorted(heavy)}"
+    total_us = sum(imports.values())
+    assert total_us < STARTUP_BUDGET_US, f"imports took {total_us / 1000:.1f} ms"
@@ -0,0 +1,108 @@
+# tests/test_contours.py
+
+import numpy as np
+import pytest
+
+from isohypseswallpaper import contours
+from isohypseswallpaper.contours import ContourBudget
+
+
+@pytest.fixture
+def rugged_dem():
+    y, x = np.mgrid[0:200, 0:300]
+    return 1500 + 1000 * np.sin(x / 7) * np.cos(y / 9) + 2 * x
+
+
+def douglas_peucker(points, tolerance):
+    """Recursive reference implementation."""
+    if len(points) < 3:
+        return points
+    start, end = points[0], points[-1]
+    d = end - start
+    seg_len = np.hypot(*d)
+    rel = points[1:-1] - start
+    if seg_len == 0:
+        dist = np.hypot(rel[:, 0], rel[:, 1])
+    else:
+        dist = np.abs(d[0] * rel[:, 1] - d[1] * rel[:, 0]) / seg_len
+    k = int(np.argmax(dist)) + 1
+    if dist[k - 1] <= tolerance:
+        return np.array([start, end])
+    left = douglas_peucker(points[: k + 1], tolerance)
+    right = douglas_peucker(points[k:], tolerance)
+    return np.concatenate([left[:-1], right])
+
+
+def test_simplify_lines_matches_recursive_douglas_peucker():
+    rng = np.random.default_rng(0)
+    lines = [np.cumsum(rng.normal(size=(n, 2)), axis=0) for n in (2, 3, 50, 400)]
+
+    simplified = contours.simplify_lines(lines, 1.5)
+
+    for line, result in zip(lines, simplified):
+        np.testing.assert_array_equal(result, douglas_peucker(line, 1.5))
+
+
+def test_simplify_keeps_rings_closed():
+    t = np.linspace(0, 2 * np.pi, 200)
+    ring = np.column_stack([50 + 20 * np.cos(t), 50 + 20 * np.sin(t)])
+    ring[-1] = ring[0]
+
+    result = contours.simplify(ring, 0.5)
+
+    assert 4 < len(result) < len(ring)
+    np.testing.assert_array_equal(result[0], result[-1])
+
+
+def test_quantize_drops_duplicates():
+    points = np.array([[0.0, 0.0], [0.01, 0.02], [1.0, 1.0], [1.04, 0.96]])
+    np.testing.assert_array_equal(contours.quantize(points, 10), [[0, 0], [10, 10]])
+
+
+def test_estimate_vertices_matches_traced_lines(rugged_dem):
+    levels = contours.contour_levels(rugged_dem.min(), rugged_dem.max(), 50)
+    traced = sum(len(line) for _, lines in contours.contour_lines(rugged_dem, levels) for line in lines)
+
+    assert contours.estimate_vertices(rugged_dem, 50) == pytest.approx(traced, rel=0.05)
+
+
+@pytest.mark.parametrize(
+    "interval, expected", [(1, 1), (13.7, 20), (20, 20), (21, 25), (0.3, 0.5), (260, 500)]
+)
+def test_nice_interval(interval, expected):
+    assert contours.nice_interval(interval) == pytest.approx(expected)
+
+
+def test_budget_interval_keeps_affordable_interval(rugged_dem):
+    dem_min, dem_max = rugged_dem.min(), rugged_dem.max()
+    budget = ContourBudget(max_levels=250, max_vertices=1_000_000)
+
+    assert contours.budget_interval(rugged_dem, dem_min, dem_max, 20, budget) == 20
+
+
+def test_budget_interval_caps_levels_and_vertices(rugged_dem):
+    dem_min, dem_max = rugged_dem.min(), rugged_dem.max()
+
+    interval = contours.budget_interval(
+        rugged_dem, dem_min, dem_max, 1, ContourBudget(max_levels=20)
+    )
+    assert len(contours.contour_levels(dem_min, dem_max, interval)) <= 20
+
+    interval = contours.budget_interval(
+        rugged_dem, dem_min, dem_max, 1, ContourBudget(max_vertices=20_000)
+    )
+    assert contours.estimate_vertices(rugged_dem, interval) <= 20_000
+    assert interval == contours.nice_interval(interval)
+
+
+def test_drop_small_rings_keeps_open_lines():
+    t = np.linspace(0, 2 * np.pi, 50)
+    small = np.column_stack([5 + np.cos(t), 5 + np.sin(t)])
+    large = np.column_stack([50 + 20 * np.cos(t), 50 + 20 * np.sin(t)])
+    small[-1], large[-1] = small[0], large[0]
+    open_line = np.array([[0.0, 0.0], [0.5, 0.0]])
+
+    kept = contours.drop_small_rings([small, open_line, large], 10)
+
+    assert [len(line) for line in kept] == [2, 50]
+    assert contours.ring_areas([large])[0] == pytest.approx(np.pi * 400, rel=0.01)
@@ -0,0 +1,65 @@
+# /tests/test_encoders.py
+
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from isohypseswallpaper import encoders, metadata
+from isohypseswallpaper.encoders import ENCODERS, encode, encoder_for_path, file_extension
+from isohypseswallpaper.wallpaper import generate_wallpaper
+
+EXIF_DICT = {"IsohypsesWallpaper:Latitude": "46.500000", "IsohypsesWallpaper:ContourColor": "#fff"}
+
+
+@pytest.fixture
+def image():
+    y, x = np.mgrid[0:48, 0:64]
+    return np.stack([x * 4, y * 5, (x + y) * 2], axis=-1).astype(np.uint8)
+
+
+@pytest.mark.parametrize("name", list(ENCODERS))
+def test_encoders_preserve_metadata(image, tmp_path, name):
+    path = tmp_path / f"wallpaper{file_extension(name)}"
+    encode(image, str(path), EXIF_DICT, encoder=name)
+
+    with Image.open(path) as img:
+        assert img.size == (64, 48)
+        assert img.format == ENCODERS[name].format
+        decoded = np.asarray(img.convert("RGB"))
+    assert metadata.read_exif_metadata(str(path)) == EXIF_DICT
+    if name in ("png", "png-fast", "webp"):
+        np.testing.assert_array_equal(decoded, image)
+
+
+def test_palette_png_is_8_bit_and_exact_for_few_colors(tmp_path):
+    image = np.zeros((40, 60, 3), dtype=np.uint8)
+    image[::3] = (240, 235, 220)
+    buffer = io.BytesIO()
+    encode(image, buffer, EXIF_DICT, encoder="png-palette")
+
+    with Image.open(buffer) as img:
+        assert img.mode == "P"
+        np.testing.assert_array_equal(np.asarray(img.convert("RGB")), image)
+
+
+def test_encoder_selection():
+    assert encoder_for_path("out.webp") == "webp"
+    assert encoder_for_path("out.PNG") == "png"
+    assert encoder_for_path("out.png", "png-fast") == "png-fast"
+    with pytest.raises(ValueError, match="Unknown encoder"):
+        encoders.get_encoder("jpeg2000")
+
+
+def test_generate_wallpaper_encodes_once(tmp_path):
+    path = tmp_path / "wallpaper.webp"
+    generate_wallpaper(
+        dem_array=np.linspace(0, 100, 100).reshape(10, 10),
+        lat=42.0, lon=12.0, zoom_level=12, width=64, height=48,
+        contour_interval=10, output_path=str(path),
+    )
+
+    with Image.open(path) as img:
+        assert (img.format, img.size) == ("WEBP", (64, 48))
+    assert metadata.read_exif_metadata(str(path))["IsohypsesWallpaper:WidthPx"] == "64"
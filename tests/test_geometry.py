@@ -1,10 +1,13 @@
 # /tests/test_geometry.py
 
 import math
+import time
+
+import numpy as np
 import pytest
 
-from isohypseswallpaper.geometry import offset_point, bounding_box
-from isohypseswallpaper.scale import meters_per_pixel
+from isohypseswallpaper.geometry import offset_point, bounding_box, bounding_boxes
+from isohypseswallpaper.scale import meters_per_pixel, meters_per_pixel_array
 
 
 def test_offset_point_north_east_consistency():
@@ -70,3 +73,33 @@ def test_offset_zero_returns_same_point():
     lat2, lon2 = offset_point(lat, lon, 0, 0)
     assert lat2 == lat
     assert lon2 == lon
+
+
+def test_bounding_boxes_match_scalar_version():
+    """The vectorized version returns exactly the scalar bounding boxes."""
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(-60, 60, 50)
+    lons = rng.uniform(-180, 180, 50)
+    widths = rng.uniform(1_000, 50_000, 50)
+
+    boxes = bounding_boxes(lats, lons, widths, 20_000)
+
+    assert boxes.shape == (50, 4)
+    for row, lat, lon, width in zip(boxes, lats, lons, widths):
+        np.testing.assert_allclose(row, bounding_box(lat, lon, width, 20_000), rtol=0, atol=1e-12)
+
+
+def test_bounding_boxes_plan_10000_locations_fast():
+    """Planning 10,000 wallpapers takes milliseconds, not seconds."""
+    rng = np.random.default_rng(1)
+    lats = rng.uniform(-60, 60, 10_000)
+    lons = rng.uniform(-180, 180, 10_000)
+    zooms = rng.integers(8, 14, 10_000)
+
+    start = time.perf_counter()
+    m_per_px = meters_per_pixel_array(lats, zooms)
+    boxes = bounding_boxes(lats, lons, 1920 * m_per_px, 1080 * m_per_px)
+    elapsed = time.perf_counter() - start
+
+    assert boxes.shape == (10_000, 4)
+    assert elapsed < 0.5
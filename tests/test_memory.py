@@ -0,0 +1,116 @@
+# /tests/test_memory.py
+
+"""
+Peak-memory budgets for the render pipeline.
+
+The pipeline holds several full-size arrays at once; these tests measure
+peak traced memory with `tracemalloc` and fail when a change adds another
+full-size float64 temporary (8 bytes per pixel). Only the 1080p preset
+runs by default; set ISOHYPSES_MEMORY_TESTS=all to check every preset.
+"""
+
+import os
+import tracemalloc
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+from isohypseswallpaper.presets import SCREEN_PRESETS
+from isohypseswallpaper.srtm import get_dem
+from isohypseswallpaper.wallpaper import generate_wallpaper
+
+# Peak traced memory allowed for a full-size render, in MB. Each ceiling is
+# less than 8 bytes per pixel above the measured peak.
+RENDER_BUDGET_MB = {
+    "1080p": 385,
+    "1440p": 685,
+    "4k": 1540,
+    "ultrawide": 920,
+}
+RENDER_CONTOURS_BUDGET_MB = {"1080p": 440}
+
+# get_dem may hold the merged mosaic plus one tile window at a time.
+DEM_BUDGET_FACTOR = 2.0
+
+FULL = os.environ.get("ISOHYPSES_MEMORY_TESTS") == "all"
+
+
+def synthetic_dem(height, width):
+    """Deterministic smooth terrain between roughly 500 and 3500 m."""
+    y, x = np.mgrid[0:height, 0:width]
+    dem = 2000 + 900 * np.sin(x / 47.0) * np.cos(y / 61.0) + 600 * np.sin((x + y) / 113.0)
+    return dem.astype(np.int16)
+
+
+def peak_traced_bytes(func, *args, **kwargs):
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def render(preset, tmp_path, contour_interval=None):
+    width, height = SCREEN_PRESETS[preset]
+    dem = synthetic_dem(int(height * 0.9), int(width * 0.9))
+    return peak_traced_bytes(
+        generate_wallpaper,
+        dem_array=dem,
+        lat=46.5,
+        lon=8.0,
+        zoom_level=12,
+        width=width,
+        height=height,
+        contour_interval=contour_interval,
+        theme="lichen_forest",
+        output_path=str(tmp_path / "wallpaper.png"),
+    )
+
+
+@pytest.mark.parametrize(
+    "preset",
+    [
+        pytest.param(
+            p,
+            marks=pytest.mark.skipif(
+                p != "1080p" and not FULL, reason="set ISOHYPSES_MEMORY_TESTS=all"
+            ),
+        )
+        for p in SCREEN_PRESETS
+    ],
+)
+def test_render_peak_memory_within_budget(preset, tmp_path):
+    peak = render(preset, tmp_path)
+    assert peak <= RENDER_BUDGET_MB[preset] * 1e6, f"{preset}: {peak / 1e6:.0f} MB"
+
+
+def test_render_with_contours_peak_memory_within_budget(tmp_path):
+    peak = render("1080p", tmp_path, contour_interval=100)
+    assert peak <= RENDER_CONTOURS_BUDGET_MB["1080p"] * 1e6, f"{peak / 1e6:.0f} MB"
+
+
+def test_get_dem_peak_memory_within_budget(tmp_path):
+    """Merging a local 2x2 tile set stays within a multiple of the result."""
+    size = 1201  # 3 arc-second tiles
+    for lat in (45, 46):
+        for lon in (7, 8):
+            path = tmp_path / f"N{lat}E{lon:03d}.tif"
+            with rasterio.open(
+                path, "w", driver="GTiff", height=size, width=size, count=1,
+                dtype="int16", crs="EPSG:4326",
+                transform=from_origin(lon, lat + 1, 1 / (size - 1), 1 / (size - 1)),
+            ) as dst:
+                dst.write(synthetic_dem(size, size), 1)
+
+    result = {}
+
+    def fetch():
+        result["dem"], _ = get_dem(45.5, 46.5, 7.5, 8.5, tiles_dir=str(tmp_path))
+
+    peak = peak_traced_bytes(fetch)
+    dem = result["dem"]
+    assert dem.shape[0] > 1000 and dem.shape[1] > 1000
+    assert peak <= DEM_BUDGET_FACTOR * dem.nbytes + 1e6, f"{peak / 1e6:.1f} MB"
@@ -15,7 +15,8 @@ def test_build_exif_metadata_basic():
         bbox=(41.861448, 42.137605, 11.671616, 12.329808),
         contour_interval=50,
         contour_color="#FFFFFF",
-        background_color="#0E0E0E"
+        background_color="#0E0E0E",
+        theme="mono_ink",
     )
 
     # Basic checks
@@ -24,6 +25,7 @@ def test_build_exif_metadata_basic():
     assert metadata["IsohypsesWallpaper:Latitude"] == "42.000000"
     assert metadata["IsohypsesWallpaper:Longitude"] == "12.000000"
     assert metadata["IsohypsesWallpaper:BoundingBox"] == "41.861448,42.137605,11.671616,12.329808"
+    assert metadata["IsohypsesWallpaper:Theme"] == "mono_ink"
 
 
 def test_exif_dict_to_usercomment_format():
@@ -48,6 +50,21 @@ def test_generated_at_format():
         contour_color="#000000",
         background_color="#FFFFFF"
     )
+    assert "IsohypsesWallpaper:Theme" not in metadata
     generated_at = metadata["IsohypsesWallpaper:GeneratedAt"]
     # Check ISO 8601 UTC format
     assert re.match(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z", generated_at)
+
+
+def test_read_png_text_roundtrip(tmp_path):
+    """Metadata written to a PNG is read back from its text chunks."""
+    from PIL import Image
+    from isohypseswallpaper.metadata import read_exif_metadata, write_metadata
+
+    image_path = str(tmp_path / "image.png")
+    Image.new("RGB", (4, 4)).save(image_path)
+    exif_dict = {"IsohypsesWallpaper:ParamsHash": "abc", "IsohypsesWallpaper:ZoomLevel": "12"}
+
+    write_metadata(image_path, exif_dict)
+
+    assert read_exif_metadata(image_path) == exif_dict
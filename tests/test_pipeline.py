@@ -0,0 +1,170 @@
+# /tests/test_pipeline.py
+
+import os
+import threading
+import time
+
+import matplotlib
+import numpy as np
+import pytest
+from PIL import Image
+from unittest.mock import patch
+
+from isohypseswallpaper import batch, metadata, srtm
+from isohypseswallpaper.batch import BatchJob
+from isohypseswallpaper.pipeline import Pipeline, RenderPipeline, Stage, run_batch_pipelined
+
+matplotlib.use("Agg")
+
+
+def sleeper(seconds):
+    def func(value):
+        time.sleep(seconds)
+        return value
+    return func
+
+
+def test_stages_overlap():
+    stages = [Stage(name, sleeper(0.05)) for name in ("fetch", "render", "write")]
+    pipeline = Pipeline(stages)
+
+    results = pipeline.run(range(6))
+
+    assert [r.value for r in results] == list(range(6))
+    # Sequential: 18 x 50 ms; pipelined: (6 + 2) x 50 ms
+    assert pipeline.wall_s < 0.7
+    report = pipeline.report()
+    for name in ("fetch", "render", "write"):
+        assert report["stages"][name]["items"] == 6
+        assert 0.3 < report["stages"][name]["utilisation"] <= 1.0
+
+
+def test_bounded_queues_limit_read_ahead():
+    lock = threading.Lock()
+    counts = {"fetched": 0, "rendered": 0, "ahead": 0}
+
+    def fetch(value):
+        with lock:
+            counts["fetched"] += 1
+            counts["ahead"] = max(counts["ahead"], counts["fetched"] - counts["rendered"])
+        return value
+
+    def render(value):
+        time.sleep(0.02)
+        with lock:
+            counts["rendered"] += 1
+        return value
+
+    pipeline = Pipeline([Stage("fetch", fetch), Stage("render", render)], queue_size=2)
+    pipeline.run(range(20))
+
+    # One item rendering, two queued and one waiting to be queued
+    assert counts["ahead"] <= 4
+    assert pipeline.report()["stages"]["fetch"]["blocked_s"] > 0
+
+
+def test_errors_skip_later_stages():
+    written = []
+
+    def fetch(value):
+        if value == 2:
+            raise RuntimeError("no DEM")
+        return value
+
+    pipeline = Pipeline([Stage("fetch", fetch, workers=2), Stage("write", written.append)])
+    results = pipeline.run(range(4))
+
+    assert sorted(written) == [0, 1, 3]
+    assert isinstance(results[2].error, RuntimeError)
+    assert results[2].item == 2
+    assert all(r.error is None for i, r in enumerate(results) if i != 2)
+
+
+def test_callback_errors_stop_the_pipeline():
+    seen = []
+
+    def on_result(result):
+        raise KeyboardInterrupt
+
+    pipeline = Pipeline([Stage("work", seen.append)], queue_size=1)
+    with pytest.raises(KeyboardInterrupt):
+        pipeline.run(range(100), on_result)
+
+    assert len(seen) < 100
+
+
+def test_run_batch_pipelined_returns_failures(tmp_path):
+    job = BatchJob(lat=46.0, lon=8.0, zoom_level=12, width=64, height=48,
+                   output=str(tmp_path / "a.png"))
+
+    with patch.object(srtm, "get_dem", side_effect=OSError("offline")):
+        result = run_batch_pipelined(
+            [job], str(tmp_path / "manifest.json"),
+            render_pipeline=RenderPipeline(io_workers=1, cpu_workers=1),
+        )
+
+    assert result["rendered"] == []
+    [(failed_job, error)] = result["failed"]
+    assert failed_job == job and str(error) == "offline"
+    assert batch.load_manifest(str(tmp_path / "manifest.json")) == {}
+
+
+def test_fetch_downloads_concurrently(tmp_path):
+    y, x = np.mgrid[0:32, 0:32]
+    dem = (np.sin(x / 5.0) * np.cos(y / 7.0) * 500 + 1000).astype(np.float32)
+    lock = threading.Lock()
+    active = {"now": 0, "max": 0}
+    clip_names = set()
+
+    def slow_dem(*bbox, resolution=30, tiles_dir=None, clip_name="dem.tif"):
+        with lock:
+            clip_names.add(clip_name)
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(0.1)
+        with lock:
+            active["now"] -= 1
+        return dem, {}
+
+    jobs = [
+        BatchJob(lat=lat, lon=8.0, zoom_level=12, width=64, height=48,
+                 output=str(tmp_path / f"{lat}_{theme}.png"), theme=theme)
+        for theme in ("mono_ink", "paper_map")
+        for lat in (46.0, 46.5)
+    ]
+    render_pipeline = RenderPipeline(io_workers=2)
+    with patch.object(srtm, "get_dem", side_effect=slow_dem) as mock_dem:
+        results = Pipeline([Stage("fetch", render_pipeline.fetch, workers=2)]).run(jobs)
+
+    assert all(r.error is None for r in results)
+    # Both locations download at once, each once, into their own clip
+    assert active["max"] == 2
+    assert mock_dem.call_count == 2
+    assert len(clip_names) == 2 and "dem.tif" not in clip_names
+
+
+def test_run_batch_pipelined(tmp_path):
+    y, x = np.mgrid[0:32, 0:32]
+    dem = (np.sin(x / 5.0) * np.cos(y / 7.0) * 500 + 1000).astype(np.float32)
+    jobs = [
+        BatchJob(lat=lat, lon=8.0, zoom_level=12, width=64, height=48,
+                 output=str(tmp_path / f"{lat}_{theme}.png"), theme=theme)
+        for lat in (46.0, 46.5)
+        for theme in ("mono_ink", "paper_map")
+    ]
+    manifest_path = str(tmp_path / "manifest.json")
+    render_pipeline = RenderPipeline(io_workers=2, cpu_workers=2)
+
+    with patch.object(srtm, "get_dem", return_value=(dem, {})) as mock_dem:
+        first = run_batch_pipelined(jobs, manifest_path, render_pipeline=render_pipeline)
+        second = run_batch_pipelined(jobs, manifest_path, render_pipeline=render_pipeline)
+
+    assert len(first["rendered"]) == 4 and not first["failed"]
+    assert len(second["skipped"]) == 4
+    # The themes of one location share its DEM window
+    assert mock_dem.call_count == 2
+    for job in jobs:
+        assert Image.open(job.output).size == (64, 48)
+        embedded = metadata.read_exif_metadata(job.output)
+        assert embedded["IsohypsesWallpaper:ParamsHash"] == batch.job_hash(job)
+    assert set(batch.load_manifest(manifest_path)) == {os.path.abspath(j.output) for j in jobs}
@@ -0,0 +1,79 @@
+# /tests/test_png.py
+
+import io
+import zlib
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from isohypseswallpaper import metadata, png
+
+
+@pytest.fixture
+def image():
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:97, 0:61]
+    smooth = np.stack([x * 4, y * 2, (x + y) % 256], axis=-1)
+    noisy = rng.integers(0, 256, (97, 61, 3))
+    return np.where(y[..., np.newaxis] < 50, smooth, noisy).astype(np.uint8)
+
+
+def idat_stream(data: bytes) -> bytes:
+    """Concatenate the IDAT chunk data of a PNG file."""
+    pos, stream = 8, b""
+    while pos < len(data):
+        length = int.from_bytes(data[pos : pos + 4], "big")
+        if data[pos + 4 : pos + 8] == b"IDAT":
+            stream += data[pos + 8 : pos + 8 + length]
+        pos += 12 + length
+    return stream
+
+
+@pytest.mark.parametrize("channels", [1, 3, 4])
+@pytest.mark.parametrize("strip_rows", [1, 7, None])
+def test_write_png_round_trips(image, channels, strip_rows):
+    pixels = image[..., 0] if channels == 1 else image
+    if channels == 4:
+        pixels = np.dstack([image, image[..., :1]])
+    buffer = io.BytesIO()
+    png.write_png(buffer, pixels, level=6, workers=3, strip_rows=strip_rows)
+
+    # One zlib stream with a valid header and Adler-32 over all strips
+    zlib.decompress(idat_stream(buffer.getvalue()))
+    with Image.open(io.BytesIO(buffer.getvalue())) as img:
+        np.testing.assert_array_equal(np.asarray(img), pixels)
+
+
+@pytest.mark.parametrize("filter_type", range(5))
+def test_filters_match_png_reconstruction(image, filter_type):
+    rows = image.reshape(97, -1)
+    up = np.concatenate([np.zeros((1, rows.shape[1]), np.uint8), rows[:-1]])
+    scanlines = np.empty((97, rows.shape[1] + 1), np.uint8)
+    scanlines[:, 0] = filter_type
+    scanlines[:, 1:] = png.filter_rows(rows, up, filter_type, 3)
+
+    data = (
+        png.PNG_SIGNATURE
+        + png.chunk(b"IHDR", (61).to_bytes(4, "big") + (97).to_bytes(4, "big") + bytes([8, 2, 0, 0, 0]))
+        + png.chunk(b"IDAT", zlib.compress(scanlines.tobytes()))
+        + png.chunk(b"IEND", b"")
+    )
+    with Image.open(io.BytesIO(data)) as img:
+        np.testing.assert_array_equal(np.asarray(img), image)
+
+
+def test_adler32_combine():
+    a, b = b"isohypses" * 1000, b"wallpaper" * 7000
+    assert png.adler32_combine(zlib.adler32(a), zlib.adler32(b), len(b)) == zlib.adler32(a + b)
+
+
+def test_write_metadata_keeps_pixels_and_text(image, tmp_path):
+    path = str(tmp_path / "wallpaper.png")
+    Image.fromarray(image).save(path)
+    metadata.write_metadata(path, {"IsohypsesWallpaper:Theme": "ink ü"}, version="9.9")
+
+    assert metadata.read_exif_metadata(path) == {"IsohypsesWallpaper:Theme": "ink ü"}
+    assert metadata.read_png_text(path)["Software"] == "IsohypsesWallpaper 9.9"
+    with Image.open(path) as img:
+        np.testing.assert_array_equal(np.asarray(img), image)
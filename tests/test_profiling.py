@@ -0,0 +1,60 @@
+# /tests/test_profiling.py
+
+import json
+
+import numpy as np
+from unittest.mock import patch
+
+from isohypseswallpaper.profiling import Profiler
+from isohypseswallpaper.wallpaper import generate_wallpaper
+
+
+def test_stage_records_time_and_peak_memory():
+    profiler = Profiler()
+
+    with profiler.stage("alloc"):
+        block = np.ones(1_000_000)  # 8 MB
+        del block
+    profiler.stop()
+
+    (record,) = profiler.stages
+    assert record["stage"] == "alloc"
+    assert record["wall_s"] >= 0
+    assert record["cpu_s"] >= 0
+    assert record["peak_mem_bytes"] >= 8_000_000
+
+
+def test_write_jsonl_appends_one_report_per_call(tmp_path):
+    path = str(tmp_path / "profile.jsonl")
+    profiler = Profiler(trace_memory=False)
+    with profiler.stage("a"):
+        pass
+
+    profiler.write(path, output="a.png")
+    profiler.write(path, output="b.png")
+
+    reports = [json.loads(line) for line in open(path)]
+    assert [r["output"] for r in reports] == ["a.png", "b.png"]
+    assert reports[0]["stages"][0]["stage"] == "a"
+    assert "peak_mem_bytes" not in reports[0]
+
+
+@patch("isohypseswallpaper.wallpaper.encoders.encode")
+def test_generate_wallpaper_reports_stages(mock_encode):
+    profiler = Profiler(trace_memory=False)
+
+    generate_wallpaper(
+        dem_array=np.linspace(0, 100, 100).reshape(10, 10),
+        lat=42.0,
+        lon=12.0,
+        zoom_level=12,
+        width=40,
+        height=20,
+        contour_interval=10,
+        profiler=profiler,
+    )
+
+    assert [s["stage"] for s in profiler.stages] == [
+        "resample", "hillshade", "normalize", "colorize",
+        "metadata", "contour", "rasterize", "encode",
+    ]
@@ -0,0 +1,99 @@
+# /tests/test_relief.py
+
+import time
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+from isohypseswallpaper.relief import ReliefIndex, build_index
+
+TILE_PX = 361
+"""Pixels per tile side: 10 arc-second tiles overlapping by one pixel, like SRTM."""
+
+
+def write_tile(path, dem, lon):
+    step = 1 / (TILE_PX - 1)
+    with rasterio.open(
+        path, "w", driver="GTiff", height=TILE_PX, width=TILE_PX, count=1,
+        dtype="int16", crs="EPSG:4326", nodata=-32768,
+        transform=from_origin(lon - step / 2, 46 + step / 2, step, step),
+    ) as dst:
+        dst.write(dem, 1)
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    """Index of a flat sea tile at 7E and a mountain tile at 8E (in a
+    subdirectory), both at 45N."""
+    tiles = tmp_path_factory.mktemp("tiles")
+    sea = np.zeros((TILE_PX, TILE_PX), dtype=np.int16)
+    sea[:30, :30] = -32768
+    write_tile(tiles / "N45E007.tif", sea, 7)
+
+    y, x = np.mgrid[0:TILE_PX, 0:TILE_PX]
+    mountain = (500 + 2500 * np.exp(-((x - 180) ** 2 + (y - 180) ** 2) / 8000)).astype(np.int16)
+    (tiles / "N45").mkdir()
+    write_tile(tiles / "N45" / "N45E008.tif", mountain, 8)
+
+    return build_index(str(tiles))
+
+
+def test_build_index_cell_statistics(index):
+    assert index.cells_per_degree == 8
+    assert (index.lat_max, index.lon_min) == (46.125, 6.875)
+
+    sea = index.cell_stats(45.5, 7.5)
+    assert sea["relief"] == 0 and sea["roughness"] == 0 and sea["nodata"] == 0
+    assert index.cell_stats(45.99, 7.01)["nodata"] == pytest.approx(30 * 30 / 45**2, rel=0.1)
+
+    summit = index.cell_stats(45.5, 8.5)
+    assert summit["max"] > 2900 and summit["relief"] > 200 and summit["roughness"] > 0
+    # Outside the tiles: no data at all
+    assert np.isnan(index.relief[0, 0]) and index.nodata[0, 0] == 1
+    with pytest.raises(ValueError):
+        index.cell(50.0, 8.0)
+
+
+def test_sample_picks_footprints_with_relief(index):
+    rng = np.random.default_rng(0)
+    centres = index.sample(12, 1920, 1080, min_relief=1000, n=50, rng=rng)
+
+    # The footprint around every centre has the relief asked for
+    assert len(centres) == 50
+    for lat, lon in centres:
+        half_lon = 960 * 360 / (256 * 2**12)
+        half_lat = 540 * 360 / (256 * 2**12) * np.cos(np.radians(lat))
+        lons = np.linspace(lon - half_lon, lon + half_lon, 60)
+        lats = np.linspace(lat - half_lat, lat + half_lat, 30)[:, np.newaxis]
+        r2 = ((lons - 8.5) ** 2 + (lats - 45.5) ** 2) * (TILE_PX - 1) ** 2
+        elevation = np.where(lons < 8, 0, 500 + 2500 * np.exp(-r2 / 8000))
+        assert np.ptp(elevation) >= 1000 * 0.95
+
+    # Later draws reuse the candidate windows
+    start = time.perf_counter()
+    for _ in range(100):
+        index.sample(12, 1920, 1080, min_relief=1000, rng=rng)
+    assert (time.perf_counter() - start) / 100 < 1e-3
+
+    with pytest.raises(ValueError, match="No location"):
+        index.sample(12, 1920, 1080, min_relief=5000)
+
+
+def test_footprint_shrinks_towards_poles(index):
+    rows, cols = index.footprint_cells(9, 1920, 1080)
+
+    assert cols == int(1920 * 360 / (256 * 2**9) * 8)
+    assert rows.shape == (index.shape[0],)
+    assert rows[0] <= rows[-1]
+
+
+def test_index_round_trips(index, tmp_path):
+    path = str(tmp_path / "relief.npz")
+    index.save(path)
+    loaded = ReliefIndex.load(path)
+
+    assert (loaded.lat_max, loaded.lon_min, loaded.cells_per_degree) == (46.125, 6.875, 8)
+    for name in ("min", "max", "roughness", "nodata"):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(index, name))
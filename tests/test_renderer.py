@@ -0,0 +1,86 @@
+# /tests/test_renderer.py
+
+import io
+
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+from isohypseswallpaper import metadata, wallpaper
+from isohypseswallpaper.renderer import MAX_CACHED_SIZES, Renderer
+
+
+@pytest.fixture
+def dummy_dem():
+    return np.linspace(0, 100, 100).reshape(10, 10)
+
+
+def render(renderer, dem, **kwargs):
+    params = dict(lat=42.0, lon=12.0, zoom_level=12, width=64, height=48, contour_interval=10)
+    params.update(kwargs)
+    return renderer.render(dem, **params)
+
+
+def test_render_returns_rgb_array(dummy_dem):
+    rendered = render(Renderer(), dummy_dem, theme="paper_map")
+
+    assert rendered.image.shape == (48, 64, 3)
+    assert rendered.image.dtype == np.uint8
+    assert rendered.metadata["IsohypsesWallpaper:WidthPx"] == "64"
+    assert rendered.metadata["IsohypsesWallpaper:Theme"] == "paper_map"
+
+
+def test_render_encodes_png_with_metadata(dummy_dem, tmp_path):
+    rendered = render(Renderer(), dummy_dem, params_hash="abc")
+
+    data = rendered.to_bytes()
+    assert data.startswith(b"\x89PNG")
+
+    buffer = io.BytesIO()
+    rendered.save(buffer)
+    assert buffer.getvalue() == data
+
+    path = tmp_path / "wallpaper.png"
+    path.write_bytes(data)
+    assert metadata.read_exif_metadata(str(path))["IsohypsesWallpaper:ParamsHash"] == "abc"
+
+
+def test_renderer_reuses_layers_and_figures(dummy_dem):
+    renderer = Renderer()
+    first = render(renderer, dummy_dem, theme="mono_ink")
+    figure = renderer._figure(64, 48)[0]
+
+    with patch.object(wallpaper, "resample_dem") as mock_resample:
+        second = render(renderer, dummy_dem, theme="paper_map")
+        mock_resample.assert_not_called()
+
+    assert renderer._figure(64, 48)[0] is figure
+    assert len(figure.axes[0].images) == 1
+    assert not np.array_equal(first.image, second.image)
+
+
+def test_renderer_keeps_the_last_sizes(dummy_dem):
+    renderer = Renderer()
+    sizes = [(64, 48), (32, 24), (48, 32)]
+    for width, height in sizes:
+        render(renderer, dummy_dem, width=width, height=height)
+
+    assert list(renderer._figures) == sizes[-MAX_CACHED_SIZES:]
+    assert list(renderer._buffers) == sizes[-MAX_CACHED_SIZES:]
+
+    # Reusing a size keeps it over the older one
+    render(renderer, dummy_dem, width=32, height=24)
+    render(renderer, dummy_dem, width=64, height=48)
+    assert list(renderer._figures) == [(32, 24), (64, 48)]
+
+
+def test_preview_renders_same_view_smaller(dummy_dem):
+    from isohypseswallpaper.renderer import preview_size
+
+    renderer = Renderer()
+    preview = renderer.preview(dummy_dem, 42.0, 12.0, 12, 1920, 1080, contour_interval=10)
+
+    assert preview_size(1920, 1080) == (480, 270)
+    assert preview.image.shape == (270, 480, 3)
+    assert preview.metadata["IsohypsesWallpaper:WidthPx"] == "480"
+    assert float(preview.metadata["IsohypsesWallpaper:ZoomLevel"]) == 10
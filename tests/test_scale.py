@@ -5,8 +5,12 @@ import pytest
 
 from isohypseswallpaper.scale import (
     meters_per_pixel,
+    meters_per_pixel_array,
     extent_meters,
     WEB_MERCATOR_INITIAL_RESOLUTION,
+    lonlat_to_world,
+    pixel_grid,
+    world_to_lonlat,
 )
 
 
@@ -71,3 +75,43 @@ def test_extent_invalid_dimensions():
 
     with pytest.raises(ValueError):
         extent_meters(0.0, 10, 1920, -1)
+
+
+def test_world_coordinates_roundtrip():
+    """Web Mercator world coordinates convert back to the same degrees."""
+    x, y = lonlat_to_world(8.0, 46.0)
+    lon, lat = world_to_lonlat(x, y)
+
+    assert math.isclose(lon, 8.0, abs_tol=1e-9)
+    assert math.isclose(lat, 46.0, abs_tol=1e-9)
+    assert lonlat_to_world(0.0, 0.0) == (0.5, 0.5)
+
+
+def test_pixel_grid_matches_meters_per_pixel():
+    """Pixel centres are centred on the point and one ground pixel apart."""
+    lon, lat = pixel_grid(46.0, 8.0, 12, 100, 60)
+
+    assert lon.shape == (100,) and lat.shape == (60,)
+    assert math.isclose((lon[49] + lon[50]) / 2, 8.0, abs_tol=1e-9)
+    assert math.isclose((lat[29] + lat[30]) / 2, 46.0, abs_tol=1e-6)
+    assert lat[0] > lat[-1]
+
+    # One column apart is one pixel of ground distance at this latitude
+    meters_per_degree_lon = 111_320 * math.cos(math.radians(46.0))
+    assert math.isclose(
+        (lon[1] - lon[0]) * meters_per_degree_lon, meters_per_pixel(46.0, 12), rel_tol=1e-2
+    )
+
+
+def test_meters_per_pixel_array_matches_scalar():
+    """The vectorized version matches the scalar one element-wise."""
+    import numpy as np
+
+    lats = np.array([0.0, 30.0, 46.5, -60.0])
+    zooms = np.array([0, 8, 12, 15])
+
+    expected = [meters_per_pixel(lat, int(z)) for lat, z in zip(lats, zooms)]
+    np.testing.assert_allclose(meters_per_pixel_array(lats, zooms), expected, rtol=1e-12)
+
+    with pytest.raises(ValueError):
+        meters_per_pixel_array(lats, np.array([1, -1, 2, 3]))
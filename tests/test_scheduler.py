@@ -0,0 +1,156 @@
+# /tests/test_scheduler.py
+
+import os
+
+import matplotlib
+import numpy as np
+from PIL import Image
+from unittest.mock import patch
+
+from isohypseswallpaper import batch, srtm
+from isohypseswallpaper.batch import BatchJob
+from isohypseswallpaper.scheduler import Scheduler, ready_wallpapers, take_ready
+
+matplotlib.use("Agg")
+
+
+def make_jobs(locations, themes=("mono_ink", "paper_map")):
+    return [
+        BatchJob(lat=lat, lon=lon, zoom_level=12, width=64, height=48,
+                 output=f"out/{name}_{theme}.png", theme=theme)
+        for name, (lat, lon) in locations.items()
+        for theme in themes
+    ]
+
+
+def fake_dem(lat_min, lat_max, lon_min, lon_max, resolution=30, tiles_dir=None):
+    return np.ones((8, 8), dtype=np.float32), {}
+
+
+def fake_render(job, cache=None, profiler=None, dem=None):
+    Image.fromarray(np.zeros((2, 2, 3), dtype=np.uint8)).save(job.output)
+
+
+def test_fills_pool_and_reuses_dems(tmp_path):
+    pool = str(tmp_path / "pool")
+    jobs = make_jobs({"alps": (46.5, 8.0), "etna": (37.7, 15.0), "fuji": (35.4, 138.7)})
+    scheduler = Scheduler(jobs, pool, pool_size=4, nice=0)
+
+    with patch.object(srtm, "get_dem", side_effect=fake_dem) as mock_dem, \
+            patch.object(batch, "render_job", side_effect=fake_render) as mock_render:
+        scheduler.run(until_full=True, poll_interval=0)
+
+    ready = [os.path.basename(p) for p in ready_wallpapers(pool)]
+    assert sorted(ready) == [
+        "alps_mono_ink.png", "alps_paper_map.png", "etna_mono_ink.png", "etna_paper_map.png",
+    ]
+    # One DEM fetch per location, the themes of a location share a layer cache
+    assert mock_dem.call_count == 2
+    assert mock_render.call_count == 4
+    caches = [call.kwargs["cache"] for call in mock_render.call_args_list]
+    assert caches[0] is caches[1] and caches[1] is not caches[2]
+    assert scheduler.stats()["rendered"] == 4
+
+
+def test_taking_a_wallpaper_frees_a_slot(tmp_path):
+    pool = str(tmp_path / "pool")
+    shown = tmp_path / "shown"
+    shown.mkdir()
+    jobs = make_jobs({"alps": (46.5, 8.0)}, themes=("mono_ink", "paper_map", "lichen_forest"))
+    scheduler = Scheduler(jobs, pool, pool_size=2, nice=0)
+
+    with patch.object(srtm, "get_dem", side_effect=fake_dem) as mock_dem, \
+            patch.object(batch, "render_job", side_effect=fake_render):
+        scheduler.run(until_full=True, poll_interval=0)
+        first = take_ready(pool, str(shown))
+        scheduler.run(until_full=True, poll_interval=0)
+
+    assert first == str(shown / "alps_mono_ink.png")
+    assert sorted(os.path.basename(p) for p in ready_wallpapers(pool)) == [
+        "alps_lichen_forest.png", "alps_paper_map.png",
+    ]
+    assert mock_dem.call_count == 1
+    assert scheduler.dems.hits == 1
+
+    # The rotation continues with the wallpapers taken out of the pool
+    take_ready(pool, str(shown))
+    assert [job.output for job in scheduler.next_group(2)] == [
+        os.path.join(pool, "alps_mono_ink.png"), os.path.join(pool, "alps_paper_map.png"),
+    ]
+
+
+def test_pauses_while_overloaded(tmp_path):
+    pool = str(tmp_path / "pool")
+    loads = iter([4.0, 4.0, 0.1])
+    scheduler = Scheduler(
+        make_jobs({"alps": (46.5, 8.0)}, themes=("mono_ink",)), pool,
+        pool_size=1, nice=0, max_load=0.5, load_average=lambda: next(loads),
+    )
+
+    with patch.object(srtm, "get_dem", side_effect=fake_dem), \
+            patch.object(batch, "render_job", side_effect=fake_render):
+        scheduler.run(until_full=True, poll_interval=0)
+
+    assert scheduler.paused == 2
+    assert len(ready_wallpapers(pool)) == 1
+
+
+def test_failed_render_leaves_no_partial_file(tmp_path):
+    pool = str(tmp_path / "pool")
+
+    def failing_render(job, cache=None, profiler=None, dem=None):
+        open(job.output, "wb").close()
+        raise RuntimeError("boom")
+
+    scheduler = Scheduler(
+        make_jobs({"alps": (46.5, 8.0)}, themes=("mono_ink",)), pool,
+        pool_size=1, nice=0, cycle=False,
+    )
+    with patch.object(srtm, "get_dem", side_effect=fake_dem), \
+            patch.object(batch, "render_job", side_effect=failing_render):
+        scheduler.run(until_full=True, poll_interval=0)
+
+    assert [(job.output, str(error)) for job, error in scheduler.failures] == [
+        (os.path.join(pool, "alps_mono_ink.png"), "boom"),
+    ]
+    assert scheduler.stats()["failed"] == 1
+    assert os.listdir(pool) == []
+
+
+def test_failed_dem_fetch_fails_its_group(tmp_path):
+    pool = str(tmp_path / "pool")
+    jobs = make_jobs({"alps": (46.5, 8.0), "etna": (37.7, 15.0)})
+    scheduler = Scheduler(jobs, pool, pool_size=4, nice=0, cycle=False)
+
+    def flaky_dem(lat_min, lat_max, lon_min, lon_max, resolution=30, tiles_dir=None):
+        if lat_min > 40:
+            raise OSError("offline")
+        return fake_dem(lat_min, lat_max, lon_min, lon_max)
+
+    with patch.object(srtm, "get_dem", side_effect=flaky_dem), \
+            patch.object(batch, "render_job", side_effect=fake_render):
+        scheduler.run(until_full=True, poll_interval=0)
+
+    assert [(os.path.basename(job.output), str(error)) for job, error in scheduler.failures] == [
+        ("alps_mono_ink.png", "offline"), ("alps_paper_map.png", "offline"),
+    ]
+    assert sorted(os.path.basename(p) for p in ready_wallpapers(pool)) == [
+        "etna_mono_ink.png", "etna_paper_map.png",
+    ]
+    assert scheduler.stats()["failed"] == 2
+
+
+def test_renders_wallpapers_from_a_prefetched_dem(tmp_path):
+    pool = str(tmp_path / "pool")
+    y, x = np.mgrid[0:32, 0:32]
+    dem = (np.sin(x / 5.0) * np.cos(y / 7.0) * 500 + 1000).astype(np.float32)
+    scheduler = Scheduler(
+        make_jobs({"alps": (46.5, 8.0)}), pool, pool_size=2, nice=0,
+    )
+
+    with patch.object(srtm, "get_dem", return_value=(dem, {})):
+        scheduler.run(until_full=True, poll_interval=0)
+
+    ready = ready_wallpapers(pool)
+    assert len(ready) == 2
+    assert Image.open(ready[0]).size == (64, 48)
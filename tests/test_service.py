@@ -0,0 +1,181 @@
+# /tests/test_service.py
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+from affine import Affine
+from unittest.mock import patch
+
+from isohypseswallpaper.renderer import Renderer
+from isohypseswallpaper.service import RenderService, make_server
+
+DEM = np.linspace(0, 100, 100).reshape(10, 10)
+
+REQUEST = {"lat": 42.0, "lon": 12.0, "zoom_level": 12, "width": 40, "height": 20}
+
+
+def test_parse_request_validates_fields():
+    service = RenderService()
+
+    params = service.parse_request({**REQUEST, "theme": "mono_ink", "contour": 50})
+    assert params["theme"] == "mono_ink"
+    assert params["contour_interval"] == 50.0
+
+    with pytest.raises(ValueError):
+        service.parse_request({"lat": 42.0, "lon": 12.0, "zoom_level": 12})
+    with pytest.raises(ValueError):
+        service.parse_request({**REQUEST, "theme": "no_such_theme"})
+    with pytest.raises(ValueError):
+        service.parse_request({**REQUEST, "contour": 0})
+    for width, height in ((0, 20), (40, -1), (100_000, 100_000)):
+        with pytest.raises(ValueError):
+            service.parse_request({**REQUEST, "width": width, "height": height})
+
+
+@patch("isohypseswallpaper.service.srtm.get_dem", return_value=(DEM, {}))
+def test_renders_share_a_fixed_pool_of_renderers(mock_get_dem):
+    service = RenderService(render_workers=2)
+    lock = threading.Lock()
+    active = {"now": 0, "max": 0}
+    used = []
+    original = Renderer.render
+
+    def counting_render(self, **kwargs):
+        with lock:
+            used.append(self)
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(0.05)
+        try:
+            return original(self, **kwargs)
+        finally:
+            with lock:
+                active["now"] -= 1
+
+    requests = [service.parse_request({**REQUEST, "contour": c}) for c in (10, 20, 30, 40, 50)]
+    with patch.object(Renderer, "render", counting_render):
+        threads = [threading.Thread(target=service.render, args=(p,)) for p in requests]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert service.renders == 5
+    assert active["max"] <= 2
+    assert len({id(renderer) for renderer in used}) <= 2
+
+
+def test_identical_concurrent_requests_are_coalesced():
+    service = RenderService()
+    calls = []
+
+    def slow_render(params):
+        calls.append(params)
+        time.sleep(0.2)
+        return b"image"
+
+    params = service.parse_request(REQUEST)
+    results = []
+    with patch.object(service, "_render", side_effect=slow_render):
+        threads = [
+            threading.Thread(target=lambda: results.append(service.render(params)))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert len(calls) == 1
+    assert results == [b"image"] * 4
+    assert service.coalesced == 3
+
+
+@patch("isohypseswallpaper.service.srtm.get_dem", return_value=(DEM, {}))
+def test_http_render_reuses_dem_and_layers(mock_get_dem):
+    service = RenderService()
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        for theme in ("mono_ink", "paper_map"):
+            request = urllib.request.Request(
+                f"{url}/render",
+                data=json.dumps({**REQUEST, "theme": theme}).encode(),
+                method="POST",
+            )
+            with urllib.request.urlopen(request) as response:
+                assert response.headers["Content-Type"] == "image/png"
+                assert response.read().startswith(b"\x89PNG")
+
+        with urllib.request.urlopen(f"{url}/health") as response:
+            stats = json.load(response)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    mock_get_dem.assert_called_once()
+    assert stats["renders"] == 2
+    assert stats["layer_cache"]["hits"] == 1
+
+
+def test_http_tiles_are_served_and_cached(tmp_path):
+    service = RenderService(tile_cache_dir=str(tmp_path))
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def tile_dem(bbox):
+        transform = Affine(0.01, 0, bbox[2] - 0.1, 0, -0.01, bbox[1] + 0.1)
+        return DEM, {"transform": transform}
+
+    try:
+        with patch.object(service.tiles, "fetch_dem", side_effect=tile_dem) as mock_fetch:
+            for _ in range(2):
+                with urllib.request.urlopen(f"{url}/tiles/mono_ink/10/534/363.png?contour=20") as response:
+                    assert response.headers["Content-Type"] == "image/png"
+                    assert response.read().startswith(b"\x89PNG")
+            mock_fetch.assert_called_once()
+
+        for bad in ("no_such_theme/10/534/363.png", *(
+            f"mono_ink/10/534/363.png?contour={contour}"
+            for contour in ("0", "-20", "nan", "abc")
+        )):
+            with pytest.raises(urllib.error.HTTPError) as excinfo:
+                urllib.request.urlopen(f"{url}/tiles/{bad}")
+            assert excinfo.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert service.stats()["tiles"] == {"rendered": 1, "cached": 1}
+
+
+def test_concurrent_neighbouring_tiles_fetch_one_window(tmp_path):
+    service = RenderService(tile_cache_dir=str(tmp_path))
+
+    def slow_dem(lat_min, lat_max, lon_min, lon_max, resolution=30, tiles_dir=None):
+        time.sleep(0.05)
+        transform = Affine(0.01, 0, lon_min - 0.1, 0, -0.01, lat_max + 0.1)
+        return np.tile(DEM, (20, 20)), {"transform": transform}
+
+    with patch("isohypseswallpaper.srtm.get_dem", side_effect=slow_dem) as mock_get_dem:
+        threads = [
+            threading.Thread(target=service.tiles.get_tile, args=("mono_ink", 10, x, y))
+            for x in (532, 533) for y in (360, 361)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    mock_get_dem.assert_called_once()
+    assert service.stats()["tiles"]["rendered"] == 4
@@ -0,0 +1,90 @@
+# tests/test_span.py
+
+import numpy as np
+import pytest
+from affine import Affine
+
+from isohypseswallpaper import scale, span
+from isohypseswallpaper.renderer import Renderer
+from isohypseswallpaper.span import Display
+
+
+@pytest.fixture
+def layout():
+    return span.parse_layout(["left=160x100@0,30", "200x120@160,0"])
+
+
+def synthetic_dem(bbox, res=1 / 3600):
+    lat_min, lat_max, lon_min, lon_max = bbox
+    height = int((lat_max - lat_min) / res) + 10
+    width = int((lon_max - lon_min) / res) + 10
+    y, x = np.mgrid[0:height, 0:width]
+    dem = 1500 + 400 * np.sin(x / 13) * np.cos(y / 17) + 3 * y
+    transform = Affine(res, 0, lon_min - 5 * res, 0, -res, lat_max + 5 * res)
+    return dem, transform
+
+
+def test_parse_display():
+    assert span.parse_display("4k@0,0") == Display("screen1", 0, 0, 3840, 2160)
+    assert span.parse_display("side=1200x1920@-1200,0", 2) == Display(
+        "side", -1200, 0, 1200, 1920
+    )
+    with pytest.raises(ValueError, match="Unknown display size"):
+        span.parse_display("8k@0,0")
+    with pytest.raises(ValueError, match="Invalid display"):
+        span.parse_display("1080p")
+
+
+def test_parse_layout_rejects_overlaps():
+    with pytest.raises(ValueError, match="overlap"):
+        span.parse_layout(["1080p@0,0", "1080p@1000,0"])
+    with pytest.raises(ValueError, match="unique"):
+        span.parse_layout(["a=1080p@0,0", "a=1080p@1920,0"])
+
+
+def test_canvas_and_region_centers(layout):
+    assert span.canvas_size(layout) == (0, 0, 360, 130)
+    lat, lon = span.region_center(46.5, 8.0, 12, layout, 0, 0, 360, 130)
+    assert (lat, lon) == pytest.approx((46.5, 8.0))
+
+    # Right display centre: 80 px right and 5 px up from the canvas centre
+    lat, lon = span.region_center(46.5, 8.0, 12, layout, 160, 0, 200, 120)
+    wx, wy = scale.lonlat_to_world(8.0, 46.5)
+    world_px = 256 * 2**12
+    assert scale.lonlat_to_world(lon, lat) == pytest.approx(
+        (wx + 80 / world_px, wy - 5 / world_px), abs=1e-12
+    )
+
+
+def test_render_span_is_seamless(layout):
+    dem, transform = synthetic_dem(span.layout_bbox(46.5, 8.0, 12, layout))
+    renderer = Renderer()
+
+    canvas = span.render_span(dem, transform, 46.5, 8.0, 12, layout, renderer=renderer)
+    strips = span.render_span(
+        dem, transform, 46.5, 8.0, 12, layout, strips=True, renderer=renderer
+    )
+
+    assert list(canvas) == ["left", "screen2"]
+    assert canvas["left"].image.shape == (100, 160, 3)
+    assert canvas["screen2"].image.shape == (120, 200, 3)
+    for name in canvas:
+        np.testing.assert_array_equal(canvas[name].image, strips[name].image)
+
+    # Across the bezel, pixels change no more than between neighbouring columns
+    left, right = strips["left"].image.astype(int), strips["screen2"].image.astype(int)
+    seam = np.abs(left[:90, -1] - right[30:120, 0]).mean()
+    inside = np.abs(left[:90, -1] - left[:90, -2]).mean()
+    assert seam < 2 * inside + 1
+
+
+def test_render_span_with_contours(layout, tmp_path):
+    dem, transform = synthetic_dem(span.layout_bbox(46.5, 8.0, 12, layout))
+
+    rendered = span.render_span(
+        dem, transform, 46.5, 8.0, 12, layout, contour_interval=100, theme="paper_map"
+    )
+    paths = span.save_span(rendered, layout, str(tmp_path / "desk.png"))
+
+    assert [p.rsplit("/", 1)[1] for p in paths] == ["desk_left.png", "desk_screen2.png"]
+    assert rendered["left"].metadata["IsohypsesWallpaper:WidthPx"] == "160"
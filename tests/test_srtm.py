@@ -52,3 +52,136 @@ def test_get_dem_calls(mock_rasterio_open, mock_elevation_clip):
     # Metadata contains height/width keys
     assert dem_meta["height"] == dummy_raster.read.return_value.shape[0]
     assert dem_meta["width"] == dummy_raster.read.return_value.shape[1]
+
+
+def test_get_dem_merges_local_tiles(tmp_path):
+    """With tiles_dir, tiles covering the box are merged without downloading."""
+    import rasterio
+    from rasterio.transform import from_origin
+
+    for lon in (7, 8):
+        with rasterio.open(
+            tmp_path / f"N45E{lon:03d}.tif", "w", driver="GTiff", height=11, width=11,
+            count=1, dtype="int16", crs="EPSG:4326",
+            transform=from_origin(lon, 46, 0.1, 0.1),
+        ) as dst:
+            dst.write(np.full((11, 11), lon * 100, dtype=np.int16), 1)
+
+    with patch("elevation.clip") as mock_clip:
+        dem_array, dem_meta = get_dem(45.2, 45.8, 7.5, 8.5, tiles_dir=str(tmp_path))
+
+    mock_clip.assert_not_called()
+    assert dem_array.shape == (6, 10)
+    assert set(np.unique(dem_array)) == {700, 800}
+    assert dem_meta["width"] == 10
+
+
+def write_geotiff(path, dem, transform, nodata=None):
+    import rasterio
+
+    with rasterio.open(
+        path, "w", driver="GTiff", height=dem.shape[0], width=dem.shape[1],
+        count=1, dtype=dem.dtype, crs="EPSG:4326", transform=transform, nodata=nodata,
+    ) as dst:
+        dst.write(dem, 1)
+
+
+def sloped_dem(height=60, width=80):
+    y, x = np.mgrid[0:height, 0:width]
+    return (1000 + 10 * x + 5 * y).astype(np.int16)
+
+
+def test_fill_voids_interpolates_from_surroundings():
+    from isohypseswallpaper.srtm import fill_voids
+
+    dem = sloped_dem()
+    holed = dem.copy()
+    holed[20:30, 30:45] = -32768
+
+    filled = fill_voids(holed, holed == -32768)
+
+    assert filled.dtype == np.int16
+    np.testing.assert_array_equal(filled[holed != -32768], dem[holed != -32768])
+    assert np.abs(filled.astype(int) - dem).max() <= 40
+
+
+def test_dem_stats_match_numpy():
+    from isohypseswallpaper.srtm import PERCENTILES, dem_stats
+
+    dem = (np.random.default_rng(0).random((300, 200)) * 3000).astype(np.int16)
+
+    stats = dem_stats(dem)
+    float_stats = dem_stats(dem.astype(np.float32))
+
+    assert stats.range == (dem.min(), dem.max())
+    expected = np.percentile(dem, PERCENTILES, method="lower")
+    assert list(stats.percentiles.values()) == list(expected)
+    assert sum(stats.histogram) == dem.size
+    assert stats.histogram == float_stats.histogram
+    assert len(stats.bin_edges()) == len(stats.histogram) + 1
+
+
+def test_get_dem_fills_voids_of_local_tiles(tmp_path):
+    from rasterio.transform import from_origin
+
+    dem = sloped_dem()
+    holed = dem.copy()
+    holed[10:15, 10:20] = -9999
+    write_geotiff(tmp_path / "N45E007.tif", holed, from_origin(7, 46, 0.01, 0.01), nodata=-9999)
+
+    dem_array, dem_meta = get_dem(45.4, 46.0, 7.0, 7.8, tiles_dir=str(tmp_path))
+
+    assert dem_array.min() >= 1000
+    assert dem_meta["stats"].voids == 50
+    assert dem_meta["stats"].range == (dem_array.min(), dem_array.max())
+
+
+def test_get_dem_reuses_clipped_file_and_stats(tmp_path):
+    from rasterio.transform import from_origin
+
+    from isohypseswallpaper.srtm import stats_path
+
+    dem = sloped_dem()
+    dem[0, 0] = -32768
+
+    def clip(bounds, output, product, cache_dir):
+        write_geotiff(output, dem, from_origin(bounds[0], bounds[3], 0.01, 0.01))
+
+    with patch("elevation.clip", side_effect=clip) as mock_clip:
+        first, first_meta = get_dem(45.4, 46.0, 7.0, 7.8, cache_dir=str(tmp_path))
+        second, second_meta = get_dem(45.4, 46.0, 7.0, 7.8, cache_dir=str(tmp_path))
+        get_dem(45.0, 46.0, 7.0, 7.8, cache_dir=str(tmp_path))
+
+    assert mock_clip.call_count == 2
+    assert (tmp_path / "dem.tif.stats.json").exists()
+    assert stats_path(str(tmp_path / "dem.tif")).endswith("dem.tif.stats.json")
+    np.testing.assert_array_equal(first, second)
+    assert first[0, 0] > 0
+    assert first_meta["stats"] == second_meta["stats"]
+    assert second_meta["stats"].voids == 1
+
+
+def test_get_dem_decimated_read_reuses_clip(tmp_path):
+    from rasterio.transform import from_origin
+
+    from isohypseswallpaper.srtm import read_stats
+
+    dem = sloped_dem()
+
+    def clip(bounds, output, product, cache_dir):
+        write_geotiff(output, dem, from_origin(bounds[0], bounds[3], 0.01, 0.01))
+
+    with patch("elevation.clip", side_effect=clip) as mock_clip:
+        preview, preview_meta = get_dem(45.4, 46.0, 7.0, 7.8, cache_dir=str(tmp_path), decimation=4)
+        assert read_stats(str(tmp_path / "dem.tif"), (7.0, 45.4, 7.8, 46.0)) is None
+        full, full_meta = get_dem(45.4, 46.0, 7.0, 7.8, cache_dir=str(tmp_path))
+        again, again_meta = get_dem(45.4, 46.0, 7.0, 7.8, cache_dir=str(tmp_path), decimation=4)
+
+    assert mock_clip.call_count == 1
+    assert preview.shape == (15, 20) and full.shape == (60, 80)
+    assert preview_meta["transform"].a == full_meta["transform"].a * 4
+    assert preview_meta["transform"].c == full_meta["transform"].c
+    np.testing.assert_allclose(preview, full.reshape(15, 4, 20, 4).mean(axis=(1, 3)), atol=1)
+    # Once known, previews use the statistics of the full-resolution DEM
+    np.testing.assert_array_equal(again, preview)
+    assert again_meta["stats"] == full_meta["stats"]
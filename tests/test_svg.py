@@ -0,0 +1,65 @@
+# tests/test_svg.py
+
+import xml.etree.ElementTree as ET
+from unittest.mock import patch
+
+import numpy as np
+
+from isohypseswallpaper import svg
+from isohypseswallpaper.wallpaper import generate_wallpaper
+
+SVG_NS = "{http://www.w3.org/2000/svg}"
+
+
+def test_path_data_is_relative():
+    line = np.array([[1.0, 2.0], [3.0, 2.0], [3.0, 5.0]])
+    assert svg.path_data(line) == "M10 20l20 0 0 30"
+    assert svg.path_data(np.array([[1.0, 2.0], [1.01, 2.0]])) == ""
+
+
+def test_write_svg_writes_one_path_per_level(tmp_path):
+    y, x = np.mgrid[0:60, 0:80]
+    dem = 100 * np.exp(-((x - 40) ** 2 + (y - 30) ** 2) / 400)
+    path = tmp_path / "out.svg"
+
+    svg.write_svg(
+        str(path),
+        np.full((60, 80, 3), 0.5),
+        dem,
+        0,
+        100,
+        contour_interval=20,
+        contour_color=["#000000", "#ffffff"],
+        exif_dict={"Comment": "a < b"},
+    )
+
+    root = ET.parse(path).getroot()
+    assert root.get("width") == "80" and root.get("height") == "60"
+    assert root.find(f"{SVG_NS}metadata").text == "Comment=a < b"
+    assert root.find(f"{SVG_NS}image") is not None
+    paths = root.findall(f"{SVG_NS}g/{SVG_NS}path")
+    assert [p.get("data-elevation") for p in paths] == ["20", "40", "60", "80"]
+    assert all(p.get("d").endswith("z") for p in paths)
+    assert paths[0].get("stroke") != paths[-1].get("stroke")
+
+
+@patch("isohypseswallpaper.wallpaper.encoders.encode")
+def test_generate_wallpaper_svg(mock_encode, tmp_path):
+    dem = np.linspace(0, 100, 100).reshape(10, 10)
+    path = tmp_path / "out.svg"
+
+    generate_wallpaper(
+        dem_array=dem,
+        lat=42.0,
+        lon=12.0,
+        zoom_level=12,
+        width=200,
+        height=100,
+        contour_interval=10,
+        output_path=str(path),
+    )
+
+    mock_encode.assert_not_called()
+    root = ET.parse(path).getroot()
+    assert "IsohypsesWallpaper:Latitude" in root.find(f"{SVG_NS}metadata").text
+    assert root.findall(f"{SVG_NS}g/{SVG_NS}path")
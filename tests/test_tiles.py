@@ -0,0 +1,121 @@
+# /tests/test_tiles.py
+
+import io
+
+import numpy as np
+import pytest
+from affine import Affine
+from PIL import Image
+
+from isohypseswallpaper import scale, tiles, wallpaper
+from isohypseswallpaper.tiles import TileRenderer
+
+# Synthetic DEM over 7-9 E, 45-47 N, 3 arcseconds
+RES = 1 / 1200
+TRANSFORM = Affine(RES, 0, 7.0, 0, -RES, 47.0)
+_y, _x = np.mgrid[0:2400, 0:2400]
+DEM = 1500 + 800 * np.sin(_x / 90) * np.cos(_y / 70)
+
+# Tile containing (46.0 N, 8.0 E) at zoom 10
+Z = 10
+X, Y = (int(v * 2**Z) for v in scale.lonlat_to_world(8.0, 46.0))
+
+
+def fetch_dem(bbox):
+    return DEM, {"transform": TRANSFORM}
+
+
+def test_tile_bounds_cover_the_world_at_zoom_0():
+    lat_min, lat_max, lon_min, lon_max = tiles.tile_bounds(0, 0, 0)
+
+    assert (lon_min, lon_max) == (-180, 180)
+    assert lat_max == pytest.approx(85.0511, abs=1e-4)
+    assert lat_min == pytest.approx(-85.0511, abs=1e-4)
+
+
+def test_adjacent_tile_halos_overlap_exactly():
+    left = tiles.sample_tile(DEM, TRANSFORM, Z, X, Y, size=64, halo=8)
+    right = tiles.sample_tile(DEM, TRANSFORM, Z, X + 1, Y, size=64, halo=8)
+
+    assert left.shape == (80, 80)
+    # The last 16 columns of the left tile are the first 16 of the right one
+    np.testing.assert_array_equal(left[:, -16:], right[:, :16])
+
+
+def test_adjacent_tiles_shade_identically_across_edges():
+    left = tiles.sample_tile(DEM, TRANSFORM, Z, X, Y, size=64, halo=8)
+    right = tiles.sample_tile(DEM, TRANSFORM, Z, X + 1, Y, size=64, halo=8)
+
+    shade_left = wallpaper.shade_normals(wallpaper.surface_normals(left), rescale=False)
+    shade_right = wallpaper.shade_normals(wallpaper.surface_normals(right), rescale=False)
+
+    # Shared columns, away from the one-sided gradients at the outer borders
+    np.testing.assert_allclose(shade_left[1:-1, -15:-1], shade_right[1:-1, 1:15])
+
+
+def test_neighbouring_tiles_share_a_dem_window(tmp_path):
+    renderer = TileRenderer(cache_dir=str(tmp_path), fetch_dem=fetch_dem, tile_size=64)
+    x0, y0 = X - X % 4, Y - Y % 4
+
+    window = renderer.window_bounds(Z, x0, y0)
+    assert renderer.window_bounds(Z, x0 + 3, y0 + 3) == window
+    assert renderer.window_bounds(Z, x0 + 4, y0) != window
+    # The window covers the haloed tile
+    lat_min, lat_max, lon_min, lon_max = tiles.tile_bounds(Z, x0 + 3, y0 + 3, 8 / 64)
+    assert window[0] <= lat_min and lat_max <= window[1]
+    assert window[2] <= lon_min and lon_max <= window[3]
+
+    # Both tiles are sampled from the shared window
+    bboxes = []
+    renderer.fetch_dem = lambda bbox: bboxes.append(bbox) or fetch_dem(bbox)
+    renderer.render_tile("paper_map", Z, x0, y0)
+    renderer.render_tile("paper_map", Z, x0 + 1, y0)
+    assert bboxes == [window, window]
+
+
+def test_render_tile_crops_the_halo(tmp_path):
+    renderer = TileRenderer(cache_dir=str(tmp_path), fetch_dem=fetch_dem, tile_size=64)
+
+    rendered = renderer.render_tile("paper_map", Z, X, Y, contour_interval=100)
+
+    assert rendered.image.shape == (64, 64, 3)
+    assert rendered.metadata["IsohypsesWallpaper:ZoomLevel"] == str(Z)
+
+
+def test_high_terrain_keeps_its_contours_and_colors(tmp_path):
+    # Himalayan elevations, 4500 to 7500 m
+    high = DEM * 2 + 2500
+
+    renderer = TileRenderer(
+        cache_dir=str(tmp_path), fetch_dem=lambda bbox: (high, {"transform": TRANSFORM}),
+        tile_size=64,
+    )
+    plain = renderer.render_tile("paper_map", Z, X, Y).image
+    lined = renderer.render_tile("paper_map", Z, X, Y, contour_interval=200).image
+
+    assert (plain != lined).any(axis=2).mean() > 0.01
+    assert plain.reshape(-1, 3).std(axis=0).max() > 1
+
+
+def test_get_tile_uses_the_disk_cache(tmp_path):
+    renderer = TileRenderer(cache_dir=str(tmp_path), fetch_dem=fetch_dem, tile_size=64)
+
+    first = renderer.get_tile("mono_ink", Z, X, Y)
+    second = renderer.get_tile("mono_ink", Z, X, Y)
+
+    assert first == second
+    assert (renderer.rendered, renderer.cached) == (1, 1)
+    path = tmp_path / "mono_ink" / "nocontour" / "64" / str(Z) / str(X) / f"{Y}.png"
+    assert path.read_bytes() == first
+    assert Image.open(io.BytesIO(first)).size == (64, 64)
+
+
+@pytest.mark.parametrize(
+    "theme, z, x, y",
+    [("no_such_theme", Z, X, Y), ("mono_ink", 2, 0, 0), ("mono_ink", Z, 2**Z, 0)],
+)
+def test_invalid_tiles_are_rejected(tmp_path, theme, z, x, y):
+    renderer = TileRenderer(cache_dir=str(tmp_path), fetch_dem=fetch_dem)
+
+    with pytest.raises(ValueError):
+        renderer.get_tile(theme, z, x, y)
@@ -13,9 +13,8 @@ def dummy_dem():
     return dem
 
 
-@patch("isohypseswallpaper.wallpaper.metadata.write_metadata")
-@patch("isohypseswallpaper.wallpaper.plt.savefig")
-def test_generate_wallpaper_basic(mock_savefig, mock_write_metadata, dummy_dem):
+@patch("isohypseswallpaper.wallpaper.encoders.encode")
+def test_generate_wallpaper_basic(mock_encode, dummy_dem):
     dem = dummy_dem
     output_path = "dummy_output.png"
 
@@ -32,13 +31,11 @@ def test_generate_wallpaper_basic(mock_savefig, mock_write_metadata, dummy_dem):
         output_path=output_path,
     )
 
-    mock_savefig.assert_called_once()
-    mock_write_metadata.assert_called_once()
+    mock_encode.assert_called_once()
 
 
-@patch("isohypseswallpaper.wallpaper.metadata.write_metadata")
-@patch("isohypseswallpaper.wallpaper.plt.savefig")
-def test_generate_wallpaper_no_contours(mock_savefig, mock_write_metadata, dummy_dem):
+@patch("isohypseswallpaper.wallpaper.encoders.encode")
+def test_generate_wallpaper_no_contours(mock_encode, dummy_dem):
     dem = dummy_dem
     output_path = "dummy_output.png"
 
@@ -55,5 +52,160 @@ def test_generate_wallpaper_no_contours(mock_savefig, mock_write_metadata, dummy
         output_path=output_path,
     )
 
-    mock_savefig.assert_called_once()
-    mock_write_metadata.assert_called_once()
+    mock_encode.assert_called_once()
+
+
+def test_generate_wallpaper_encodes_exact_size_png_once(dummy_dem, tmp_path):
+    from PIL import Image
+
+    from isohypseswallpaper import metadata
+
+    output_path = str(tmp_path / "wallpaper.png")
+    with patch.object(metadata, "write_metadata") as mock_write_metadata:
+        generate_wallpaper(
+            dem_array=dummy_dem, lat=42.0, lon=12.0, zoom_level=12,
+            width=203, height=101, contour_interval=10, output_path=output_path,
+        )
+
+    # Metadata is embedded while encoding, not by re-saving the file
+    mock_write_metadata.assert_not_called()
+    with Image.open(output_path) as img:
+        assert img.size == (203, 101)
+        assert img.mode == "RGB"
+    assert metadata.read_exif_metadata(output_path)["IsohypsesWallpaper:Latitude"] == "42.000000"
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.int16])
+def test_resample_dem_matches_scipy_zoom(dtype):
+    from scipy.ndimage import zoom
+    from isohypseswallpaper.wallpaper import resample_dem
+
+    dem = (np.random.default_rng(0).random((37, 53)) * 3000).astype(dtype)
+
+    resampled = resample_dem(dem, width=160, height=90)
+
+    expected = zoom(dem, (90 / 37, 160 / 53), order=1)
+    assert resampled.dtype == dem.dtype
+    np.testing.assert_allclose(resampled, expected, atol=1e-9)
+
+
+def test_reproject_dem_follows_web_mercator_grid():
+    from affine import Affine
+    from isohypseswallpaper import scale
+    from isohypseswallpaper.wallpaper import MercatorView, mercator_plan, reproject_dem
+
+    # DEMs whose values are the latitude / longitude of each pixel centre
+    res = 1 / 1200
+    transform = Affine(res, 0, 7.5, 0, -res, 47.0)
+    rows, cols = np.mgrid[0:1200, 0:1200]
+    lat_dem = 47.0 - (rows + 0.5) * res
+    lon_dem = 7.5 + (cols + 0.5) * res
+
+    view = MercatorView(46.5, 8.0, 11, tuple(transform)[:6])
+    lon, lat = scale.pixel_grid(46.5, 8.0, 11, 200, 120)
+
+    np.testing.assert_allclose(reproject_dem(lat_dem, view, 200, 120), np.tile(lat[:, None], 200))
+    np.testing.assert_allclose(reproject_dem(lon_dem, view, 200, 120), np.tile(lon, (120, 1)))
+    # Plans are computed once per view, size and DEM shape
+    assert mercator_plan(view, 200, 120, (1200, 1200)) is mercator_plan(view, 200, 120, (1200, 1200))
+
+
+@patch("isohypseswallpaper.wallpaper.encoders.encode")
+def test_generate_wallpaper_reprojects_with_transform(mock_encode, dummy_dem):
+    from affine import Affine
+    from isohypseswallpaper import wallpaper
+
+    transform = Affine(0.001, 0, 11.995, 0, -0.001, 42.005)
+    with patch.object(wallpaper, "reproject_dem", wraps=wallpaper.reproject_dem) as mock_reproject:
+        generate_wallpaper(
+            dem_array=dummy_dem, lat=42.0, lon=12.0, zoom_level=12, width=80, height=40,
+            output_path="test.png", dem_transform=transform,
+        )
+
+    view = mock_reproject.call_args.args[1]
+    assert (view.lat, view.lon, view.zoom_level) == (42.0, 12.0, 12)
+    mock_encode.assert_called_once()
+
+
+def test_drop_small_rings_from_contour_paths():
+    import matplotlib.pyplot as plt
+
+    from isohypseswallpaper.wallpaper import drop_small_rings
+
+    y, x = np.mgrid[0:100, 0:100]
+    dem = np.exp(-((x - 30) ** 2 + (y - 30) ** 2) / 10) + 2 * np.exp(
+        -((x - 70) ** 2 + (y - 60) ** 2) / 300
+    )
+    fig, ax = plt.subplots()
+    path = ax.contour(dem, levels=[0.5]).get_paths()[0]
+    plt.close(fig)
+
+    kept = drop_small_rings(path, 100)
+
+    assert (path.codes == path.MOVETO).sum() == 2
+    assert (kept.codes == kept.MOVETO).sum() == 1
+    assert kept.vertices[:, 0].min() > 45
+
+
+@patch("isohypseswallpaper.wallpaper.encoders.encode")
+def test_generate_wallpaper_contour_budget(mock_encode):
+    from isohypseswallpaper.contours import ContourBudget
+
+    y, x = np.mgrid[0:100, 0:100]
+    dem = 1000 * np.sin(x / 5) * np.cos(y / 5) + 1000
+
+    generate_wallpaper(
+        dem_array=dem,
+        lat=42.0,
+        lon=12.0,
+        zoom_level=12,
+        width=100,
+        height=100,
+        contour_interval=1,
+        output_path="dummy_output.png",
+        contour_budget=ContourBudget(max_levels=10),
+    )
+
+    exif_dict = mock_encode.call_args.args[2]
+    assert float(exif_dict["IsohypsesWallpaper:ContourIntervalM"]) >= 200
+
+
+def test_terrain_layers_use_known_dem_range(dummy_dem):
+    from isohypseswallpaper.cache import MemoryCache
+    from isohypseswallpaper.wallpaper import terrain_layers
+
+    cache = MemoryCache()
+    own = terrain_layers(dummy_dem, 20, 20, cache=cache)
+    fixed = terrain_layers(dummy_dem, 20, 20, cache=cache, dem_range=(-100.0, 200.0))
+
+    np.testing.assert_array_equal(own["dem_range"], [0, 100])
+    np.testing.assert_array_equal(fixed["dem_range"], [-100, 200])
+    np.testing.assert_allclose(fixed["dem_norm"], (own["dem"] + 100) / 300)
+
+
+@pytest.mark.parametrize("shape", [(300, 257), (64, 64), (5, 7)])
+def test_compute_hillshade_skips_flat_blocks(shape):
+    from matplotlib.colors import LightSource
+
+    from isohypseswallpaper.wallpaper import compute_hillshade, relief_blocks
+
+    y, x = np.mgrid[0 : shape[0], 0 : shape[1]]
+    dem = np.maximum(0, 50 * np.sin(x / 9) * np.cos(y / 7) + x - shape[1] / 2)
+
+    expected = LightSource(azdeg=315, altdeg=45).hillshade(dem, vert_exag=1)
+
+    np.testing.assert_allclose(compute_hillshade(dem, block=16), expected, atol=1e-12)
+    if min(shape) > 16:
+        assert not relief_blocks(dem, 16).all()
+
+
+def test_relief_blocks_include_bordering_pixels():
+    from isohypseswallpaper.wallpaper import relief_blocks
+
+    dem = np.zeros((32, 48))
+    dem[16, 20] = 1  # first row of block (1, 1)
+
+    # The block above sees the bump through its bottom-row gradients
+    np.testing.assert_array_equal(
+        relief_blocks(dem, 16), [[False, True, False], [False, True, False]]
+    )